@@ -1,30 +1,28 @@
 import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+# jose (and the cryptography backend it loads) is imported on first use in
+# the token functions below, not at boot.
 
 # move these secrets/envs later 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-super-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
 
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto",
-)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
+# Active users are cached per process so authenticated requests skip the DB.
+# update_user / delete_user invalidate locally; the TTL bounds how long another
+# worker can keep serving a user that was just deactivated.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
@@ -33,8 +31,102 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def decode_access_token(token: str) -> Optional[dict]:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         return None
+
+
+def token_claims_for(user) -> dict:
+    """
+    Claims carried by an access token: subject email plus what the API needs
+    to authorize a request without looking the user up again.
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role,
+        "broker_id": user.broker_id,
+    }
+
+
+# -------- Authenticated user cache --------
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Detached snapshot of an active user, safe to share between requests.
+    """
+    id: int
+    email: str
+    role: str
+    broker_id: Optional[int]
+    is_active: bool = True
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> Optional["CurrentUser"]:
+        """
+        The user as of when the token was issued (see token_claims_for);
+        None for tokens from before role and broker_id were claims.
+        """
+        if not {"uid", "sub", "role", "broker_id"} <= claims.keys():
+            return None
+        return cls(
+            id=claims["uid"],
+            email=claims["sub"],
+            role=claims["role"],
+            broker_id=claims["broker_id"],
+        )
+
+    @classmethod
+    def from_model(cls, user) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            broker_id=user.broker_id,
+            is_active=bool(user.is_active),
+        )
+
+
+class ActiveUserCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user: CurrentUser) -> None:
+        if not user.is_active:
+            return
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = ActiveUserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,185 @@
+# api/bench_coldstart.py
+#
+# Cold-start benchmark: boots a fresh `uvicorn main:app` process per run and
+# measures, from the moment the process is spawned,
+#
+#   import      `import main` on its own, in a separate interpreter
+#   listening   first HTTP response of any kind (/healthz)
+#   ready       first 200 from /readyz (pools warm, databases answer)
+#   first_read  first GET /public/properties answered
+#   first_login first POST /auth/login answered (pays for the lazy hashing
+#               and JWT imports the boot skipped)
+#
+# against an already-migrated database, with DB_MIGRATE_ON_STARTUP on and
+# off. Medians over --runs boots, as JSON:
+#
+#   python bench_coldstart.py --runs 10 --output coldstart.json
+#   python bench_coldstart.py --app-dir /path/to/older/checkout/api
+#
+# Uses a scratch SQLite database unless DATABASE_URL is set.
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+EMAIL = "coldstart@example.com"
+PASSWORD = "coldstart-password"
+
+MODES = {
+    "migrate_on_boot": {"DB_MIGRATE_ON_STARTUP": "1"},
+    "no_schema_work": {"DB_MIGRATE_ON_STARTUP": "0"},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client: httpx.Client, method: str, url: str, accept, deadline: float, **kwargs) -> Optional[httpx.Response]:
+    """
+    Retry until `accept(response)`; None when the deadline passes first.
+    """
+    while time.perf_counter() < deadline:
+        try:
+            response = client.request(method, url, **kwargs)
+            if accept(response):
+                return response
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def boot(app_dir: str, env: dict, timeout: float) -> Dict[str, Optional[float]]:
+    """
+    One cold boot: seconds from spawn to each milestone (None = never).
+    """
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    deadline = started + timeout
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    timings: Dict[str, Optional[float]] = {}
+
+    def mark(name, response):
+        timings[name] = time.perf_counter() - started if response is not None else None
+
+    try:
+        with httpx.Client(base_url=base, timeout=timeout) as client:
+            # a tree without /healthz answers 404, which still means it's serving
+            mark("listening", wait_for(client, "GET", "/healthz", lambda r: True, deadline))
+            mark("ready", wait_for(client, "GET", "/readyz", lambda r: r.status_code in (200, 404), deadline))
+            mark("first_read", wait_for(client, "GET", "/public/properties", lambda r: r.status_code == 200, deadline))
+            mark(
+                "first_login",
+                wait_for(
+                    client,
+                    "POST",
+                    "/auth/login",
+                    lambda r: r.status_code == 200,
+                    deadline,
+                    data={"username": EMAIL, "password": PASSWORD},
+                ),
+            )
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return timings
+
+
+def import_seconds(app_dir: str, env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=app_dir, env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def prepare(app_dir: str, env: dict, timeout: float) -> None:
+    """
+    Migrate the database (by booting the app once) and register the login user.
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir,
+        env={**env, "DB_MIGRATE_ON_STARTUP": "1"},
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = time.perf_counter() + timeout
+            if wait_for(client, "GET", "/healthz", lambda r: True, deadline) is None:
+                sys.exit("the app did not start; run it by hand to see why")
+            client.post("/auth/register", json={"email": EMAIL, "password": PASSWORD})
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def summarize(runs: List[Dict[str, Optional[float]]]) -> Dict[str, Optional[float]]:
+    summary = {}
+    for name in runs[0]:
+        values = [run[name] for run in runs if run[name] is not None]
+        summary[name] = round(statistics.median(values) * 1000, 1) if values else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from process start to first served request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-dir", default=HERE, help="directory holding main.py (e.g. another checkout)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the JSON here as well as to stdout")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        scratch = tempfile.mkdtemp(prefix="coastal-coldstart-")
+        env["DATABASE_URL"] = f"sqlite:///{scratch}/coldstart.db"
+        env.setdefault("MEDIA_DIR", os.path.join(scratch, "media"))
+
+    prepare(args.app_dir, env, args.timeout)
+
+    results = {"app_dir": os.path.abspath(args.app_dir), "runs": args.runs, "modes": {}}
+    for mode, overrides in MODES.items():
+        mode_env = {**env, **overrides}
+        # one untimed boot so every mode starts from the same warm bytecode / page cache
+        boot(args.app_dir, mode_env, args.timeout)
+        runs = [boot(args.app_dir, mode_env, args.timeout) for _ in range(args.runs)]
+        imports = [import_seconds(args.app_dir, mode_env) for _ in range(args.runs)]
+        summary = summarize(runs)
+        summary["import"] = round(statistics.median(imports) * 1000, 1)
+        results["modes"][mode] = summary
+        print(f"{mode}: " + ", ".join(f"{k} {v} ms" for k, v in summary.items()), file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# api/bench_intents.py
+#
+# Per-message cost of the chat intent matcher as the rule set grows:
+#
+#   python bench_intents.py
+#
+# Synthetic intents get three random keywords and a two-word phrase each.
+# The compiled trie regex is compared with the if/elif substring scan it
+# replaced, which re-reads the message once per keyword.
+
+import argparse
+import random
+import string
+import time
+
+from intents import CompiledRules
+
+MESSAGES = [
+    "Hi! Looking for a 3 bed in Charleston under 450k, what do the mortgage rates look like?",
+    "can we schedule a showing this weekend",
+    "What neighborhoods near the beach are good for families with kids and dogs?",
+    "hello",
+    "Is there a pool, and how much are the HOA fees on the Myrtle Beach condo listings?",
+]
+
+
+def random_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def synthetic_rules(count, rng):
+    return {
+        "fallback": "fallback",
+        "intents": [
+            {
+                "name": f"intent{i}",
+                "priority": rng.randint(0, 100),
+                "keywords": [random_word(rng) for _ in range(3)],
+                "phrases": [f"{random_word(rng)} {random_word(rng)}"],
+                "reply": f"reply {i}",
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def substring_scan(rules, text):
+    text = text.lower()
+    for spec in rules["intents"]:
+        if any(term in text for term in [*spec["keywords"], *spec["phrases"]]):
+            return spec["reply"]
+    return rules["fallback"]
+
+
+def per_message_us(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - started) / (rounds * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat intent matcher microbenchmark")
+    parser.add_argument("--sizes", default="3,10,50,100,250,500,1000")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'intents':>8} {'terms':>6} {'compile ms':>11} {'trie regex us/msg':>18} {'if/elif scan us/msg':>20}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rules = synthetic_rules(size, rng)
+        started = time.perf_counter()
+        compiled = CompiledRules(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        matcher_us = per_message_us(compiled.reply_for, args.rounds)
+        scan_us = per_message_us(lambda m: substring_scan(rules, m), max(1, args.rounds // 10))
+        print(f"{size:>8} {len(compiled.by_term):>6} {compile_ms:>11.2f} {matcher_us:>18.2f} {scan_us:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
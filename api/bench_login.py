@@ -0,0 +1,142 @@
+# api/bench_login.py
+#
+# Login throughput next to listing latency, in-process against a scratch
+# SQLite database:
+#
+#   python bench_login.py                      # hashing in the process pool
+#   PASSWORD_WORKERS=0 python bench_login.py   # hashing in the threadpool
+#
+# Listing reads (GET /properties, which runs in the threadpool) are timed
+# alone, then again while a burst of logins runs alongside them.
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _scratch = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/bench.db"
+    os.environ.setdefault("MEDIA_DIR", os.path.join(_scratch, "media"))
+
+import httpx
+
+import main
+from hashing import PASSWORD_HASH_ROUNDS, PASSWORD_MAX_PENDING, PASSWORD_WORKERS
+
+EMAIL = "bench-broker@example.com"
+PASSWORD = "bench-password"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def seed(client, listings):
+    await client.post(
+        "/auth/register",
+        json={"email": EMAIL, "password": PASSWORD, "role": "broker"},
+    )
+    token = await login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(listings):
+        await client.post(
+            "/properties",
+            json={
+                "mls_id": f"BENCH{i}",
+                "address": f"{i} Ocean Blvd",
+                "city": "Myrtle Beach",
+                "state": "SC",
+                "zip_code": "29577",
+                "price": 250000 + i,
+            },
+            headers=headers,
+        )
+    return headers
+
+
+async def login(client):
+    response = await client.post("/auth/login", data={"username": EMAIL, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def read_listings(client, headers, stop_at, latencies):
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.get("/properties", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def login_loop(client, stop_at, outcomes):
+    while time.perf_counter() < stop_at:
+        response = await client.post(
+            "/auth/login", data={"username": EMAIL, "password": PASSWORD}
+        )
+        outcomes.append(response.status_code)
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+
+async def phase(client, headers, seconds, readers, logins):
+    latencies, outcomes = [], []
+    stop_at = time.perf_counter() + seconds
+    await asyncio.gather(
+        *(read_listings(client, headers, stop_at, latencies) for _ in range(readers)),
+        *(login_loop(client, stop_at, outcomes) for _ in range(logins)),
+    )
+    return latencies, outcomes
+
+
+def report(label, seconds, latencies, outcomes):
+    ok = outcomes.count(200)
+    shed = outcomes.count(503)
+    print(
+        f"{label:<22} listings p50 {percentile(latencies, 50):7.1f} ms"
+        f"  p95 {percentile(latencies, 95):7.1f} ms"
+        f"  p99 {percentile(latencies, 99):7.1f} ms"
+        f"  ({len(latencies) / seconds:6.1f} req/s)"
+        f"  | logins {ok / seconds:6.1f}/s, {shed} shed with 503"
+    )
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = await seed(client, args.listings)
+
+        print(
+            f"pbkdf2_sha256 rounds={PASSWORD_HASH_ROUNDS} workers={PASSWORD_WORKERS}"
+            f" max_pending={PASSWORD_MAX_PENDING} cpus={os.cpu_count()}"
+        )
+        latencies, outcomes = await phase(client, headers, args.seconds, args.readers, 0)
+        report("listings alone", args.seconds, latencies, outcomes)
+        latencies, outcomes = await phase(
+            client, headers, args.seconds, args.readers, args.logins
+        )
+        report(f"+ {args.logins} login clients", args.seconds, latencies, outcomes)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Login throughput next to listing latency")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8, help="concurrent listing clients")
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--listings", type=int, default=50)
+    args = parser.parse_args()
+
+    main.on_startup()
+    try:
+        asyncio.run(run(args))
+    finally:
+        main.shutdown_hash_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,590 @@
+# api/bench_routes.py
+#
+# Endpoint benchmark: seeds brokers, agents, properties and images, drives
+# every route of main.app in-process at each concurrency level, and writes
+# p50/p95/p99 latency, throughput and SQL statement counts as JSON:
+#
+#   python bench_routes.py --output before.json
+#   ... change something ...
+#   python bench_routes.py --output after.json
+#   python bench_routes.py --compare before.json after.json
+#
+# Uses a scratch SQLite database unless DATABASE_URL is set (e.g. a local
+# Postgres); an existing database with data is only reused with --reset,
+# which drops and recreates every table.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+if "DATABASE_URL" not in os.environ:
+    _scratch = tempfile.mkdtemp(prefix="coastal-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/bench.db"
+    os.environ.setdefault("MEDIA_DIR", os.path.join(_scratch, "media"))
+
+import httpx
+import sqlalchemy
+from sqlalchemy import func, insert, select
+
+import main
+import models
+from cache import public_cache
+from database import Base, SessionLocal, engine
+from hashing import hash_sync
+from listing_index import listing_index
+from listing_stats import rebuild as rebuild_listing_stats
+
+PASSWORD = "bench-password"
+
+CITIES = [
+    ("Charleston", "29401"),
+    ("Mount Pleasant", "29464"),
+    ("Summerville", "29483"),
+    ("Myrtle Beach", "29577"),
+    ("Greenville", "29601"),
+    ("Columbia", "29201"),
+    ("Hilton Head Island", "29928"),
+    ("Rock Hill", "29730"),
+]
+
+CHAT_MESSAGES = [
+    "3 bed in Charleston under 450k",
+    "what mortgage options are there?",
+    "can I book a tour this weekend",
+    "homes in Greenville",
+    "hello",
+]
+
+# Routes the harness can't drive through httpx, and why.
+NOT_DRIVEN = {
+    "WEBSOCKET /chat/ws": "WebSocket; same generator as POST /chat/stream",
+}
+
+
+# -------- Seeding --------
+
+def seed(args, rng: random.Random) -> dict:
+    """
+    Bulk-insert the dataset with Core executemany (no per-row API calls).
+    Returns ids the scenarios need.
+    """
+    password_hash = hash_sync(PASSWORD)
+    db = SessionLocal()
+    try:
+        brokers = db.scalars(
+            insert(models.User).returning(models.User.id),
+            [
+                {
+                    "email": f"bench-broker{b}@example.com",
+                    "hashed_password": password_hash,
+                    "role": "broker",
+                    "is_active": True,
+                }
+                for b in range(args.brokers)
+            ],
+        ).all()
+        agents = db.scalars(
+            insert(models.User).returning(models.User.id),
+            [
+                {
+                    "email": f"bench-agent{b}-{a}@example.com",
+                    "hashed_password": password_hash,
+                    "role": "agent",
+                    "broker_id": broker_id,
+                    "is_active": True,
+                }
+                for b, broker_id in enumerate(brokers)
+                for a in range(args.agents_per_broker)
+            ],
+        ).all()
+        owners = list(brokers) + list(agents)
+
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        rows = []
+        for i in range(args.properties):
+            city, zip_code = rng.choice(CITIES)
+            rows.append(
+                {
+                    "mls_id": f"SEED{i}",
+                    "address": f"{rng.randint(1, 9999)} {rng.choice(['King', 'Meeting', 'Ocean', 'Main', 'Palmetto', 'Bay'])} St",
+                    "city": city,
+                    "state": "SC",
+                    "zip_code": zip_code,
+                    "price": rng.randrange(120_000, 2_500_000, 1_000),
+                    "beds": rng.randint(1, 6),
+                    "baths": rng.choice([1, 1.5, 2, 2.5, 3, 4]),
+                    "sqft": rng.randrange(700, 5000, 10),
+                    "owner_id": rng.choice(owners),
+                    "is_archived": rng.random() < 0.05,
+                    "created_at": now - timedelta(minutes=i),
+                }
+            )
+        property_ids = []
+        for start in range(0, len(rows), 1000):
+            property_ids += db.scalars(
+                insert(models.Property).returning(models.Property.id),
+                rows[start:start + 1000],
+            ).all()
+
+        images = [
+            {
+                "property_id": property_id,
+                "url": f"https://images.example.com/{property_id}/{j}.jpg",
+                "order_index": j,
+            }
+            for property_id in property_ids
+            for j in range(args.images_per_property)
+        ]
+        for start in range(0, len(images), 5000):
+            db.execute(insert(models.PropertyImage), images[start:start + 5000])
+        # the bulk inserts above bypass the write paths that maintain it
+        rebuild_listing_stats(db.connection())
+        db.commit()
+
+        # everything the first broker may manage: theirs and their agents'
+        team = {brokers[0], *(a for a in agents[: args.agents_per_broker])}
+        owned = db.execute(
+            select(models.Property.id)
+            .where(models.Property.owner_id.in_(team), models.Property.is_archived == False)
+            .order_by(models.Property.id)
+        ).scalars().all()
+        owned_images = db.execute(
+            select(models.PropertyImage.property_id, models.PropertyImage.id)
+            .where(models.PropertyImage.property_id.in_(owned))
+            .order_by(models.PropertyImage.id)
+        ).all()
+        public = db.execute(
+            select(models.Property.id).where(models.Property.is_archived == False).limit(500)
+        ).scalars().all()
+
+        listing_index.load(db)
+    finally:
+        db.close()
+
+    public_cache.clear()
+    return {
+        "broker_email": "bench-broker0@example.com",
+        "agent_ids": list(agents[: args.agents_per_broker]),
+        "owned": list(owned),
+        "owned_images": [tuple(r) for r in owned_images],
+        "public": list(public),
+    }
+
+
+def tiny_png(n: int) -> bytes:
+    """
+    A valid 2x2 PNG whose pixels encode n, so uploads don't deduplicate.
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    r, g, b = n & 0xFF, (n >> 8) & 0xFF, (n >> 16) & 0xFF
+    raw = b"".join(b"\x00" + bytes([r, g, b]) * 2 for _ in range(2))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 2, 2, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+# -------- Scenarios --------
+
+@dataclass
+class Context:
+    data: dict
+    broker: Dict[str, str] = field(default_factory=dict)
+    counter: int = 0
+    chat_session: Optional[str] = None
+    cursor: Optional[str] = None
+
+    def next(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def owned(self, i: int) -> int:
+        return self.data["owned"][i % len(self.data["owned"])]
+
+    def take(self, key: str):
+        pool = self.data[key]
+        return pool.pop() if pool else None
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    request: Callable[[Context, int], dict]
+    # share of --requests this scenario runs (expensive or destructive ones run fewer)
+    weight: float = 1.0
+    before: Optional[Callable[[], None]] = None
+
+
+def scenarios() -> List[Scenario]:
+    def csv_feed(ctx, i):
+        lines = ["mls_id,address,city,state,zip_code,price,beds"]
+        lines += [
+            f"BENCHIMP{i}-{k},{k} Import Ave,Columbia,SC,29201,{200000 + k * 1000},3"
+            for k in range(50)
+        ]
+        return {"content": "\n".join(lines).encode(), "headers": {**ctx.broker, "Content-Type": "text/csv"}}
+
+    def new_property(ctx, i):
+        n = ctx.next()
+        return {
+            "json": {
+                "mls_id": f"BENCHNEW{n}",
+                "address": f"{n} Bench Rd",
+                "city": "Charleston",
+                "state": "SC",
+                "zip_code": "29401",
+                "price": 400000 + n,
+                "beds": 3,
+                "images": [{"url": f"https://images.example.com/new/{n}.jpg", "order_index": 0}],
+            },
+            "headers": ctx.broker,
+        }
+
+    def reorder(ctx, i):
+        property_id = ctx.data["reorder_property"]
+        ids = list(ctx.data["reorder_images"])
+        random.Random(i).shuffle(ids)
+        return {"url": f"/properties/{property_id}/images/order", "json": {"image_ids": ids}, "headers": ctx.broker}
+
+    def delete_image(ctx, i):
+        image = ctx.take("deletable_images")
+        if image is None:
+            return None
+        property_id, image_id = image
+        return {"url": f"/properties/{property_id}/images/{image_id}", "headers": ctx.broker}
+
+    def archive(ctx, i):
+        property_id = ctx.take("archivable")
+        if property_id is None:
+            return None
+        return {"url": f"/properties/{property_id}", "headers": ctx.broker}
+
+    def agent(ctx, i):
+        ids = ctx.data["agent_ids"]
+        return ids[i % len(ids)]
+
+    return [
+        Scenario("login", "POST", "/auth/login",
+                 lambda ctx, i: {"data": {"username": ctx.data["broker_email"], "password": PASSWORD}}, 0.5),
+        Scenario("register", "POST", "/auth/register",
+                 lambda ctx, i: {"json": {"email": f"bench-reg{ctx.next()}@example.com", "password": PASSWORD, "role": "broker"}}, 0.25),
+        Scenario("me", "GET", "/auth/me", lambda ctx, i: {"headers": ctx.broker}),
+        Scenario("list users", "GET", "/users", lambda ctx, i: {"headers": ctx.broker}),
+        Scenario("create user", "POST", "/users",
+                 lambda ctx, i: {"json": {"email": f"bench-newagent{ctx.next()}@example.com", "password": PASSWORD, "role": "agent"}, "headers": ctx.broker}, 0.25),
+        Scenario("get user", "GET", "/users/{user_id}",
+                 lambda ctx, i: {"url": f"/users/{agent(ctx, i)}", "headers": ctx.broker}),
+        Scenario("update user", "PUT", "/users/{user_id}",
+                 lambda ctx, i: {"url": f"/users/{agent(ctx, i)}", "json": {"is_active": True}, "headers": ctx.broker}),
+        Scenario("deactivate user", "DELETE", "/users/{user_id}",
+                 lambda ctx, i: {"url": f"/users/{ctx.data['spare_agent']}", "headers": ctx.broker}, 0.25),
+        Scenario("list properties", "GET", "/properties", lambda ctx, i: {"headers": ctx.broker}),
+        Scenario("broker stats", "GET", "/brokers/me/stats", lambda ctx, i: {"headers": ctx.broker}),
+        Scenario("create property", "POST", "/properties", new_property, 0.5),
+        Scenario("import properties", "POST", "/properties/import", csv_feed, 0.1),
+        Scenario("get property", "GET", "/properties/{property_id}",
+                 lambda ctx, i: {"url": f"/properties/{ctx.owned(i)}", "headers": ctx.broker}),
+        Scenario("update property", "PUT", "/properties/{property_id}",
+                 lambda ctx, i: {"url": f"/properties/{ctx.owned(i)}", "json": {"sqft": 1000 + i}, "headers": ctx.broker}, 0.5),
+        Scenario("archive property", "DELETE", "/properties/{property_id}", archive, 0.25),
+        Scenario("add images", "POST", "/properties/{property_id}/images",
+                 lambda ctx, i: {"url": f"/properties/{ctx.owned(i)}/images", "json": [{"url": f"https://images.example.com/add/{i}.jpg"}], "headers": ctx.broker}, 0.5),
+        Scenario("reorder images", "PUT", "/properties/{property_id}/images/order", reorder, 0.5),
+        Scenario("delete image", "DELETE", "/properties/{property_id}/images/{image_id}", delete_image, 0.25),
+        Scenario("public list", "GET", "/public/properties", lambda ctx, i: {}),
+        Scenario("public list uncached", "GET", "/public/properties",
+                 lambda ctx, i: {"params": {"limit": 50}}, before=public_cache.clear),
+        Scenario("public list filtered", "GET", "/public/properties",
+                 lambda ctx, i: {"params": {"city": CITIES[i % len(CITIES)][0], "min_beds": 3, "max_price": 900000}}),
+        Scenario("public list page 2", "GET", "/public/properties",
+                 lambda ctx, i: {"params": {"cursor": ctx.cursor}} if ctx.cursor else {}),
+        Scenario("public search", "GET", "/public/properties/search",
+                 lambda ctx, i: {"params": {"q": ["charlston", "king st", "29577", "ocean", "SEED12"][i % 5]}}),
+        Scenario("public export", "GET", "/public/properties/export", lambda ctx, i: {"params": {"format": "ndjson"}}, 0.05),
+        Scenario("public detail", "GET", "/public/properties/{property_id}",
+                 lambda ctx, i: {"url": f"/public/properties/{ctx.data['public'][i % len(ctx.data['public'])]}"}),
+        Scenario("upload image", "POST", "/uploads/image",
+                 lambda ctx, i: {"files": {"file": (f"{i}.png", tiny_png(ctx.next()), "image/png")}}, 0.25),
+        Scenario("upload images", "POST", "/uploads/images",
+                 lambda ctx, i: {"files": [("files", (f"{k}.png", tiny_png(ctx.next()), "image/png")) for k in range(4)]}, 0.1),
+        Scenario("chat", "POST", "/chat",
+                 lambda ctx, i: {"json": {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)], "session_id": ctx.chat_session}}),
+        Scenario("chat stream", "POST", "/chat/stream",
+                 lambda ctx, i: {"json": {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}}),
+        Scenario("chat history", "GET", "/chat/sessions/{session_id}",
+                 lambda ctx, i: {"url": f"/chat/sessions/{ctx.chat_session}"}, 0.5),
+    ]
+
+
+# -------- Driving --------
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 3)
+
+
+async def drive(client, ctx: Context, scenario: Scenario, total: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    sql_counts: List[int] = []
+    statuses: Dict[str, int] = {}
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while issued < total:
+            i = issued
+            issued += 1
+            spec = scenario.request(ctx, i)
+            if spec is None:
+                statuses["skipped"] = statuses.get("skipped", 0) + 1
+                continue
+            if scenario.before:
+                scenario.before()
+            url = spec.pop("url", scenario.path)
+            started = time.perf_counter()
+            response = await client.request(scenario.method, url, **spec)
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if "x-sql-queries" in response.headers:
+                sql_counts.append(int(response.headers["x-sql-queries"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "route": scenario.name,
+        "method": scenario.method,
+        "path": scenario.path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "statuses": statuses,
+        "errors": sum(n for s, n in statuses.items() if s != "skipped" and not s.startswith(("2", "3"))),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "sql_queries_mean": round(sum(sql_counts) / len(sql_counts), 2) if sql_counts else None,
+        "sql_queries_max": max(sql_counts) if sql_counts else None,
+    }
+
+
+def uncovered_routes(driven: List[Scenario]) -> Dict[str, str]:
+    covered = {f"{s.method} {s.path}" for s in driven}
+    missing = {}
+    for route in main.app.routes:
+        methods = getattr(route, "methods", None) or ({"WEBSOCKET"} if "websocket" in type(route).__name__.lower() else set())
+        for method in methods - {"HEAD", "OPTIONS"}:
+            key = f"{method} {route.path}"
+            if key in covered or route.path.startswith(("/docs", "/redoc", "/openapi", "/media")):
+                continue
+            missing[key] = NOT_DRIVEN.get(key, "no scenario")
+    return missing
+
+
+def prepare(ctx: Context) -> None:
+    """
+    Reserve disjoint listings/images for the destructive scenarios.
+    """
+    data = ctx.data
+    owned_images = data.pop("owned_images")
+    by_property: Dict[int, List[int]] = {}
+    for property_id, image_id in owned_images:
+        by_property.setdefault(property_id, []).append(image_id)
+
+    owned = data["owned"]
+    if len(owned) < 10:
+        raise SystemExit("Not enough seeded listings for the first broker; raise --properties")
+    data["reorder_property"] = owned[0]
+    data["reorder_images"] = by_property.get(owned[0], [])
+    half = len(owned) // 2
+    # archive / delete-image pools come from the back half; reads use the front
+    data["archivable"] = owned[half:][::-1][: max(1, len(owned) // 4)]
+    data["deletable_images"] = [
+        (p, image_id) for p in owned[half + len(data["archivable"]):] for image_id in by_property.get(p, [])
+    ]
+    data["owned"] = owned[:half]
+    data["spare_agent"] = data["agent_ids"][-1]
+
+
+async def start_context(client, data: dict) -> Context:
+    """
+    Scenario state: reserved rows, a broker token, a chat session and a
+    page-2 cursor.
+    """
+    ctx = Context(data=data)
+    prepare(ctx)
+    login = await client.post("/auth/login", data={"username": data["broker_email"], "password": PASSWORD})
+    ctx.broker = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    chat = await client.post("/chat", json={"message": "hello"})
+    ctx.chat_session = chat.json()["session_id"]
+    first_page = await client.get("/public/properties")
+    ctx.cursor = first_page.headers.get("x-next-cursor")
+    return ctx
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    async with main.app.router.lifespan_context(main.app):
+        seeded_at = time.perf_counter()
+        data = seed(args, rng)
+        seed_seconds = time.perf_counter() - seeded_at
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            ctx = await start_context(client, data)
+
+            selected = [
+                s for s in scenarios()
+                if not args.routes or any(r.lower() in s.name.lower() for r in args.routes)
+            ]
+            results = []
+            for concurrency in args.concurrency:
+                for scenario in selected:
+                    total = max(1, int(args.requests * scenario.weight))
+                    result = await drive(client, ctx, scenario, total, concurrency)
+                    results.append(result)
+                    print(
+                        f"c={concurrency:<3} {scenario.name:<24} n={result['requests']:<5}"
+                        f" p50={result['p50_ms'] or 0:8.2f}ms p95={result['p95_ms'] or 0:8.2f}ms"
+                        f" p99={result['p99_ms'] or 0:8.2f}ms {result['throughput_rps'] or 0:8.1f} rps"
+                        f" sql={result['sql_queries_mean']} errors={result['errors']}",
+                        file=sys.stderr,
+                    )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": engine.dialect.name,
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "dataset": {
+                "brokers": args.brokers,
+                "agents_per_broker": args.agents_per_broker,
+                "properties": args.properties,
+                "images_per_property": args.images_per_property,
+            },
+            "seed_seconds": round(seed_seconds, 2),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+        "not_driven": uncovered_routes(scenarios()),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def reset_or_check_empty(reset: bool) -> None:
+    with engine.connect() as conn:
+        has_data = (
+            sqlalchemy.inspect(conn).has_table("properties")
+            and conn.execute(select(func.count()).select_from(models.Property.__table__)).scalar()
+        )
+    if has_data and not reset:
+        raise SystemExit(f"{engine.url.render_as_string()} already has listings; pass --reset to wipe it")
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            # so startup migrates from scratch; property_search is SQLite's FTS table
+            conn.execute(sqlalchemy.text("DROP TABLE IF EXISTS alembic_version"))
+            conn.execute(sqlalchemy.text("DROP TABLE IF EXISTS property_search"))
+
+
+# -------- Comparing runs --------
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    old = {(r["route"], r["concurrency"]): r for r in before["results"]}
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    print(f"{'route':<24} {'c':>3} {'p50 ms':>18} {'p95 ms':>18} {'rps':>16} {'sql':>9}")
+    for r in after["results"]:
+        o = old.get((r["route"], r["concurrency"]))
+        if o is None:
+            continue
+
+        def delta(key, fmt="{:.2f}"):
+            a, b = o.get(key), r.get(key)
+            if a is None or b is None:
+                return "-"
+            change = f" ({(b - a) / a * 100:+.0f}%)" if a else ""
+            return fmt.format(b) + change
+
+        print(
+            f"{r['route']:<24} {r['concurrency']:>3} {delta('p50_ms'):>18} {delta('p95_ms'):>18}"
+            f" {delta('throughput_rps', '{:.1f}'):>16} {str(o.get('sql_queries_mean'))+'->'+str(r.get('sql_queries_mean')):>9}"
+        )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Seeded endpoint benchmark for the Coastal Vision API")
+    parser.add_argument("--brokers", type=int, default=3)
+    parser.add_argument("--agents-per-broker", type=int, default=4)
+    parser.add_argument("--properties", type=int, default=5000)
+    parser.add_argument("--images-per-property", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="requests per route per concurrency level")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--routes", nargs="*", help="only scenarios whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    reset_or_check_empty(args.reset)
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main_cli()
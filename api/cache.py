@@ -0,0 +1,181 @@
+# api/cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+PUBLIC_CACHE_MAX_ENTRIES = int(os.getenv("PUBLIC_CACHE_MAX_ENTRIES", "512"))
+PUBLIC_CACHE_TTL_SECONDS = float(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "30"))
+
+# Tag carried by every cached listing page; invalidate it when list
+# membership can change (new listing, edited filter fields).
+LISTINGS_TAG = "listings"
+
+
+def property_tag(property_id: int) -> str:
+    return f"property:{property_id}"
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, headers: Dict[str, str], expires_at: float):
+        self.body = body
+        self.headers = headers
+        self.expires_at = expires_at
+        # strong validator: byte-for-byte identical bodies share an ETag
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def to_response(self, request: Request) -> Response:
+        headers = {
+            **self.headers,
+            "ETag": self.etag,
+            "Cache-Control": "public, no-cache",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in candidates or self.etag in candidates:
+                return Response(status_code=304, headers=headers)
+
+        return Response(
+            content=self.body,
+            media_type="application/json",
+            headers=headers,
+        )
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of serialized responses with a TTL.
+
+    Entries are tagged so writes can drop exactly the responses they affect.
+    The cache is per process; with several workers the TTL bounds how stale
+    another worker's copy can get.
+
+    A read takes generation() before it queries and passes it to set(): if
+    one of the entry's tags was invalidated in between, the read may have
+    seen the data from before that write, so it isn't stored.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+        # tag -> (generation, monotonic time) of its last invalidation
+        self._invalidated: Dict[str, Tuple[int, float]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        # re-encoded, so ?city=x%26limit%3D1 and ?city=x&limit=1 differ
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def generation(self) -> Tuple[int, float]:
+        """
+        Take before reading what will be cached; see set().
+        """
+        with self._lock:
+            return self._generation, time.monotonic()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(
+        self,
+        key: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        tags: Iterable[str] = (),
+        generation: Optional[Tuple[int, float]] = None,
+    ) -> CachedResponse:
+        """
+        Store a response and return it. With `generation` (from generation()
+        before the read), it's only returned, not stored, when any of its
+        tags was invalidated since.
+        """
+        now = time.monotonic()
+        entry = CachedResponse(body, headers or {}, now + self.ttl_seconds)
+        key_tags = set(tags)
+        with self._lock:
+            if generation is not None and self._stale(key_tags, generation, now):
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self._key_tags[key] = key_tags
+            for tag in key_tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+        return entry
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            self._generation += 1
+            now = time.monotonic()
+            for tag in tags:
+                self._invalidated[tag] = (self._generation, now)
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+            if len(self._invalidated) > self.max_entries:
+                self._forget_invalidations(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+            self._invalidated.clear()
+            # everything read before now is stale
+            self._invalidated[""] = (self._generation, time.monotonic())
+
+    def _stale(self, tags: Set[str], generation: Tuple[int, float], now: float) -> bool:
+        # caller holds the lock
+        since, started = generation
+        if now - started >= self.ttl_seconds:
+            # older than any invalidation still remembered
+            return True
+        cleared = self._invalidated.get("")
+        if cleared is not None and cleared[0] > since:
+            return True
+        return any(self._invalidated.get(tag, (0, 0.0))[0] > since for tag in tags)
+
+    def _forget_invalidations(self, now: float) -> None:
+        # caller holds the lock; reads older than the TTL aren't stored anyway
+        self._invalidated = {
+            tag: mark
+            for tag, mark in self._invalidated.items()
+            if now - mark[1] < self.ttl_seconds
+        }
+
+    def _remove(self, key: str) -> None:
+        # caller holds the lock
+        self._entries.pop(key, None)
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+public_cache = ResponseCache(PUBLIC_CACHE_MAX_ENTRIES, PUBLIC_CACHE_TTL_SECONDS)
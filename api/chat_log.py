@@ -0,0 +1,254 @@
+# api/chat_log.py
+#
+# Write-behind persistence for chat. The chat routes only append to an
+# in-process buffer; a background task writes it to chat_sessions /
+# chat_messages in batches, so a reply never waits on a commit.
+#
+# A batch that fails because the database is unreachable stays at the head
+# of the buffer and is retried on the next tick. One the database rejects
+# (bad data, e.g. a NUL byte Postgres won't store in text) is bisected down
+# to the messages at fault, which are logged and dropped, so one bad row
+# can't hold up everything recorded after it.
+
+import asyncio
+import contextvars
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+from uuid import UUID
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import SessionLocal, insert_for
+
+logger = logging.getLogger("coastal.chat")
+
+# Flush once this many messages are waiting...
+CHAT_FLUSH_BATCH_SIZE = int(os.getenv("CHAT_FLUSH_BATCH_SIZE", "200"))
+# ...or when the oldest has waited this long.
+CHAT_FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_INTERVAL_SECONDS", "1.0"))
+# Hard cap on buffered messages. When the database falls behind, record()
+# waits up to CHAT_BUFFER_WAIT_SECONDS for room, then drops the message.
+CHAT_BUFFER_MAX = int(os.getenv("CHAT_BUFFER_MAX", "10000"))
+CHAT_BUFFER_WAIT_SECONDS = float(os.getenv("CHAT_BUFFER_WAIT_SECONDS", "0.5"))
+# Longest chat message the routes accept.
+CHAT_MESSAGE_MAX_CHARS = int(os.getenv("CHAT_MESSAGE_MAX_CHARS", "2000"))
+
+# Failures that say nothing about the rows being written.
+_UNAVAILABLE = (
+    sa_exc.OperationalError,
+    sa_exc.InterfaceError,
+    sa_exc.DisconnectionError,
+    sa_exc.TimeoutError,
+)
+
+
+@dataclass(frozen=True)
+class PendingMessage:
+    session_id: UUID
+    sender: str
+    message: str
+    created_at: datetime
+
+
+def write_batch(batch: List[PendingMessage]) -> None:
+    """
+    One transaction per batch: create any sessions we haven't seen (ON
+    CONFLICT DO NOTHING), then one executemany INSERT for the messages.
+    """
+    db = SessionLocal()
+    try:
+        started_at = {}
+        for m in batch:
+            started_at.setdefault(m.session_id, m.created_at)
+        db.execute(
+            insert_for(db)(models.ChatSession)
+            .values([{"id": sid, "started_at": ts} for sid, ts in started_at.items()])
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        db.execute(
+            insert(models.ChatMessage),
+            [
+                {
+                    "session_id": m.session_id,
+                    "sender": m.sender,
+                    "message": m.message,
+                    "created_at": m.created_at,
+                }
+                for m in batch
+            ],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+class ChatLog:
+    def __init__(self, batch_size: int, interval: float, max_pending: int, wait_seconds: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.wait_seconds = wait_seconds
+        self.dropped = 0
+        self.rejected = 0
+        self._pending: Deque[PendingMessage] = deque()
+        self._recorded = 0
+        # written or rejected
+        self._settled = 0
+        self._failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self) -> None:
+        """
+        Start the flusher on the running loop. The app does this at startup;
+        record() falls back to it for callers without a lifespan.
+        """
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._room = asyncio.Event()
+        self._progress = asyncio.Condition()
+        self._closing = False
+        # a fresh context, never the one of the request that happens to
+        # start it (SQL counters, metrics phases)
+        self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def record(self, session_id: UUID, sender: str, message: str) -> None:
+        """
+        Queue one message for writing. Only waits when the buffer is full.
+        """
+        self.start()
+        if len(self._pending) >= self.max_pending:
+            self._room.clear()
+            self._wake.set()
+            try:
+                await asyncio.wait_for(self._room.wait(), self.wait_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                logger.warning("Chat log buffer full; dropped a message (%d so far)", self.dropped)
+                return
+
+        self._pending.append(
+            PendingMessage(session_id, sender, message, datetime.now(timezone.utc))
+        )
+        self._recorded += 1
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> bool:
+        """
+        Write out everything recorded so far without waiting for the timer.
+        False if the database was unavailable (the messages stay buffered).
+        """
+        if self._task is None:
+            return True
+        target, failures = self._recorded, self._failures
+        self._wake.set()
+        async with self._progress:
+            await self._progress.wait_for(
+                lambda: self._settled >= target or self._failures > failures
+            )
+        return self._settled >= target
+
+    async def close(self) -> None:
+        """
+        Stop the flusher after writing out whatever is still buffered.
+        """
+        if self._task is None:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            await self._drain()
+            if self._closing:
+                return
+
+    async def _drain(self) -> None:
+        try:
+            while self._pending:
+                batch = [
+                    self._pending.popleft()
+                    for _ in range(min(self.batch_size, len(self._pending)))
+                ]
+                unwritten = await self._write(batch)
+                if not unwritten:
+                    self._room.set()
+                    continue
+
+                self._failures += 1
+                if self._closing:
+                    logger.error(
+                        "Writing chat messages failed at shutdown; dropping %d",
+                        len(unwritten) + len(self._pending),
+                    )
+                    self._pending.clear()
+                    return
+                # retry on the next tick; the buffer cap bounds memory meanwhile
+                self._pending.extendleft(reversed(unwritten))
+                return
+        finally:
+            async with self._progress:
+                self._progress.notify_all()
+
+    async def _write(self, batch: List[PendingMessage]) -> List[PendingMessage]:
+        """
+        Write a batch, bisecting it when the database rejects it so only the
+        messages at fault are dropped. Returns what's left unwritten because
+        the database is unavailable (empty when done).
+        """
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                await run_in_threadpool(write_batch, part)
+            except Exception as exc:
+                if isinstance(exc, _UNAVAILABLE):
+                    logger.exception("Writing %d chat messages failed; will retry", len(part))
+                    return part + [m for rest in reversed(parts) for m in rest]
+                if len(part) == 1:
+                    self._reject(part[0], exc)
+                    continue
+                middle = len(part) // 2
+                parts += [part[middle:], part[:middle]]
+                continue
+            self._settled += len(part)
+        return []
+
+    def _reject(self, message: PendingMessage, exc: Exception) -> None:
+        self.rejected += 1
+        self._settled += 1
+        logger.error(
+            "Dropping a chat message the database rejects (session %s, %s, %d chars: %r): %s",
+            message.session_id,
+            message.sender,
+            len(message.message),
+            message.message[:200],
+            exc,
+        )
+
+
+chat_log = ChatLog(
+    CHAT_FLUSH_BATCH_SIZE,
+    CHAT_FLUSH_INTERVAL_SECONDS,
+    CHAT_BUFFER_MAX,
+    CHAT_BUFFER_WAIT_SECONDS,
+)
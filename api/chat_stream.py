@@ -0,0 +1,99 @@
+# api/chat_stream.py
+#
+# Reply generators for chat. A generator turns one visitor message into an
+# async stream of text chunks; /chat joins them, /chat/stream (SSE) and
+# /chat/ws (WebSocket) forward each chunk as soon as it exists.
+#
+# CHAT_GENERATOR picks the implementation. A generative backend plugs in by
+# subclassing ReplyGenerator and adding it to GENERATORS (or through
+# app.dependency_overrides[get_reply_generator] in tests).
+
+import asyncio
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Type
+from uuid import UUID
+
+from intents import intent_matcher
+from listing_index import listing_reply
+
+CHAT_GENERATOR = os.getenv("CHAT_GENERATOR", "rules")
+
+# Delay between chunks of the fake generator, to see streaming in the widget.
+CHAT_FAKE_TOKEN_DELAY_SECONDS = float(os.getenv("CHAT_FAKE_TOKEN_DELAY_SECONDS", "0.05"))
+
+
+def split_tokens(text: str):
+    """
+    Word-sized chunks that join back to exactly `text`.
+    """
+    return re.findall(r"\s*\S+\s*", text) or [text]
+
+
+class ReplyGenerator(ABC):
+    @abstractmethod
+    def stream(self, message: str, session_id: UUID) -> AsyncIterator[str]:
+        """
+        The reply to `message`, in chunks that join back to the full text;
+        implement it as an async generator.
+        """
+
+
+class RuleReplyGenerator(ReplyGenerator):
+    """
+    Matching listings when the message is a home search, otherwise the
+    chat_intents.json rules; chunked by word. Nothing to wait for, so the
+    whole reply is ready at once; chunking keeps the wire format the same
+    as a generative backend's.
+    """
+
+    async def stream(self, message: str, session_id: UUID) -> AsyncIterator[str]:
+        topic = intent_matcher.match(message)
+        reply = listing_reply(message, other_topic=topic.matched if topic else None)
+        for token in split_tokens(reply or intent_matcher.reply_for(message)):
+            yield token
+
+
+class FakeReplyGenerator(ReplyGenerator):
+    """
+    Stand-in for a generative backend: echoes the message back a word at a
+    time with a delay between words.
+    """
+
+    def __init__(self, delay: float = CHAT_FAKE_TOKEN_DELAY_SECONDS):
+        self.delay = delay
+
+    async def stream(self, message: str, session_id: UUID) -> AsyncIterator[str]:
+        for token in split_tokens(f"You said: {message}"):
+            await asyncio.sleep(self.delay)
+            yield token
+
+
+GENERATORS: Dict[str, Type[ReplyGenerator]] = {
+    "rules": RuleReplyGenerator,
+    "fake": FakeReplyGenerator,
+}
+
+if CHAT_GENERATOR not in GENERATORS:
+    raise RuntimeError(f"Unknown CHAT_GENERATOR {CHAT_GENERATOR!r}")
+
+_generator = GENERATORS[CHAT_GENERATOR]()
+
+
+def get_reply_generator() -> ReplyGenerator:
+    """
+    FastAPI dependency for the configured generator.
+    """
+    return _generator
+
+
+async def generate_reply(generator: ReplyGenerator, message: str, session_id: UUID) -> str:
+    return "".join([token async for token in generator.stream(message, session_id)])
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> bytes:
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return ("\n".join(lines) + "\n\n").encode()
@@ -1,13 +1,97 @@
 import os
-from sqlalchemy import create_engine
+import time
+from functools import partial
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection, Request
+
+from metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
-engine = create_engine(DATABASE_URL, future=True)
+# DB_ASYNC=1 serves the property and public routes from an asyncio engine
+# (asyncpg / aiosqlite) instead of the sync engine in Starlette's threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+# Optional read-only replica for the public GET routes (e.g. a Postgres
+# streaming replica, or locally a second SQLite file kept current by
+# `python replica_sync.py`).
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+# -------- Pool settings --------
+
+# Defaults are SQLAlchemy's own. Each engine (primary, replica, async) gets
+# its own pool of this size.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Test each connection with a round trip on checkout; turn on when the
+# database or a proxy drops idle connections.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0").lower() in ("1", "true", "yes")
+# Replace connections older than this many seconds (-1 = never).
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+# Postgres statement_timeout in ms for every connection (0 = none).
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def engine_options(url: str, read_only: bool = False) -> dict:
+    """
+    create_engine()/create_async_engine() keyword arguments from the DB_POOL_*
+    settings; read_only makes a Postgres session refuse writes.
+    """
+    parsed = make_url(url)
+    backend, driver = parsed.get_backend_name(), parsed.get_driver_name()
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+
+    # in-memory SQLite uses a single-connection pool with no sizing
+    if not (backend == "sqlite" and parsed.database in (None, "", ":memory:")):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            # QueuePools that time how long checkouts wait (metrics.py)
+            poolclass=(
+                TimedAsyncAdaptedQueuePool if parsed.get_dialect().is_async else TimedQueuePool
+            ),
+        )
+
+    if backend == "postgresql":
+        settings = {}
+        if DB_STATEMENT_TIMEOUT_MS:
+            settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        if read_only:
+            settings["default_transaction_read_only"] = "on"
+        if settings and driver == "asyncpg":
+            options["connect_args"] = {"server_settings": settings}
+        elif settings:
+            options["connect_args"] = {
+                "options": " ".join(f"-c {k}={v}" for k, v in settings.items())
+            }
+    return options
+
+
+def make_read_only(engine) -> None:
+    """
+    SQLite has no read-only session setting; refuse writes per connection.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def query_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+engine = create_engine(DATABASE_URL, future=True, **engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -15,4 +99,160 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+replica_engine = None
+ReplicaSessionLocal = None
+
+if DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        DATABASE_REPLICA_URL, future=True, **engine_options(DATABASE_REPLICA_URL, read_only=True)
+    )
+    make_read_only(replica_engine)
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=replica_engine,
+    )
+
 Base = declarative_base()
+
+
+def insert_for(db):
+    """
+    The dialect's insert() (with on_conflict_do_*) for the session's bind.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise RuntimeError(f"ON CONFLICT inserts are not supported on {dialect}")
+
+
+def to_async_url(url: str) -> str:
+    """
+    postgresql://... -> postgresql+asyncpg://..., sqlite://... -> sqlite+aiosqlite://...
+    """
+    scheme, sep, rest = url.partition("://")
+    driverless = scheme.split("+", 1)[0]
+    if driverless in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if driverless == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or (
+    to_async_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+)
+
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+
+    # Handlers serialize ORM objects after the session work is done, outside
+    # the greenlet; don't expire what was just loaded.
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+    if ASYNC_DATABASE_REPLICA_URL:
+        async_replica_engine = create_async_engine(
+            ASYNC_DATABASE_REPLICA_URL,
+            **engine_options(ASYNC_DATABASE_REPLICA_URL, read_only=True),
+        )
+        make_read_only(async_replica_engine.sync_engine)
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            async_replica_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+
+class DbRunner:
+    """
+    Runs sync-style ORM code (a function taking a Session) against whichever
+    engine is configured: on the event loop through AsyncSession.run_sync, or
+    in the threadpool with a plain Session.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        if DB_ASYNC:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(partial(fn, self.session, *args, **kwargs))
+
+
+async def get_db_runner():
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as session:
+            yield DbRunner(session)
+    else:
+        session = SessionLocal()
+        try:
+            yield DbRunner(session)
+        finally:
+            await run_in_threadpool(session.close)
+
+
+# -------- Read-your-writes --------
+
+# After a listing write, public reads go to the primary for this long (set
+# it above the replica's usual lag): for the client that wrote, via a
+# cookie, and for this process's public cache refills, which would
+# otherwise cache what the lagging replica still has.
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary"
+
+_last_listing_write = float("-inf")
+
+
+def note_listing_write() -> None:
+    global _last_listing_write
+    _last_listing_write = time.monotonic()
+
+
+def read_from_replica(conn: HTTPConnection) -> bool:
+    """
+    Whether a public read may use the replica right now.
+    """
+    if replica_engine is None:
+        return False
+    if READ_PRIMARY_COOKIE in conn.cookies:
+        return False
+    return time.monotonic() - _last_listing_write >= DB_REPLICA_STICKY_SECONDS
+
+
+def read_session_factory(conn: HTTPConnection):
+    """
+    Sync sessionmaker for a public read: the replica unless the primary is
+    needed for read-your-writes.
+    """
+    return ReplicaSessionLocal if read_from_replica(conn) else SessionLocal
+
+
+async def get_read_db_runner(request: Request):
+    """
+    get_db_runner for the public GET routes, on the replica when it's safe.
+    """
+    replica = read_from_replica(request)
+    if DB_ASYNC:
+        factory = AsyncReplicaSessionLocal if replica and AsyncReplicaSessionLocal else AsyncSessionLocal
+        async with factory() as session:
+            yield DbRunner(session)
+    else:
+        session = (ReplicaSessionLocal if replica else SessionLocal)()
+        try:
+            yield DbRunner(session)
+        finally:
+            await run_in_threadpool(session.close)
@@ -0,0 +1,197 @@
+# api/derivatives.py
+import asyncio
+import importlib.util
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# name -> max width in px; images are never upscaled
+VARIANT_WIDTHS = {
+    "thumb": 320,
+    "card": 640,
+    "hero": 1600,
+}
+
+# Formats Pillow can read without plugins; anything else (e.g. HEIC) is
+# served as the original only.
+_RESIZABLE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Pillow is optional: without it uploads still work, just without variants.
+IMAGE_VARIANTS_ENABLED = (
+    os.getenv("IMAGE_VARIANTS", "1") == "1"
+    and importlib.util.find_spec("PIL") is not None
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# How long "this upload has no manifest" is remembered, so serializing a
+# page of unrendered images (legacy uploads, IMAGE_VARIANTS=0, no Pillow)
+# doesn't try to open a file per image per request. Rendering in this
+# process forgets it at once; other workers see the variants within this.
+IMAGE_MANIFEST_MISS_SECONDS = float(os.getenv("IMAGE_MANIFEST_MISS_SECONDS", "60"))
+
+# filename -> (manifest, expires at). Uploads are content-addressed, so a
+# manifest that exists never changes and is kept until the cache fills up
+# (then it's cleared); a miss expires after IMAGE_MANIFEST_MISS_SECONDS.
+_MANIFEST_CACHE_SIZE = 10_000
+_manifests: Dict[str, Tuple[Dict[str, str], float]] = {}
+_manifests_lock = threading.Lock()
+
+
+def variant_name(filename: str, variant: str, webp: bool = False) -> str:
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{variant}{'.webp' if webp else ext}"
+
+
+def has_variants(filename: str) -> bool:
+    return (
+        IMAGE_VARIANTS_ENABLED
+        and os.path.splitext(filename)[1].lower() in _RESIZABLE_EXTS
+    )
+
+
+def manifest_name(filename: str) -> str:
+    """
+    <stem>_variants.json: which variants were rendered for an upload,
+    written after the last of them.
+    """
+    return f"{os.path.splitext(filename)[0]}_variants.json"
+
+
+def _read_manifest(filename: str) -> Dict[str, str]:
+    if os.path.splitext(filename)[1].lower() not in _RESIZABLE_EXTS:
+        # never rendered, so never a manifest to look for
+        return {}
+
+    now = time.monotonic()
+    with _manifests_lock:
+        cached = _manifests.get(filename)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    from media import MEDIA_DIR
+
+    try:
+        with open(os.path.join(MEDIA_DIR, manifest_name(filename)), encoding="utf-8") as f:
+            manifest, expires_at = json.load(f), float("inf")
+    except (OSError, ValueError):
+        # not rendered (yet, or ever): nothing to list
+        manifest, expires_at = {}, now + IMAGE_MANIFEST_MISS_SECONDS
+    with _manifests_lock:
+        if len(_manifests) >= _MANIFEST_CACHE_SIZE:
+            _manifests.clear()
+        _manifests[filename] = (manifest, expires_at)
+    return manifest
+
+
+def variant_urls(url: str) -> Dict[str, str]:
+    """
+    Variant URLs for an image served from /media, e.g.
+    {"thumb": "/media/abc_thumb.jpg", "thumb_webp": "/media/abc_thumb.webp", ...}.
+    Only the variants its manifest lists, so empty for external URLs, formats
+    we don't resize and uploads whose variants weren't rendered.
+    """
+    prefix, _, filename = url.rpartition("/")
+    if prefix != "/media" or not filename:
+        return {}
+    return {key: f"{prefix}/{name}" for key, name in _read_manifest(filename).items()}
+
+
+def render_variants(path: str) -> List[str]:
+    """
+    Runs in a worker process: write every width in the original format and
+    as WebP next to the original, then the manifest listing them. Returns
+    the paths written.
+    """
+    from PIL import Image, ImageOps
+
+    directory, filename = os.path.split(path)
+    written = []
+    manifest = {}
+
+    with Image.open(path) as original:
+        # phone photos carry rotation in EXIF; bake it in before resizing
+        image = ImageOps.exif_transpose(original)
+        fmt = original.format
+
+        for variant, width in VARIANT_WIDTHS.items():
+            resized = image.copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+
+            same_format = os.path.join(directory, variant_name(filename, variant))
+            if fmt == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized.convert("RGB").save(same_format, fmt, quality=82, optimize=True)
+            else:
+                resized.save(same_format, fmt, optimize=True)
+            written.append(same_format)
+            manifest[variant] = os.path.basename(same_format)
+
+            webp = os.path.join(directory, variant_name(filename, variant, webp=True))
+            resized.save(webp, "WEBP", quality=80, method=4)
+            written.append(webp)
+            manifest[f"{variant}_webp"] = os.path.basename(webp)
+
+    # last and atomically, so a manifest only ever lists finished files
+    manifest_path = os.path.join(directory, manifest_name(filename))
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    written.append(manifest_path)
+
+    return written
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+async def generate_variants(path: str) -> List[str]:
+    """
+    Resize in the process pool so neither the event loop nor the request
+    threadpool pays for decoding. No-op when variants are disabled.
+    """
+    filename = os.path.basename(path)
+    if not has_variants(filename):
+        return []
+    loop = asyncio.get_running_loop()
+    written = await loop.run_in_executor(_get_pool(), render_variants, path)
+    with _manifests_lock:
+        # a miss cached while it rendered
+        _manifests.pop(filename, None)
+    return written
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+if __name__ == "__main__":
+    # Backfill variants for images uploaded before the pipeline existed:
+    #   python derivatives.py
+    from media import MEDIA_DIR
+
+    suffixes = tuple(f"_{v}" for v in VARIANT_WIDTHS)
+    for name in sorted(os.listdir(MEDIA_DIR)):
+        stem = os.path.splitext(name)[0]
+        if stem.endswith(suffixes) or not has_variants(name):
+            continue
+        path = os.path.join(MEDIA_DIR, name)
+        if os.path.exists(os.path.join(MEDIA_DIR, manifest_name(name))):
+            continue
+        try:
+            render_variants(path)
+            print(f"rendered {name}")
+        except Exception as exc:  # keep going over the rest of the directory
+            print(f"skipped {name}: {exc}")
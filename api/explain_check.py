@@ -0,0 +1,203 @@
+# api/explain_check.py
+#
+# Index regression check: seeds a large dataset, sends one request to every
+# route (the bench_routes.py scenarios), captures the SQL each one runs, and
+# EXPLAINs it. Exits 1 when a statement reads a large table with a full
+# sequential scan or a route goes over its QUERY_BUDGETS entry, so CI can
+# run it after every migration (tests/test_query_plans.py runs the same
+# check on the test dataset):
+#
+#   python explain_check.py                  # scratch SQLite
+#   DATABASE_URL=postgresql+psycopg2://... python explain_check.py --reset
+#
+# SQLite flags a bare "SCAN <table>" in EXPLAIN QUERY PLAN; Postgres flags
+# a "Seq Scan" node. Tables are "large" from --min-rows rows up.
+
+import os
+
+# EXPLAIN replays the captured statements on the sync driver
+os.environ["DB_ASYNC"] = "0"
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+from sqlalchemy import event, func, select, text
+
+import bench_routes  # sets a scratch DATABASE_URL when none is given
+import main
+from database import Base, engine
+
+# Statements that read every live listing on purpose.
+EXPECTED_SCANS = {
+    "public export": "streams the whole feed",
+}
+
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_captured: ContextVar[Optional[List[Tuple[str, object]]]] = ContextVar("explain_captured", default=None)
+
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    statements = _captured.get()
+    if statements is not None and not executemany:
+        statements.append((statement, parameters))
+
+
+def large_tables(min_rows: int) -> Dict[str, int]:
+    sizes = {}
+    with engine.connect() as conn:
+        for table in Base.metadata.sorted_tables:
+            rows = conn.execute(select(func.count()).select_from(table)).scalar()
+            if rows >= min_rows:
+                sizes[table.name] = rows
+    return sizes
+
+
+def analyze() -> None:
+    """
+    Fresh planner statistics, so plans reflect the seeded sizes.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def full_scans(statement: str, parameters, large: Set[str]) -> List[str]:
+    """
+    The large tables this statement reads with a full scan.
+    """
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            found = []
+
+            def walk(node):
+                if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in large:
+                    found.append(node["Relation Name"])
+                for child in node.get("Plans", []):
+                    walk(child)
+
+            walk(plan[0]["Plan"])
+            return found
+
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        found = []
+        for row in rows:
+            match = _SQLITE_SCAN.match(row[-1])
+            if match and match.group(1) in large:
+                found.append(match.group(1))
+        return found
+
+
+async def capture_routes(data: dict) -> List[Tuple[bench_routes.Scenario, int, int, List[Tuple[str, object]]]]:
+    """
+    One request per scenario: (scenario, status, SQL statement count,
+    captured statements).
+    """
+    captured = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://explain", timeout=120) as client:
+        ctx = await bench_routes.start_context(client, data)
+        for scenario in bench_routes.scenarios():
+            spec = scenario.request(ctx, 0)
+            if spec is None:
+                continue
+            if scenario.before:
+                scenario.before()
+            url = spec.pop("url", scenario.path)
+            statements: List[Tuple[str, object]] = []
+            token = _captured.set(statements)
+            try:
+                response = await client.request(scenario.method, url, **spec)
+                await response.aread()
+            finally:
+                _captured.reset(token)
+            count = int(response.headers.get("x-sql-queries", len(statements)))
+            captured.append((scenario, response.status_code, count, statements))
+    return captured
+
+
+async def explain_routes(data: dict, min_rows: int) -> List[str]:
+    """
+    Drive every scenario against the seeded `data` (inside the app's
+    lifespan) and return one message per problem: a full scan of a table
+    with at least `min_rows` rows, or a route over its query budget.
+    """
+    analyze()
+    large = large_tables(min_rows)
+    print(f"large tables: {large}", file=sys.stderr)
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        captured = await capture_routes(data)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    problems = []
+    explained = 0
+    for scenario, status, count, statements in captured:
+        name = scenario.name
+        if status >= 400:
+            print(f"!! {name}: HTTP {status}; its SQL may be incomplete", file=sys.stderr)
+        budget = main.QUERY_BUDGETS.get((scenario.method, scenario.path))
+        if budget is not None and count > budget:
+            problems.append(f"{name}: {scenario.method} {scenario.path} ran {count} SQL statements (budget {budget})")
+
+        seen = set()
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(_EXPLAINABLE) or statement in seen:
+                continue
+            seen.add(statement)
+            explained += 1
+            scans = full_scans(statement, parameters, set(large))
+            if not scans:
+                continue
+            flat = " ".join(statement.split())
+            if name in EXPECTED_SCANS:
+                print(f"ok {name}: scans {', '.join(scans)} ({EXPECTED_SCANS[name]})", file=sys.stderr)
+                continue
+            problems.append(f"{name}: full scan of {', '.join(scans)}\n    {flat[:400]}")
+
+    print(f"{explained} statements explained across {len(captured)} routes", file=sys.stderr)
+    return problems
+
+
+async def check(args) -> int:
+    async with main.app.router.lifespan_context(main.app):
+        data = bench_routes.seed(args, random.Random(args.seed))
+        problems = await explain_routes(data, args.min_rows)
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    print(f"{len(problems)} problems")
+    return 1 if problems else 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Fail when a route's SQL full-scans a large table")
+    parser.add_argument("--brokers", type=int, default=5)
+    parser.add_argument("--agents-per-broker", type=int, default=4)
+    parser.add_argument("--properties", type=int, default=20000)
+    parser.add_argument("--images-per-property", type=int, default=4)
+    parser.add_argument("--min-rows", type=int, default=1000, help="tables this big must not be scanned")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    bench_routes.reset_or_check_empty(args.reset)
+    sys.exit(asyncio.run(check(args)))
+
+
+if __name__ == "__main__":
+    main_cli()
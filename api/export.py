@@ -0,0 +1,122 @@
+# api/export.py
+import csv
+import io
+import os
+from itertools import groupby
+from typing import Dict, Iterator, List
+
+from sqlalchemy import select
+
+import models
+from database import SessionLocal
+from schemas import PropertyOut
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = [
+    "id",
+    "mls_id",
+    "address",
+    "city",
+    "state",
+    "zip_code",
+    "price",
+    "beds",
+    "baths",
+    "sqft",
+    "images",
+]
+
+_PROPERTY_COLUMNS = [
+    models.Property.id,
+    models.Property.mls_id,
+    models.Property.address,
+    models.Property.city,
+    models.Property.state,
+    models.Property.zip_code,
+    models.Property.price,
+    models.Property.beds,
+    models.Property.baths,
+    models.Property.sqft,
+    models.Property.owner_id,
+    models.Property.is_archived,
+]
+
+
+def iter_listing_batches(db) -> Iterator[List[dict]]:
+    """
+    Non-archived listings in id order, EXPORT_BATCH_SIZE at a time, each
+    with its images. Rows come from a server-side cursor (a named cursor on
+    Postgres), and each batch's images are one extra IN query, so memory
+    holds one batch no matter how many listings there are.
+    """
+    result = db.execute(
+        select(*_PROPERTY_COLUMNS)
+        .where(models.Property.is_archived == False)
+        .order_by(models.Property.id),
+        execution_options={"stream_results": True, "yield_per": EXPORT_BATCH_SIZE},
+    )
+
+    for partition in result.partitions():
+        listings = [dict(row._mapping) for row in partition]
+        ids = [listing["id"] for listing in listings]
+
+        images = db.execute(
+            select(models.PropertyImage)
+            .where(models.PropertyImage.property_id.in_(ids))
+            .order_by(
+                models.PropertyImage.property_id,
+                models.PropertyImage.order_index,
+                models.PropertyImage.id,
+            )
+        ).scalars()
+        images_by_property: Dict[int, list] = {
+            property_id: list(group)
+            for property_id, group in groupby(images, key=lambda img: img.property_id)
+        }
+        # the batch's image objects aren't needed once serialized
+        db.expunge_all()
+
+        for listing in listings:
+            listing["images"] = images_by_property.get(listing["id"], [])
+        yield listings
+
+
+def _ndjson_lines(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    for listings in batches:
+        chunk = "".join(PropertyOut.model_validate(l).model_dump_json() + "\n" for l in listings)
+        yield chunk.encode()
+
+
+def _csv_lines(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    for listings in batches:
+        for listing in listings:
+            row = {**listing, "images": "|".join(img.url for img in listing["images"])}
+            writer.writerow([row[column] if row[column] is not None else "" for column in CSV_COLUMNS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_listings(fmt: str, session_factory=SessionLocal) -> Iterator[bytes]:
+    """
+    Body for a StreamingResponse. Sync on purpose: Starlette iterates it in
+    the threadpool, and it owns its session because it outlives the request
+    handler.
+    """
+    db = session_factory()
+    try:
+        batches = iter_listing_batches(db)
+        lines = _ndjson_lines(batches) if fmt == "ndjson" else _csv_lines(batches)
+        yield from lines
+    finally:
+        db.close()
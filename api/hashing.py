@@ -0,0 +1,106 @@
+# api/hashing.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+# pbkdf2_sha256 iterations for new hashes. Stored hashes below this are
+# upgraded the next time their owner logs in.
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+
+# Hashing runs in its own processes so a burst of logins can't starve the
+# request threadpool. 0 hashes in the threadpool instead (the old behaviour).
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Hash jobs allowed running or queued at once; past that, requests get a 503
+# straight away instead of piling up behind the pool.
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(max(PASSWORD_WORKERS, 1) * 8)))
+
+# Pool workers run at a lower CPU priority so, when cores are short, request
+# handling gets scheduled ahead of hashing.
+PASSWORD_WORKER_NICE = int(os.getenv("PASSWORD_WORKER_NICE", "10"))
+
+
+@lru_cache(maxsize=None)
+def pwd_context():
+    """
+    Built on the first hash or verify (in whichever process runs it), so
+    passlib isn't imported at boot.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__rounds=PASSWORD_HASH_ROUNDS,
+    )
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def hash_sync(password: str) -> str:
+    return pwd_context().hash(password)
+
+
+def verify_and_update_sync(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    (matches, replacement hash). The replacement is set when the stored hash
+    uses an older scheme or cost than pwd_context() wants.
+    """
+    return pwd_context().verify_and_update(password, hashed)
+
+
+def _lower_priority() -> None:
+    if PASSWORD_WORKER_NICE and hasattr(os, "nice"):
+        os.nice(PASSWORD_WORKER_NICE)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, initializer=_lower_priority)
+    return _pool
+
+
+async def _submit(fn, *args):
+    global _pending
+    if _pending >= PASSWORD_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-in attempts in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _pending += 1
+    try:
+        if PASSWORD_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(hash_sync, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password off the event loop and the request threadpool.
+    Returns (matches, replacement hash or None), see verify_and_update_sync.
+    """
+    return await _submit(verify_and_update_sync, password, hashed)
+
+
+def shutdown_hash_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
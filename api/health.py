@@ -0,0 +1,127 @@
+# api/health.py
+#
+# Liveness vs readiness, for load balancers and orchestrators:
+#
+#   GET /healthz  the process is up and the event loop answers. Never
+#                 touches the database, so a slow DB doesn't get a healthy
+#                 instance restarted.
+#   GET /readyz   startup finished, the pools have been warmed, and every
+#                 engine answers SELECT 1 right now. 503 until then, so
+#                 traffic is only routed to an instance that can serve it.
+#
+# Warming opens DB_POOL_WARM connections per engine in the background after
+# startup (connect + TLS + auth happen there instead of on the first
+# requests); the instance starts answering /healthz immediately.
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, ExitStack
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger("coastal.health")
+
+# Connections opened per engine by the warm-up (0 = don't warm). Defaults to
+# the pool size, capped there since more would be dropped on check-in.
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", os.getenv("DB_POOL_SIZE", "5")))
+# Longest a /readyz database check may take before it counts as a failure.
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))
+
+
+def _sync_warm(engine, count: int) -> None:
+    # hold every connection until all are open, so each is a new one
+    with ExitStack() as stack:
+        for _ in range(count):
+            conn = stack.enter_context(engine.connect())
+            conn.execute(text("SELECT 1"))
+
+
+async def _async_warm(engine, count: int) -> None:
+    async with AsyncExitStack() as stack:
+        for _ in range(count):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+
+
+def _sync_ping(engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def _async_ping(engine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+class Readiness:
+    """
+    What /readyz reports: whether startup is done, and per engine the
+    outcome of its warm-up.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.startup_complete = False
+        self.ready_after: Optional[float] = None
+        self.engines: List[Tuple[str, object, bool]] = []
+        self.warmed: Dict[str, str] = {}
+
+    def register(self, name: str, engine, is_async: bool = False) -> None:
+        """
+        An engine /readyz checks and the warm-up fills; for an AsyncEngine
+        pass is_async=True.
+        """
+        if engine is not None:
+            self.engines.append((name, engine, is_async))
+            self.warmed[name] = "pending"
+
+    async def warm(self, count: int = DB_POOL_WARM) -> None:
+        """
+        Open `count` connections on every registered engine, then mark
+        startup complete. Run as a task; a failed engine is logged and
+        reported by /readyz, not retried here.
+        """
+        for name, engine, is_async in self.engines:
+            pool_size = getattr(engine.pool, "size", lambda: count)()
+            n = min(count, pool_size)
+            started = time.perf_counter()
+            try:
+                if is_async:
+                    await _async_warm(engine, n)
+                else:
+                    await run_in_threadpool(_sync_warm, engine, n)
+            except Exception as exc:
+                logger.exception("Warming the %s pool failed", name)
+                self.warmed[name] = f"failed: {exc.__class__.__name__}"
+                continue
+            self.warmed[name] = f"{n} connections in {(time.perf_counter() - started) * 1000:.0f} ms"
+        self.startup_complete = True
+        self.ready_after = time.monotonic() - self.started_at
+        logger.info("Ready %.2f s after start", self.ready_after)
+
+    async def check(self) -> Tuple[bool, dict]:
+        """
+        (ready, details) for /readyz: runs SELECT 1 on every engine.
+        """
+        details: dict = {"startup_complete": self.startup_complete, "engines": {}}
+        ready = self.startup_complete
+        for name, engine, is_async in self.engines:
+            ping = _async_ping(engine) if is_async else run_in_threadpool(_sync_ping, engine)
+            try:
+                await asyncio.wait_for(ping, READY_CHECK_TIMEOUT)
+                status = "ok"
+            except asyncio.TimeoutError:
+                status = "timeout"
+                ready = False
+            except Exception as exc:
+                status = f"error: {exc.__class__.__name__}"
+                ready = False
+            details["engines"][name] = {"ping": status, "warm": self.warmed.get(name)}
+        return ready, details
+
+
+readiness = Readiness()
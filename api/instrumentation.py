@@ -0,0 +1,73 @@
+# api/instrumentation.py
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("coastal.sql")
+
+# When set, a request that goes over its query budget fails with a 500
+# instead of only logging. Turn this on in dev and CI.
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "sql_query_counter", default=None
+)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def install_query_counter(engine: Engine) -> None:
+    """
+    Count every statement sent to the DB while a counter is active.
+    """
+    if not event.contains(engine, "before_cursor_execute", _count_statement):
+        event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Usage:
+        with count_queries() as counter:
+            ...
+        counter.count
+    """
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def check_query_budget(
+    budgets: Dict[Tuple[str, str], int],
+    method: str,
+    route_path: str,
+    count: int,
+) -> Optional[str]:
+    """
+    Returns a message when the route went over its budget, otherwise None.
+    """
+    budget = budgets.get((method, route_path))
+    if budget is None or count <= budget:
+        return None
+
+    message = f"{method} {route_path} ran {count} SQL statements (budget {budget})"
+    logger.warning(message)
+    return message
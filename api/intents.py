@@ -0,0 +1,187 @@
+# api/intents.py
+#
+# Rule-driven intent matching for /chat. Rules live in a JSON file
+# (CHAT_INTENTS_FILE) and are compiled into one regex: every keyword and
+# phrase of every intent, merged into a prefix trie, so a message is scanned
+# once and the work per character doesn't grow with the number of rules.
+#
+# Rules file:
+#   {
+#     "fallback": "reply when nothing matches",
+#     "intents": [
+#       {"name": "financing", "priority": 30,
+#        "keywords": ["mortgage", "loan"],       # match at the start of a word
+#        "phrases": ["down payment"],             # any whitespace between words
+#        "reply": "text, may use {matched}"}
+#     ]
+#   }
+#
+# The highest priority intent found in the message wins; ties go to the
+# intent listed first. The file is re-read when its mtime changes.
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger("coastal.chat")
+
+CHAT_INTENTS_FILE = os.getenv(
+    "CHAT_INTENTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_intents.json"),
+)
+# How often (at most) to stat the rules file for changes.
+CHAT_INTENTS_RELOAD_SECONDS = float(os.getenv("CHAT_INTENTS_RELOAD_SECONDS", "2"))
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    priority: int
+    order: int
+    reply: str
+
+
+@dataclass(frozen=True)
+class Match:
+    intent: Intent
+    matched: str
+
+    def render(self) -> str:
+        return self.intent.reply.replace("{matched}", self.matched)
+
+
+def _normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def _trie_pattern(terms: List[str]) -> str:
+    """
+    Regex source matching any of `terms`, as a character trie so shared
+    prefixes are tested once. A space matches any run of whitespace.
+    Longer terms are tried before their prefixes.
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends_here = "" in node
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items())
+            if char != ""
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class CompiledRules:
+    def __init__(self, rules: dict):
+        self.fallback: str = rules.get("fallback", "")
+        self.by_term: Dict[str, Intent] = {}
+
+        for order, spec in enumerate(rules.get("intents", [])):
+            intent = Intent(
+                name=spec["name"],
+                priority=int(spec.get("priority", 0)),
+                order=order,
+                reply=spec["reply"],
+            )
+            for term in [*spec.get("keywords", []), *spec.get("phrases", [])]:
+                term = _normalize(term)
+                if not term:
+                    continue
+                current = self.by_term.get(term)
+                # a term shared by two intents belongs to the stronger one
+                if current is None or _rank(intent) < _rank(current):
+                    self.by_term[term] = intent
+
+        self.pattern: Optional[Pattern] = None
+        if self.by_term:
+            self.pattern = re.compile(r"\b" + _trie_pattern(list(self.by_term)), re.IGNORECASE)
+
+    def match(self, text: str) -> Optional[Match]:
+        if self.pattern is None:
+            return None
+        best: Optional[Match] = None
+        for found in self.pattern.finditer(text):
+            intent = self.by_term.get(_normalize(found.group()))
+            if intent is None:
+                # case-insensitive match whose lowercase differs (e.g. "ß")
+                continue
+            if best is None or _rank(intent) < _rank(best.intent):
+                best = Match(intent, " ".join(found.group().split()))
+        return best
+
+    def reply_for(self, text: str) -> str:
+        found = self.match(text)
+        return found.render() if found else self.fallback
+
+
+def _rank(intent: Intent) -> Tuple[int, int]:
+    return (-intent.priority, intent.order)
+
+
+class IntentMatcher:
+    """
+    CompiledRules for CHAT_INTENTS_FILE, rebuilt when the file changes.
+    A broken edit is logged and the previous rules stay in use.
+    """
+
+    def __init__(self, path: str, reload_seconds: float):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._rules = CompiledRules({})
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self) -> CompiledRules:
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_seconds:
+            with self._lock:
+                if now - self._checked_at >= self.reload_seconds:
+                    self._checked_at = now
+                    self._reload_if_changed()
+        return self._rules
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            logger.warning("Chat intents file %s is missing", self.path)
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._rules = CompiledRules(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.error("Keeping previous chat intents; %s is invalid: %s", self.path, exc)
+        else:
+            logger.info("Loaded %d chat intent terms from %s", len(self._rules.by_term), self.path)
+        self._mtime = mtime
+
+    def match(self, text: str) -> Optional[Match]:
+        return self.rules.match(text)
+
+    def reply_for(self, text: str) -> str:
+        return self.rules.reply_for(text)
+
+
+intent_matcher = IntentMatcher(CHAT_INTENTS_FILE, CHAT_INTENTS_RELOAD_SECONDS)
@@ -0,0 +1,416 @@
+# api/listing_index.py
+#
+# In-memory index of live listings for chat answers like "3 bed in
+# Charleston under 450k". Listings are grouped by (city, beds, price
+# bucket), each group kept sorted by price, so a question merges only the
+# groups that can match, walking buckets outward from the budget, and stops
+# as soon as it has enough hits. Chat never touches the database.
+#
+# The property routes and the MLS importer push their writes in (put /
+# discard / refresh_ids); a full reload every LISTING_INDEX_RELOAD_SECONDS
+# picks up writes made by other workers.
+
+import asyncio
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from heapq import merge
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import models
+from database import SessionLocal
+
+logger = logging.getLogger("coastal.chat")
+
+LISTING_PRICE_BUCKET = 50_000
+# listings with more beds than this share one group
+LISTING_MAX_BEDS_GROUP = 6
+LISTING_INDEX_RELOAD_SECONDS = float(os.getenv("LISTING_INDEX_RELOAD_SECONDS", "300"))
+LISTING_ANSWER_LIMIT = int(os.getenv("LISTING_ANSWER_LIMIT", "3"))
+
+_COLUMNS = (
+    models.Property.id,
+    models.Property.address,
+    models.Property.city,
+    models.Property.beds,
+    models.Property.baths,
+    models.Property.price,
+)
+
+
+@dataclass(frozen=True)
+class ListingSummary:
+    id: int
+    address: str
+    city: str
+    beds: Optional[int]
+    baths: Optional[float]
+    price: Optional[float]
+
+    @classmethod
+    def from_row(cls, row) -> "ListingSummary":
+        return cls(
+            id=row.id,
+            address=row.address,
+            city=row.city,
+            beds=row.beds,
+            baths=float(row.baths) if row.baths is not None else None,
+            price=float(row.price) if row.price is not None else None,
+        )
+
+    @property
+    def bucket(self) -> Optional[int]:
+        return None if self.price is None else int(self.price // LISTING_PRICE_BUCKET)
+
+    @property
+    def beds_group(self) -> int:
+        return min(self.beds or 0, LISTING_MAX_BEDS_GROUP)
+
+    @property
+    def entry(self) -> Tuple[float, int]:
+        return (-(self.price or 0), -self.id)
+
+
+def city_key(name: str) -> str:
+    """
+    How cities are indexed and looked up: lowercased, runs of whitespace
+    collapsed to one space.
+    """
+    return " ".join(name.lower().split())
+
+
+# (city or None for "any city", beds group, price bucket) -> [(-price, -id)]
+# ascending, i.e. most expensive first; unpriced listings are in bucket None
+GroupKey = Tuple[Optional[str], int, Optional[int]]
+
+
+class ListingIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, ListingSummary] = {}
+        self._lists: Dict[GroupKey, List[Tuple[float, int]]] = {}
+        # city (or None) -> sorted bucket numbers that have ever held a listing
+        self._buckets: Dict[Optional[str], List[int]] = {}
+        self._cities: Dict[str, str] = {}
+        self._city_pattern: Optional[Pattern] = None
+        # writes that land while load() is reading, replayed onto its result
+        self._journal: Optional[list] = None
+        self.loaded = False
+
+    # -------- writes --------
+
+    def load(self, db: Session) -> None:
+        """
+        Rebuild from every non-archived listing (one SELECT), then swap in.
+        """
+        with self._lock:
+            self._journal = []
+
+        fresh = ListingIndex()
+        try:
+            rows = db.execute(select(*_COLUMNS).where(models.Property.is_archived == False))
+            for row in rows:
+                fresh._add(ListingSummary.from_row(row))
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            for property_id, summary in self._journal:
+                fresh._remove(property_id)
+                if summary is not None:
+                    fresh._add(summary)
+            self._journal = None
+            self._by_id = fresh._by_id
+            self._lists = fresh._lists
+            self._buckets = fresh._buckets
+            self._cities = fresh._cities
+            self._city_pattern = None
+            self.loaded = True
+
+    def put(self, prop: models.Property) -> None:
+        """
+        Index (or re-index) a listing after a write; archived ones drop out.
+        """
+        if prop.is_archived:
+            self.discard(prop.id)
+            return
+        self._apply(prop.id, ListingSummary.from_row(prop))
+
+    def discard(self, property_id: int) -> None:
+        self._apply(property_id, None)
+
+    def refresh_ids(self, db: Session, property_ids: Iterable[int]) -> None:
+        """
+        Re-read a set of listings, e.g. after a bulk import.
+        """
+        ids = list(property_ids)
+        for start in range(0, len(ids), 1000):
+            chunk = ids[start:start + 1000]
+            rows = db.execute(
+                select(*_COLUMNS, models.Property.is_archived).where(
+                    models.Property.id.in_(chunk)
+                )
+            ).all()
+            live = {row.id: ListingSummary.from_row(row) for row in rows if not row.is_archived}
+            for property_id in chunk:
+                self._apply(property_id, live.get(property_id))
+
+    def _apply(self, property_id: int, summary: Optional[ListingSummary]) -> None:
+        with self._lock:
+            self._remove(property_id)
+            if summary is not None:
+                self._add(summary)
+            if self._journal is not None:
+                self._journal.append((property_id, summary))
+
+    def _add(self, summary: ListingSummary) -> None:
+        self._by_id[summary.id] = summary
+        city = city_key(summary.city)
+        if city not in self._cities:
+            self._cities[city] = " ".join(summary.city.split())
+            self._city_pattern = None
+        for key in (None, city):
+            insort(self._lists.setdefault((key, summary.beds_group, summary.bucket), []), summary.entry)
+            buckets = self._buckets.setdefault(key, [])
+            if summary.bucket is not None and summary.bucket not in buckets:
+                insort(buckets, summary.bucket)
+
+    def _remove(self, property_id: int) -> None:
+        summary = self._by_id.pop(property_id, None)
+        if summary is None:
+            return
+        entry = summary.entry
+        for key in (None, city_key(summary.city)):
+            entries = self._lists.get((key, summary.beds_group, summary.bucket), [])
+            at = bisect_right(entries, entry) - 1
+            if at >= 0 and entries[at] == entry:
+                del entries[at]
+
+    # -------- reads --------
+
+    def find_city(self, text: str) -> Optional[str]:
+        """
+        The indexed city named in `text`, as its city_key(), if any.
+        """
+        with self._lock:
+            if self._city_pattern is None and self._cities:
+                names = sorted(self._cities, key=len, reverse=True)
+                self._city_pattern = re.compile(
+                    r"\b("
+                    + "|".join(r"\s+".join(map(re.escape, n.split())) for n in names)
+                    + r")\b",
+                    re.IGNORECASE,
+                )
+            pattern = self._city_pattern
+        if pattern is None:
+            return None
+        found = pattern.search(text)
+        return city_key(found.group(1)) if found else None
+
+    def city_name(self, city: str) -> str:
+        return self._cities.get(city, city.title())
+
+    def search(
+        self,
+        city: Optional[str] = None,
+        min_beds: Optional[int] = None,
+        max_price: Optional[float] = None,
+        limit: int = LISTING_ANSWER_LIMIT,
+    ) -> List[ListingSummary]:
+        """
+        Listings matching every given filter. With a budget, the priciest
+        ones within it come first; without one, the cheapest.
+        """
+        found: List[ListingSummary] = []
+        with self._lock:
+            buckets = self._buckets.get(city, [])
+            if max_price is not None:
+                top = bisect_right(buckets, int(max_price // LISTING_PRICE_BUCKET))
+                walk = [(b, False) for b in reversed(buckets[:top])]
+            else:
+                walk = [(b, True) for b in buckets] + [(None, True)]
+
+            groups = range(min(min_beds or 0, LISTING_MAX_BEDS_GROUP), LISTING_MAX_BEDS_GROUP + 1)
+            for bucket, cheapest_first in walk:
+                lists = [self._lists.get((city, group, bucket)) for group in groups]
+                if cheapest_first:
+                    candidates = merge(*(reversed(e) for e in lists if e), reverse=True)
+                else:
+                    # each list starts past its over-budget part
+                    candidates = merge(*(
+                        map(e.__getitem__, range(bisect_left(e, (-max_price, float("-inf"))), len(e)))
+                        for e in lists if e
+                    ))
+                for _, neg_id in candidates:
+                    listing = self._by_id[-neg_id]
+                    if min_beds is not None and (listing.beds or 0) < min_beds:
+                        # only possible in the top beds group
+                        continue
+                    found.append(listing)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    # -------- background reload --------
+
+    async def keep_fresh(self, interval: float = LISTING_INDEX_RELOAD_SECONDS) -> None:
+        """
+        Load now, then reload every `interval` seconds. Run as a task.
+        """
+        while True:
+            try:
+                await run_in_threadpool(_load_with_new_session, self)
+            except Exception:
+                logger.exception("Reloading the listing index failed")
+            await asyncio.sleep(interval)
+
+
+def _load_with_new_session(index: ListingIndex) -> None:
+    db = SessionLocal()
+    try:
+        index.load(db)
+    finally:
+        db.close()
+
+
+listing_index = ListingIndex()
+
+
+# -------- Chat answers --------
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+_BEDS = re.compile(
+    r"\b(\d+|one|two|three|four|five|six)\s*\+?\s*-?\s*(?:bed(?:room)?s?|br|bds?)\b",
+    re.IGNORECASE,
+)
+# "up to 4 bedrooms" is a room count, not a price
+_NOT_ROOMS = r"(?!\s*(?:bed(?:room)?s?|br|bds?|bath(?:room)?s?|ba)\b)"
+_AMOUNT = r"(\$)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m|mil|million|thousand)?\b" + _NOT_ROOMS
+_BUDGET = re.compile(
+    r"(?:under|below|less than|max(?:imum)?|up to|budget(?: of| is)?|<)\s*" + _AMOUNT,
+    re.IGNORECASE,
+)
+# without a $ or a k / m suffix, a budget has to look like a home price
+LISTING_MIN_BUDGET = 10_000
+# a bare "$450,000" / "450k" still reads as a budget
+_PRICE = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m|mil|million|thousand)?\b|\b(\d+(?:\.\d+)?)\s*(k|m)\b", re.IGNORECASE)
+_LISTING_WORDS = re.compile(
+    r"\b(?:homes?|houses?|listings?|condos?|townhomes?|properties|for sale|available)\b",
+    re.IGNORECASE,
+)
+# asking to see listings, whatever else the message is about
+_SEARCH_WORDS = re.compile(
+    r"\b(?:find|show me|search|searching|looking for|look for|buy|buying|for sale|available)\b",
+    re.IGNORECASE,
+)
+
+_MULTIPLIERS = {"k": 1_000, "thousand": 1_000, "m": 1_000_000, "mil": 1_000_000, "million": 1_000_000}
+
+
+def _amount(digits: str, suffix: Optional[str]) -> float:
+    return float(digits.replace(",", "")) * _MULTIPLIERS.get((suffix or "").lower(), 1)
+
+
+def _budget(text: str) -> Optional[float]:
+    """
+    The amount after "under" / "up to" / ..., when it reads as money.
+    """
+    for found in _BUDGET.finditer(text):
+        dollar, digits, suffix = found.groups()
+        amount = _amount(digits, suffix)
+        if dollar or suffix or amount >= LISTING_MIN_BUDGET:
+            return amount
+    return None
+
+
+def parse_listing_query(text: str) -> Tuple[Optional[str], Optional[int], Optional[float]]:
+    """
+    (city, min beds, max price) mentioned in a chat message.
+    """
+    beds = None
+    found = _BEDS.search(text)
+    if found:
+        value = found.group(1).lower()
+        beds = _NUMBER_WORDS.get(value) or int(value)
+
+    max_price = _budget(text)
+    if max_price is None:
+        found = _PRICE.search(text)
+        if found:
+            if found.group(1):
+                max_price = _amount(found.group(1), found.group(2))
+            else:
+                max_price = _amount(found.group(3), found.group(4))
+
+    return listing_index.find_city(text), beds, max_price
+
+
+def _money(value: float) -> str:
+    return f"${value:,.0f}"
+
+
+def _asks_for_listings(text: str, city: Optional[str], beds: Optional[int], other_topic: Optional[str]) -> bool:
+    """
+    A bed count or a search word ("find", "show me") always makes a listing
+    search. A listing word ("homes") or a budget ("under 450k") only does
+    when no intent rule matched another topic: "a mortgage for $400,000" or
+    "a loan for a 300k house" are financing questions. A rule matching the
+    city itself ("Charleston") isn't another topic.
+    """
+    if beds is not None or _SEARCH_WORDS.search(text):
+        return True
+    if other_topic and not (city and other_topic.lower() in city):
+        return False
+    return bool(_LISTING_WORDS.search(text)) or _budget(text) is not None
+
+
+def listing_reply(text: str, other_topic: Optional[str] = None) -> Optional[str]:
+    """
+    A reply listing matching homes, or None when the message isn't a
+    listing search (then the intent rules answer instead). `other_topic`
+    is the term an intent rule matched in the message, if any.
+    """
+    city, beds, max_price = parse_listing_query(text)
+    if city is None and beds is None and max_price is None:
+        return None
+    if not _asks_for_listings(text, city, beds, other_topic):
+        return None
+
+    criteria = []
+    if city:
+        criteria.append(f"in {listing_index.city_name(city)}")
+    if beds:
+        criteria.append(f"with {beds}+ beds")
+    if max_price is not None:
+        criteria.append(f"under {_money(max_price)}")
+    described = " ".join(criteria)
+
+    matches = listing_index.search(city=city, min_beds=beds, max_price=max_price)
+    if not matches:
+        return (
+            f"I don't see any listings {described} right now. "
+            "Want me to widen the search, or let you know when one comes up?"
+        )
+
+    lines = [f"Here are a few listings {described}:"]
+    for listing in matches:
+        details = []
+        if listing.beds is not None:
+            details.append(f"{listing.beds} bd")
+        if listing.baths is not None:
+            details.append(f"{listing.baths:g} ba")
+        if listing.price is not None:
+            details.append(_money(listing.price))
+        lines.append(f"• {listing.address}, {listing.city}" + (f" — {', '.join(details)}" if details else ""))
+    lines.append("Want to book a tour of any of these?")
+    return "\n".join(lines)
@@ -1,17 +1,80 @@
 # api/main.py
-from typing import List
-
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+import asyncio
+import anyio
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+from fastapi import (
+    FastAPI,
+    Depends,
+    HTTPException,
+    status,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
-from uuid import uuid4
+from sqlalchemy import case, func, insert, literal, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from database import Base, engine, SessionLocal
+from database import (
+    engine,
+    SessionLocal,
+    async_engine,
+    replica_engine,
+    async_replica_engine,
+    DbRunner,
+    get_db_runner,
+    get_read_db_runner,
+    read_session_factory,
+    note_listing_write,
+    DB_REPLICA_STICKY_SECONDS,
+    READ_PRIMARY_COOKIE,
+)
 import models
-from auth import verify_password, get_password_hash, create_access_token, decode_access_token
+from auth import (
+    create_access_token,
+    decode_access_token,
+    token_claims_for,
+    CurrentUser,
+    user_cache,
+)
+from pagination import encode_cursor, decode_cursor
+from cache import public_cache, property_tag, LISTINGS_TAG
+from permissions import broker_agents, owner_ids_for, get_owned_property
+from media import MAX_UPLOAD_FILES, MEDIA_DIR, MediaFiles, receive_images
+from derivatives import variant_urls, shutdown_pool
+from hashing import hash_password, verify_password, shutdown_hash_pool
+from search import search_property_ids
+from schema import DB_MIGRATE_ON_STARTUP, migrate
+from health import readiness
+from mls_import import IMPORT_FORMATS, import_listings
+from export import EXPORT_MEDIA_TYPES, export_listings
+from chat_log import CHAT_MESSAGE_MAX_CHARS, chat_log
+from listing_index import listing_index
+from listing_stats import StatsDelta, broker_stats, listing_state
+from maintenance import MAINTENANCE_INTERVAL_SECONDS, keep_maintained
+from chat_stream import ReplyGenerator, get_reply_generator, generate_reply, sse_event
+from instrumentation import (
+    QUERY_BUDGET_STRICT,
+    install_query_counter,
+    count_queries,
+    check_query_budget,
+)
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    METRICS_ENABLED,
+    MetricsMiddleware,
+    instrument_engine,
+    render as render_metrics,
+    timed_phase,
+)
 from schemas import (
     UserCreate,
     UserUpdate,
@@ -22,18 +85,22 @@ from schemas import (
     PropertyOut,
     PropertyImageCreate,
     PropertyImageOut,
+    PropertyImageOrder,
+    ImportReport,
+    BrokerStatsOut,
+    ChatSessionOut,
+    ChatMessageOut,
 )
 
 from typing import List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
 app = FastAPI()
 
-MEDIA_DIR = "media"
 os.makedirs(MEDIA_DIR, exist_ok=True)
 
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+app.mount("/media", MediaFiles(directory=MEDIA_DIR), name="media")
 
 origins = [
     "http://localhost:3000",
@@ -47,15 +114,147 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-SQL-Queries", "ETag"],
 )
 
 
+# -------- SQL query budgets --------
+
+# Max SQL statements per request for the PropertyOut read paths.
+# Going over logs a warning (or fails the request with QUERY_BUDGET_STRICT=1),
+# so an N+1 on images can't silently come back. tests/test_query_budgets.py
+# holds every route here to its budget on a seeded dataset.
+#
+# List pages are capped at PROPERTY_PAGE_MAX listings so their images come
+# back in one selectin query (SQLAlchemy loads them IN chunks of 500 ids).
+PROPERTY_PAGE_MAX = 200
+
+QUERY_BUDGETS = {
+    ("GET", "/public/properties"): 2,
+    ("GET", "/public/properties/{property_id}"): 2,
+    ("GET", "/public/properties/search"): 3,
+    # page + images, plus cold user and broker-agent caches
+    ("GET", "/properties"): 4,
+    ("GET", "/properties/{property_id}"): 4,
+    # aggregate rows + owner emails, whatever the listing count
+    ("GET", "/brokers/me/stats"): 4,
+}
+
+install_query_counter(engine)
+if async_engine is not None:
+    install_query_counter(async_engine.sync_engine)
+if replica_engine is not None:
+    install_query_counter(replica_engine)
+if async_replica_engine is not None:
+    install_query_counter(async_replica_engine.sync_engine)
+
+
+@app.middleware("http")
+async def count_sql_queries(request: Request, call_next):
+    with count_queries() as counter:
+        response = await call_next(request)
+
+    response.headers["X-SQL-Queries"] = str(counter.count)
+
+    route = request.scope.get("route")
+    if route is not None:
+        violation = check_query_budget(
+            QUERY_BUDGETS, request.method, route.path, counter.count
+        )
+        if violation and QUERY_BUDGET_STRICT:
+            return JSONResponse(status_code=500, content={"detail": violation})
+
+    return response
+
+
+# -------- Metrics --------
+
+instrument_engine(engine, "primary")
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, "async")
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
+if async_replica_engine is not None:
+    instrument_engine(async_replica_engine.sync_engine, "async_replica")
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """
+        Prometheus text format: route latency, SQL timing, pool stats.
+        """
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+# -------- Health --------
+
+readiness.register("primary", engine)
+readiness.register("replica", replica_engine)
+readiness.register("async", async_engine, is_async=True)
+readiness.register("async_replica", async_replica_engine, is_async=True)
+
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """
+    Liveness: the process answers. No database access.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """
+    Readiness: startup and pool warm-up are done and every database answers.
+    """
+    ready, details = await readiness.check()
+    return JSONResponse(status_code=200 if ready else 503, content=details)
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    # versioned migrations (migrations/); a no-op once the schema is current.
+    # DB_MIGRATE_ON_STARTUP=0 leaves that to the deploy and boots without
+    # touching the database.
+    if DB_MIGRATE_ON_STARTUP:
+        migrate(engine)
+
+
+background_tasks: List[asyncio.Task] = []
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # the chat write-behind flusher, outside any request's context
+    chat_log.start()
+    # loads the chat listing index off the startup path, then keeps it fresh
+    background_tasks.append(asyncio.create_task(listing_index.keep_fresh()))
+    # opens pool connections while /healthz is already being served
+    background_tasks.append(asyncio.create_task(readiness.warm()))
+    if MAINTENANCE_INTERVAL_SECONDS > 0:
+        # archive compaction + orphaned-media sweep (maintenance.py)
+        background_tasks.append(asyncio.create_task(keep_maintained(engine)))
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    # let them let go of pool connections before the engines are disposed
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    shutdown_pool()
+    shutdown_hash_pool()
+    await chat_log.close()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
 
 
 def get_db():
@@ -72,10 +271,38 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> models.User:
+    runner: DbRunner = Depends(get_db_runner),
+) -> CurrentUser:
+    """
+    Resolves the bearer token to a cached snapshot of an active user.
+    Only a cache miss (first request, TTL expiry, or a user edit) hits the DB,
+    through the same runner (and, for DbRunner routes, the same session) as
+    the route's own queries, so it follows DB_ASYNC like they do.
+    """
+    with timed_phase("auth"):
+        return await resolve_user(token, runner)
+
+
+def load_current_user(db: Session, user_id: Optional[int], email: str) -> Optional[CurrentUser]:
+    if user_id is not None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+    else:
+        # tokens issued before uid was added to the claims
+        user = get_user_by_email(db, email=email)
+    if user is None or not user.is_active:
+        return None
+    return CurrentUser.from_model(user)
+
+
+async def resolve_user(token: str, runner: DbRunner) -> CurrentUser:
+    """
+    The user is built from the token's claims. The cached (or, on a miss,
+    loaded) snapshot only confirms they're still active and unchanged: a
+    token whose role, broker or email no longer match is refused, so a
+    demoted or moved user has to log in again.
+    """
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(
@@ -83,23 +310,37 @@ def get_current_user(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    user_id: Optional[int] = payload.get("uid")
     email: str = payload.get("sub")
-    if email is None:
+    if user_id is None and email is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
-
-    user = get_user_by_email(db, email=email)
-    if user is None or not user.is_active:
+    claimed = CurrentUser.from_claims(payload)
+
+    current_user = user_cache.get(user_id) if user_id is not None else None
+    if current_user is None:
+        current_user = await runner.run(load_current_user, user_id, email)
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Inactive or unknown user",
+            )
+        user_cache.set(current_user)
+
+    if claimed is None:
+        return current_user
+    if claimed != current_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Inactive or unknown user",
+            detail="Token is out of date, log in again",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    return claimed
 
 
-def require_broker(current_user: models.User = Depends(get_current_user)) -> models.User:
+def require_broker(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != "broker":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -109,8 +350,8 @@ def require_broker(current_user: models.User = Depends(get_current_user)) -> mod
 
 
 def require_broker_or_agent(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
     if current_user.role not in ("broker", "agent"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -122,51 +363,87 @@ def require_broker_or_agent(
 # -------- Auth routes --------
 
 @app.post("/auth/register", response_model=UserOut)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register_user(
+    user_in: UserCreate,
+    runner: DbRunner = Depends(get_db_runner),
+):
     """
     For now, open registration. In prod, you might:
       - only allow first user
       - or require an invite code
     """
-    existing = get_user_by_email(db, user_in.email)
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    # If registering as agent without broker_id, you can enforce rules here
-    if user_in.role == "agent" and user_in.broker_id is None:
-        # optional: require broker assignment
-        pass
+    hashed_password = await hash_password(user_in.password)
+
+    def run(db: Session):
+        existing = get_user_by_email(db, user_in.email)
+        if existing:
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        # If registering as agent without broker_id, you can enforce rules here
+        if user_in.role == "agent" and user_in.broker_id is None:
+            # optional: require broker assignment
+            pass
+
+        user = models.User(
+            email=user_in.email,
+            hashed_password=hashed_password,
+            role=user_in.role,
+            broker_id=user_in.broker_id,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        broker_agents.invalidate(user.broker_id)
+        return UserOut.model_validate(user)
 
-    user = models.User(
-        email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
-        role=user_in.role,
-        broker_id=user_in.broker_id,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await runner.run(run)
 
 
 @app.post("/auth/login", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    runner: DbRunner = Depends(get_db_runner),
 ):
-    user = get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    def find_user(db: Session):
+        user = get_user_by_email(db, form_data.username)
+        found = user and (user.id, user.hashed_password, token_claims_for(user))
+        # hand the connection back to the pool while the hash runs
+        db.rollback()
+        return found
+
+    found = await runner.run(find_user)
+    matches, new_hash = (False, None)
+    if found:
+        user_id, stored_hash, claims = found
+        matches, new_hash = await verify_password(form_data.password, stored_hash)
+
+    if not matches:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect email or password",
         )
 
-    access_token = create_access_token(data={"sub": user.email})
+    if new_hash:
+        # stored with an older cost; upgrade now that we have the password
+        def rehash(db: Session):
+            db.execute(
+                update(models.User)
+                .where(
+                    models.User.id == user_id,
+                    models.User.hashed_password == stored_hash,
+                )
+                .values(hashed_password=new_hash)
+            )
+            db.commit()
+
+        await runner.run(rehash)
+
+    access_token = create_access_token(data=claims)
     return Token(access_token=access_token)
 
 
 @app.get("/auth/me", response_model=UserOut)
-def read_current_user(current_user: models.User = Depends(get_current_user)):
+def read_current_user(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
 
 
@@ -175,7 +452,7 @@ def read_current_user(current_user: models.User = Depends(get_current_user)):
 @app.get("/users", response_model=List[UserOut])
 def list_users(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker),
+    current_user: CurrentUser = Depends(require_broker),
 ):
     """
     Brokers see themselves + their agents.
@@ -193,40 +470,46 @@ def list_users(
 
 
 @app.post("/users", response_model=UserOut)
-def create_user(
+async def create_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker),
 ):
     """
     Broker creates users (usually agents).
     Force agents to belong to this broker.
     """
-    existing = get_user_by_email(db, user_in.email)
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_password = await hash_password(user_in.password)
+
+    def run(db: Session):
+        existing = get_user_by_email(db, user_in.email)
+        if existing:
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        broker_id = user_in.broker_id
+        if user_in.role == "agent":
+            broker_id = current_user.id  # agents belong to the logged-in broker
+
+        user = models.User(
+            email=user_in.email,
+            hashed_password=hashed_password,
+            role=user_in.role,
+            broker_id=broker_id,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        broker_agents.invalidate(user.broker_id)
+        return UserOut.model_validate(user)
 
-    broker_id = user_in.broker_id
-    if user_in.role == "agent":
-        broker_id = current_user.id  # agents belong to the logged-in broker
-
-    user = models.User(
-        email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
-        role=user_in.role,
-        broker_id=broker_id,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await runner.run(run)
 
 
 @app.get("/users/{user_id}", response_model=UserOut)
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker),
+    current_user: CurrentUser = Depends(require_broker),
 ):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
@@ -240,40 +523,56 @@ def get_user(
 
 
 @app.put("/users/{user_id}", response_model=UserOut)
-def update_user(
+async def update_user(
     user_id: int,
     user_in: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker),
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if user.id != current_user.id and user.broker_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed to update this user")
-
-    if user_in.email is not None:
-        user.email = user_in.email
-    if user_in.role is not None:
-        user.role = user_in.role
-    if user_in.broker_id is not None:
-        user.broker_id = user_in.broker_id
-    if user_in.is_active is not None:
-        user.is_active = user_in.is_active
+    hashed_password = None
     if user_in.password is not None:
-        user.hashed_password = get_password_hash(user_in.password)
-
-    db.commit()
-    db.refresh(user)
-    return user
+        hashed_password = await hash_password(user_in.password)
+
+    def run(db: Session):
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        if user.id != current_user.id and user.broker_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not allowed to update this user")
+
+        if user_in.email is not None:
+            user.email = user_in.email
+        if user_in.role is not None:
+            user.role = user_in.role
+        moved_between = ()
+        if user_in.broker_id is not None and user_in.broker_id != user.broker_id:
+            # the agent moves between brokers' ownership sets
+            moved_between = (user.broker_id, user_in.broker_id)
+            user.broker_id = user_in.broker_id
+        if user_in.is_active is not None:
+            user.is_active = user_in.is_active
+        if hashed_password is not None:
+            user.hashed_password = hashed_password
+
+        try:
+            db.commit()
+        finally:
+            # only once the commit has settled: a read in between would cache
+            # the old sets again, and a failed commit leaves them unknown
+            broker_agents.invalidate(*moved_between)
+            user_cache.invalidate(user_id)
+        db.refresh(user)
+        return UserOut.model_validate(user)
+
+    return await runner.run(run)
 
 
 @app.delete("/users/{user_id}", status_code=204)
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker),
+    current_user: CurrentUser = Depends(require_broker),
 ):
     """
     Soft delete: set is_active = False
@@ -287,337 +586,791 @@ def delete_user(
 
     user.is_active = False
     db.commit()
+    user_cache.invalidate(user.id)
     return None
 
 
 # -------- Properties CRUD --------
 
+# Listing responses are serialized with these, off the event loop. Public
+# ones are cached as serialized JSON; the writes below invalidate them.
+property_list_adapter = TypeAdapter(List[PropertyOut])
+property_adapter = TypeAdapter(PropertyOut)
+
+
+async def dump_json(adapter: TypeAdapter, value) -> bytes:
+    """
+    Validate and serialize `value` in the threadpool: a page of listings
+    with their galleries (and image manifests) is too much CPU to spend on
+    the event loop.
+    """
+    return await run_in_threadpool(lambda: adapter.dump_json(adapter.validate_python(value)))
+
+
+async def read_your_writes(response: Response):
+    """
+    Dependency for listing writes. When a replica is configured, the
+    writer's public reads go to the primary for DB_REPLICA_STICKY_SECONDS
+    (cookie), and so do this process's public cache refills.
+    """
+    note_listing_write()
+    if replica_engine is not None:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=max(1, round(DB_REPLICA_STICKY_SECONDS)),
+            httponly=True,
+            samesite="lax",
+        )
+    yield
+    # the window runs from the end of the write, however long it took
+    note_listing_write()
+
+
+def save_property(db: Session, flush_only: bool = False) -> None:
+    """
+    Flush or commit a property write, turning a duplicate mls_id (unique
+    since bulk import upserts on it) into a 400 instead of a 500.
+    """
+    try:
+        db.flush() if flush_only else db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="MLS id already exists")
+
+
+def newest_first_page(query, after, limit: int):
+    """
+    One keyset page of a Property query, newest first on (created_at, id),
+    plus one extra row to tell whether there is a next page.
+    """
+    if after is not None:
+        after_created_at, after_id = after
+        query = query.filter(
+            tuple_(models.Property.created_at, models.Property.id)
+            < tuple_(literal(after_created_at, models.Property.created_at.type), after_id)
+        )
+    return (
+        query.order_by(models.Property.created_at.desc(), models.Property.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+
+def parse_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_page_headers(props: list, limit: int) -> dict:
+    """
+    Trims the extra row newest_first_page() fetched (in place) and returns
+    the X-Next-Cursor header when it was there.
+    """
+    if len(props) <= limit:
+        return {}
+    del props[limit:]
+    last = props[-1]
+    return {"X-Next-Cursor": encode_cursor(last.created_at, last.id)}
+
+
 @app.get("/properties", response_model=List[PropertyOut])
-def list_properties(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+async def list_properties(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=PROPERTY_PAGE_MAX),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
     """
     Brokers: all properties owned by themselves or their agents.
     Agents: only their own properties.
+
+    Newest first, keyset-paginated like /public/properties: the next page's
+    cursor comes back in X-Next-Cursor.
     """
-    query = db.query(models.Property).filter(models.Property.is_archived == False)
+    after = parse_cursor(cursor)
 
-    if current_user.role == "broker":
-        # properties owned by broker or any of their agents
-        agent_ids = (
-            db.query(models.User.id)
-            .filter(models.User.broker_id == current_user.id)
-            .subquery()
-        )
-        query = query.filter(
-            (models.Property.owner_id == current_user.id)
-            | (models.Property.owner_id.in_(agent_ids))
+    def run(db: Session):
+        query = db.query(models.Property).filter(
+            models.Property.is_archived == False,
+            models.Property.owner_id.in_(owner_ids_for(db, current_user)),
         )
-    else:
-        # agent
-        query = query.filter(models.Property.owner_id == current_user.id)
-
-    props = query.order_by(models.Property.created_at.desc()).all()
-    return props
+        return newest_first_page(query, after, limit)
+
+    props = await runner.run(run)
+    headers = next_page_headers(props, limit)
+    return Response(
+        await dump_json(property_list_adapter, props),
+        media_type="application/json",
+        headers=headers,
+    )
 
 
-@app.post("/properties", response_model=PropertyOut)
-def create_property(
+@app.post(
+    "/properties",
+    response_model=PropertyOut,
+    dependencies=[Depends(read_your_writes)],
+)
+async def create_property(
     property_in: PropertyCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
+    def run(db: Session):
+        images_data = property_in.images or []
+        prop_data = property_in.model_dump(exclude={"images"})
 
-    images_data = property_in.images or []
-    prop_data = property_in.model_dump(exclude={"images"})
+        prop = models.Property(
+            **prop_data,
+            owner_id=current_user.id,
+        )
+        db.add(prop)
+        save_property(db, flush_only=True)
 
-    prop = models.Property(
-        **prop_data,
-        owner_id=current_user.id,
-    )
-    db.add(prop)
-    db.flush()
-
-    for img in images_data:
-        img_obj = models.PropertyImage(
-            property_id=prop.id,
-            url=img.url,
-            caption=img.caption,
-            order_index=img.order_index,
+        insert_images(db, prop.id, images_data)
+
+        stats = StatsDelta()
+        stats.add(*listing_state(prop))
+        stats.apply(db)
+
+        save_property(db)
+        db.refresh(prop)
+        public_cache.invalidate(LISTINGS_TAG)
+        listing_index.put(prop)
+        return prop
+
+    return await runner.run(run)
+
+
+def insert_images(
+    db: Session,
+    property_id: int,
+    images_in: List[PropertyImageCreate],
+) -> List[models.PropertyImage]:
+    """
+    One multi-row INSERT ... RETURNING for a whole gallery; the returned
+    objects already carry their ids.
+    """
+    if not images_in:
+        return []
+
+    rows = [
+        {
+            "property_id": property_id,
+            "url": img.url,
+            "caption": img.caption,
+            "order_index": img.order_index,
+        }
+        for img in images_in
+    ]
+    created = db.scalars(insert(models.PropertyImage).returning(models.PropertyImage), rows)
+    return sorted(created, key=lambda img: img.id)
+
+
+@app.post(
+    "/properties/import",
+    response_model=ImportReport,
+    dependencies=[Depends(read_your_writes)],
+)
+async def import_properties(
+    request: Request,
+    current_user: CurrentUser = Depends(require_broker_or_agent),
+):
+    """
+    Bulk MLS import. Send the feed as text/csv (header row, images as
+    space- or |-separated URLs) or application/x-ndjson (one listing per
+    line). Rows are upserted on mls_id in batches; rows that fail are
+    listed in the report and don't stop the rest.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = IMPORT_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Send the feed as text/csv or application/x-ndjson",
         )
-        db.add(img_obj)
 
-    db.commit()
-    db.refresh(prop)
-    return prop
+    return await run_in_threadpool(import_listings, request.stream(), fmt, current_user)
 
 
 @app.get("/properties/{property_id}", response_model=PropertyOut)
-def get_property(
+async def get_property(
     property_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
-    prop = db.query(models.Property).filter(models.Property.id == property_id).first()
-    if not prop or prop.is_archived:
-        raise HTTPException(status_code=404, detail="Property not found")
-
-    
-    if current_user.role == "broker":
-        agent_ids = (
-            db.query(models.User.id)
-            .filter(models.User.broker_id == current_user.id)
-            .subquery()
-        )
-        if prop.owner_id not in [current_user.id] and prop.owner_id not in [
-            r[0] for r in db.query(models.User.id).filter(models.User.broker_id == current_user.id)
-        ]:
-            raise HTTPException(status_code=403, detail="Not allowed to access this property")
-    else:
-        if prop.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not allowed to access this property")
+    def run(db: Session):
+        return get_owned_property(db, property_id, current_user, action="access")
 
-    return prop
+    return await runner.run(run)
 
 
-@app.put("/properties/{property_id}", response_model=PropertyOut)
-def update_property(
+@app.put(
+    "/properties/{property_id}",
+    response_model=PropertyOut,
+    dependencies=[Depends(read_your_writes)],
+)
+async def update_property(
     property_id: int,
     property_in: PropertyUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
-    prop = db.query(models.Property).filter(models.Property.id == property_id).first()
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
-
-    # same permission logic as get_property
-    if current_user.role == "broker":
-        agent_ids = (
-            db.query(models.User.id)
-            .filter(models.User.broker_id == current_user.id)
-            .subquery()
+    def run(db: Session):
+        # archived listings can still be edited (e.g. un-archived); locked
+        # so a concurrent edit can't change `before` under the stats delta
+        prop = get_owned_property(
+            db,
+            property_id,
+            current_user,
+            action="update",
+            allow_archived=True,
+            for_update=True,
         )
-        # quick check: owner is broker or one of their agents
-        if prop.owner_id != current_user.id and not db.query(models.User).filter(
-            models.User.id == prop.owner_id,
-            models.User.broker_id == current_user.id,
-        ).first():
-            raise HTTPException(status_code=403, detail="Not allowed to update this property")
-    else:
-        if prop.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not allowed to update this property")
 
-    data = property_in.model_dump(exclude_unset=True)
-    for field, value in data.items():
-        setattr(prop, field, value)
+        before = listing_state(prop)
+        was_archived = bool(prop.is_archived)
+        data = property_in.model_dump(exclude_unset=True)
+        for field, value in data.items():
+            setattr(prop, field, value)
 
-    db.commit()
-    db.refresh(prop)
-    return prop
+        if bool(prop.is_archived) != was_archived:
+            # starts (or cancels) the countdown to properties_archive
+            prop.archived_at = func.now() if prop.is_archived else None
+
+        stats = StatsDelta()
+        stats.replace(before, listing_state(prop))
+        stats.apply(db)
 
+        save_property(db)
+        db.refresh(prop)
+        # edits can move a listing in or out of any filtered page
+        public_cache.invalidate(LISTINGS_TAG, property_tag(prop.id))
+        listing_index.put(prop)
+        return prop
 
-@app.delete("/properties/{property_id}", status_code=204)
-def delete_property(
+    return await runner.run(run)
+
+
+@app.delete(
+    "/properties/{property_id}",
+    status_code=204,
+    dependencies=[Depends(read_your_writes)],
+)
+async def delete_property(
     property_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
-    prop = db.query(models.Property).filter(models.Property.id == property_id).first()
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
+    def run(db: Session):
+        prop = get_owned_property(
+            db,
+            property_id,
+            current_user,
+            action="delete",
+            allow_archived=True,
+            load_images=False,
+            for_update=True,
+        )
 
-    # same permission logic
-    if current_user.role == "broker":
-        if prop.owner_id != current_user.id and not db.query(models.User).filter(
-            models.User.id == prop.owner_id,
-            models.User.broker_id == current_user.id,
-        ).first():
-            raise HTTPException(status_code=403, detail="Not allowed to delete this property")
-    else:
-        if prop.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not allowed to delete this property")
+        stats = StatsDelta()
+        stats.remove(*listing_state(prop))
+        stats.apply(db)
+
+        if not prop.is_archived:
+            prop.is_archived = True
+            prop.archived_at = func.now()
+        db.commit()
+        # only pages that contained this listing change
+        public_cache.invalidate(property_tag(prop.id))
+        listing_index.discard(prop.id)
+        return None
+
+    return await runner.run(run)
 
-    prop.is_archived = True
-    db.commit()
-    return None
 
 @app.post(
     "/properties/{property_id}/images",
     response_model=List[PropertyImageOut],
+    dependencies=[Depends(read_your_writes)],
 )
-def add_property_images(
+async def add_property_images(
     property_id: int,
     images_in: List[PropertyImageCreate],
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
-    prop = db.query(models.Property).filter(models.Property.id == property_id).first()
-    if not prop or prop.is_archived:
-        raise HTTPException(status_code=404, detail="Property not found")
+    def run(db: Session):
+        prop = get_owned_property(
+            db, property_id, current_user, action="modify", load_images=False
+        )
 
-    # Same permission logic as update_property
-    if current_user.role == "broker":
-        if prop.owner_id != current_user.id and not db.query(models.User).filter(
-            models.User.id == prop.owner_id,
-            models.User.broker_id == current_user.id,
-        ).first():
-            raise HTTPException(status_code=403, detail="Not allowed to modify this property")
-    else:
-        if prop.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not allowed to modify this property")
+        created_images = [
+            PropertyImageOut.model_validate(img)
+            for img in insert_images(db, prop.id, images_in)
+        ]
+
+        db.commit()
+        public_cache.invalidate(property_tag(prop.id))
+
+        return created_images
 
-    created_images: List[models.PropertyImage] = []
+    return await runner.run(run)
+
+
+@app.put(
+    "/properties/{property_id}/images/order",
+    response_model=List[PropertyImageOut],
+    dependencies=[Depends(read_your_writes)],
+)
+async def reorder_property_images(
+    property_id: int,
+    order_in: PropertyImageOrder,
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
+):
+    """
+    Rewrite order_index for the whole gallery in one UPDATE: listed images
+    get 0..n-1 in the order given, any unlisted ones keep their relative
+    order after them.
+    """
+    image_ids = order_in.image_ids
+    if len(set(image_ids)) != len(image_ids):
+        raise HTTPException(status_code=400, detail="Duplicate image ids")
 
-    for img in images_in:
-        img_obj = models.PropertyImage(
-            property_id=prop.id,
-            url=img.url,
-            caption=img.caption,
-            order_index=img.order_index,
+    def run(db: Session):
+        prop = get_owned_property(
+            db, property_id, current_user, action="modify", load_images=False
         )
-        db.add(img_obj)
-        created_images.append(img_obj)
 
-    db.commit()
-    # refresh from DB to include IDs
-    for img_obj in created_images:
-        db.refresh(img_obj)
+        position = {image_id: index for index, image_id in enumerate(image_ids)}
+        new_index = models.PropertyImage.order_index + len(image_ids)
+        if position:
+            new_index = case(position, value=models.PropertyImage.id, else_=new_index)
+
+        gallery = list(
+            db.scalars(
+                update(models.PropertyImage)
+                .where(models.PropertyImage.property_id == prop.id)
+                .values(order_index=func.coalesce(new_index, len(image_ids)))
+                .returning(models.PropertyImage),
+                execution_options={"synchronize_session": False},
+            )
+        )
+
+        if not set(image_ids) <= {img.id for img in gallery}:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Image not in this gallery")
+
+        result = sorted(
+            (PropertyImageOut.model_validate(img) for img in gallery),
+            key=lambda img: (img.order_index, img.id),
+        )
+        db.commit()
+        public_cache.invalidate(property_tag(prop.id))
+        return result
+
+    return await runner.run(run)
 
-    return created_images
 
 @app.delete(
     "/properties/{property_id}/images/{image_id}",
     status_code=204,
+    dependencies=[Depends(read_your_writes)],
 )
-def delete_property_image(
+async def delete_property_image(
     property_id: int,
     image_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_broker_or_agent),
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker_or_agent),
 ):
-    prop = db.query(models.Property).filter(models.Property.id == property_id).first()
-    if not prop or prop.is_archived:
-        raise HTTPException(status_code=404, detail="Property not found")
-
-    # permission check as before
-    if current_user.role == "broker":
-        if prop.owner_id != current_user.id and not db.query(models.User).filter(
-            models.User.id == prop.owner_id,
-            models.User.broker_id == current_user.id,
-        ).first():
-            raise HTTPException(status_code=403, detail="Not allowed to modify this property")
-    else:
-        if prop.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not allowed to modify this property")
+    def run(db: Session):
+        prop = get_owned_property(
+            db, property_id, current_user, action="modify", load_images=False
+        )
 
-    image = (
-        db.query(models.PropertyImage)
-        .filter(
-            models.PropertyImage.id == image_id,
-            models.PropertyImage.property_id == property_id,
+        image = (
+            db.query(models.PropertyImage)
+            .filter(
+                models.PropertyImage.id == image_id,
+                models.PropertyImage.property_id == property_id,
+            )
+            .first()
         )
-        .first()
-    )
 
-    if not image:
-        raise HTTPException(status_code=404, detail="Image not found")
+        if not image:
+            raise HTTPException(status_code=404, detail="Image not found")
 
-    db.delete(image)
-    db.commit()
-    return None
+        db.delete(image)
+        db.commit()
+        public_cache.invalidate(property_tag(prop.id))
+        return None
+
+    return await runner.run(run)
+
+
+# -------- Broker dashboard --------
+
+@app.get("/brokers/me/stats", response_model=BrokerStatsOut)
+async def get_broker_stats(
+    runner: DbRunner = Depends(get_db_runner),
+    current_user: CurrentUser = Depends(require_broker),
+):
+    """
+    Counts, average and median price of the live listings of the broker and
+    their agents, overall, by city and by agent. Read from the listing_stats
+    aggregate, so the cost doesn't grow with the number of listings.
+    """
+    def run(db: Session):
+        return broker_stats(db, owner_ids_for(db, current_user))
+
+    return await runner.run(run)
 
 
 # -------- Public Listings (no auth) --------
 
 @app.get("/public/properties", response_model=List[PropertyOut])
-def list_public_properties(db: Session = Depends(get_db)):
+async def list_public_properties(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=PROPERTY_PAGE_MAX),
+    city: Optional[str] = None,
+    zip_code: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_beds: Optional[int] = Query(None, ge=0),
+    min_baths: Optional[float] = Query(None, ge=0),
+    min_sqft: Optional[int] = Query(None, ge=0),
+    runner: DbRunner = Depends(get_read_db_runner),
+):
     """
     Public-facing listings:
     - all non-archived properties
     - regardless of owner
+    - newest first, keyset-paginated on (created_at, id)
+
+    When more rows exist, the cursor for the next page is returned in the
+    X-Next-Cursor header; pass it back as ?cursor=... to continue.
+    Responses carry a strong ETag and answer If-None-Match with a 304.
     """
-    props = (
-        db.query(models.Property)
-        .filter(models.Property.is_archived == False)
-        .order_by(models.Property.created_at.desc())
-        .all()
+    cache_key = public_cache.key_for(request)
+    cached = public_cache.get(cache_key)
+    if cached is not None:
+        return cached.to_response(request)
+    generation = public_cache.generation()
+
+    after = parse_cursor(cursor)
+
+    def run(db: Session):
+        query = db.query(models.Property).filter(models.Property.is_archived == False)
+
+        if city:
+            query = query.filter(func.lower(models.Property.city) == city.strip().lower())
+        if zip_code:
+            query = query.filter(models.Property.zip_code == zip_code.strip())
+        if min_price is not None:
+            query = query.filter(models.Property.price >= min_price)
+        if max_price is not None:
+            query = query.filter(models.Property.price <= max_price)
+        if min_beds is not None:
+            query = query.filter(models.Property.beds >= min_beds)
+        if min_baths is not None:
+            query = query.filter(models.Property.baths >= min_baths)
+        if min_sqft is not None:
+            query = query.filter(models.Property.sqft >= min_sqft)
+
+        return newest_first_page(query, after, limit)
+
+    props = await runner.run(run)
+    headers = next_page_headers(props, limit)
+
+    body = await dump_json(property_list_adapter, props)
+    cached = public_cache.set(
+        cache_key,
+        body,
+        headers,
+        tags=[LISTINGS_TAG, *(property_tag(p.id) for p in props)],
+        generation=generation,
+    )
+    return cached.to_response(request)
+
+
+@app.get("/public/properties/search", response_model=List[PropertyOut])
+async def search_public_properties(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    runner: DbRunner = Depends(get_read_db_runner),
+):
+    """
+    Ranked, typo-tolerant search over address, city, zip and MLS id.
+    Only non-archived listings; best match first.
+    """
+    cache_key = public_cache.key_for(request)
+    cached = public_cache.get(cache_key)
+    if cached is not None:
+        return cached.to_response(request)
+    generation = public_cache.generation()
+
+    def run(db: Session):
+        ids = search_property_ids(db, q.strip(), limit)
+        if not ids:
+            return []
+        by_id = {
+            p.id: p
+            for p in db.query(models.Property).filter(models.Property.id.in_(ids))
+        }
+        return [by_id[i] for i in ids if i in by_id]
+
+    props = await runner.run(run)
+
+    body = await dump_json(property_list_adapter, props)
+    cached = public_cache.set(
+        cache_key,
+        body,
+        tags=[LISTINGS_TAG, *(property_tag(p.id) for p in props)],
+        generation=generation,
+    )
+    return cached.to_response(request)
+
+
+@app.get("/public/properties/export")
+def export_public_properties(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    """
+    Every non-archived listing with its images, streamed as NDJSON (one
+    PropertyOut per line) or CSV. Read in fixed-size batches through a
+    server-side cursor, so memory stays flat however large the feed is.
+    """
+    return StreamingResponse(
+        export_listings(format, read_session_factory(request)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="listings.{format}"',
+        },
     )
-    return props
 
 
 @app.get("/public/properties/{property_id}", response_model=PropertyOut)
-def get_public_property(
+async def get_public_property(
     property_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    runner: DbRunner = Depends(get_read_db_runner),
 ):
-    prop = (
-        db.query(models.Property)
-        .filter(
-            models.Property.id == property_id,
-            models.Property.is_archived == False,
+    cache_key = public_cache.key_for(request)
+    cached = public_cache.get(cache_key)
+    if cached is not None:
+        return cached.to_response(request)
+    generation = public_cache.generation()
+
+    def run(db: Session):
+        return (
+            db.query(models.Property)
+            .filter(
+                models.Property.id == property_id,
+                models.Property.is_archived == False,
+            )
+            .first()
         )
-        .first()
-    )
+
+    prop = await runner.run(run)
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
-    return prop
+
+    body = await dump_json(property_adapter, prop)
+    cached = public_cache.set(
+        cache_key, body, tags=[property_tag(prop.id)], generation=generation
+    )
+    return cached.to_response(request)
 
 
-@app.post("/uploads/image")
-async def upload_image(file: UploadFile = File(...)):
+def _upload_form(field: str, many: bool) -> dict:
+    """
+    OpenAPI request body for the upload routes, which read the multipart
+    stream themselves instead of declaring File() parameters.
+    """
+    binary = {"type": "string", "format": "binary"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {field: {"type": "array", "items": binary} if many else binary},
+                    }
+                }
+            },
+        }
+    }
+
+
+@app.post("/uploads/image", openapi_extra=_upload_form("file", many=False))
+async def upload_image(request: Request):
     """
     Upload a single image file and return a URL that can be used in PropertyImage.url
     """
-    # Simple extension handling
-    ext = os.path.splitext(file.filename)[1] or ".jpg"
-    filename = f"{uuid4().hex}{ext}"
-    file_path = os.path.join(MEDIA_DIR, filename)
+    url, = await receive_images(request, "file", max_files=1)
+    return {"url": url, "variants": variant_urls(url)}
 
-    # Save file
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
 
-    # Public URL (served by StaticFiles)
-    url = f"/media/{filename}"
-    return {"url": url}
+@app.post("/uploads/images", openapi_extra=_upload_form("files", many=True))
+async def upload_images(request: Request):
+    """
+    Upload a whole gallery in one request; each file is stored while the
+    next one arrives. URLs come back in the order the files were sent.
+    """
+    urls = await receive_images(request, "files", max_files=MAX_UPLOAD_FILES)
+    return [{"url": url, "variants": variant_urls(url)} for url in urls]
 
 
 class ChatRequest(BaseModel):
-    message: str
+    message: str = Field(max_length=CHAT_MESSAGE_MAX_CHARS)
+    # omit to start a new conversation; the reply carries the id to reuse
+    session_id: Optional[UUID] = None
 
 
 class ChatResponse(BaseModel):
     reply: str
+    session_id: UUID
+
+
+async def record_reply(session_id: UUID, tokens: List[str]) -> None:
+    """
+    Log the bot's streamed reply, or as much of it as was generated before
+    the client went away.
+    """
+    if tokens:
+        await chat_log.record(session_id, "bot", "".join(tokens))
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(payload: ChatRequest):
+async def chat_endpoint(
+    payload: ChatRequest,
+    generator: ReplyGenerator = Depends(get_reply_generator),
+):
     user_message = payload.message.strip()
+    session_id = payload.session_id or uuid4()
 
-    # 🧠 Very simple rule-based "assistant" for now
-    text = user_message.lower()
-    if "mortgage" in text or "loan" in text:
-        reply = (
-            "Great question! In South Carolina, most buyers use a conventional, FHA, or VA loan. "
-            "I can help you estimate a monthly payment if you tell me your price range and down payment."
-        )
-    elif "charleston" in text or "myrtle" in text or "greenville" in text:
-        reply = (
-            "Those are all popular areas in South Carolina. Tell me your budget and what kind of lifestyle "
-            "you’re looking for (urban, suburban, coastal, etc.), and I can suggest specific neighborhoods."
-        )
-    elif "tour" in text or "showing" in text or "visit" in text:
-        reply = (
-            "I can help you get ready to book a tour. What days and times usually work best for you, "
-            "and which area or specific property are you interested in?"
+    # buffered; written to the database in batches by chat_log
+    await chat_log.record(session_id, "user", user_message)
+    reply = await generate_reply(generator, user_message, session_id)
+    await chat_log.record(session_id, "bot", reply)
+
+    return ChatResponse(reply=reply, session_id=session_id)
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(
+    payload: ChatRequest,
+    generator: ReplyGenerator = Depends(get_reply_generator),
+):
+    """
+    Same as /chat, as Server-Sent Events: a `session` event with the
+    session_id, one `data: {"token": ...}` per chunk as it's generated,
+    then a `done` event with the full reply.
+    """
+    user_message = payload.message.strip()
+    session_id = payload.session_id or uuid4()
+    await chat_log.record(session_id, "user", user_message)
+
+    async def events():
+        yield sse_event({"session_id": str(session_id)}, event="session")
+        tokens = []
+        try:
+            async for token in generator.stream(user_message, session_id):
+                tokens.append(token)
+                yield sse_event({"token": token})
+        finally:
+            # a client that disconnects mid-stream cancels the generator;
+            # the reply so far is still kept
+            with anyio.CancelScope(shield=True):
+                await record_reply(session_id, tokens)
+        yield sse_event({"reply": "".join(tokens)}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # no proxy buffering, or tokens arrive all at once
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/chat/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: Optional[UUID] = None,
+    generator: ReplyGenerator = Depends(get_reply_generator),
+):
+    """
+    One chat session per connection (pass ?session_id= to continue an
+    earlier one). Client sends {"message": "..."}; server answers with
+    {"type": "token", "token": ...} frames and a final
+    {"type": "done", "reply": ...}.
+    """
+    await websocket.accept()
+    session_id = session_id or uuid4()
+    await websocket.send_json({"type": "session", "session_id": str(session_id)})
+
+    try:
+        while True:
+            try:
+                payload = ChatRequest.model_validate(await websocket.receive_json())
+            except KeyError:
+                # a binary frame: receive_json() only reads text ones
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                return
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Expected {\"message\": \"...\"}"})
+                continue
+
+            user_message = payload.message.strip()
+            await chat_log.record(session_id, "user", user_message)
+            tokens = []
+            try:
+                async for token in generator.stream(user_message, session_id):
+                    tokens.append(token)
+                    await websocket.send_json({"type": "token", "token": token})
+            finally:
+                await record_reply(session_id, tokens)
+            await websocket.send_json({"type": "done", "reply": "".join(tokens)})
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/chat/sessions/{session_id}", response_model=ChatSessionOut)
+async def get_chat_session(
+    session_id: UUID,
+    runner: DbRunner = Depends(get_db_runner),
+):
+    """
+    A conversation's messages, oldest first. The session id is the
+    capability: whoever started the chat holds it.
+    """
+    # make sure this conversation's latest messages are out of the buffer
+    await chat_log.flush()
+
+    def run(db: Session):
+        chat_session = db.get(models.ChatSession, session_id)
+        if chat_session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        messages = (
+            db.query(models.ChatMessage)
+            .filter(models.ChatMessage.session_id == session_id)
+            .order_by(models.ChatMessage.created_at, models.ChatMessage.id)
+            .all()
         )
-    else:
-        reply = (
-            "I’m here to help with South Carolina real estate—neighborhoods, prices, mortgages, or booking tours. "
-            "What would you like to know?"
+        return ChatSessionOut(
+            id=chat_session.id,
+            started_at=chat_session.started_at,
+            messages=[ChatMessageOut.model_validate(m) for m in messages],
         )
 
-    return ChatResponse(reply=reply)
\ No newline at end of file
+    return await runner.run(run)
\ No newline at end of file
@@ -0,0 +1,407 @@
+# api/maintenance.py
+#
+# Housekeeping for what soft deletes and uploads leave behind:
+#
+# 1. Archive compaction. Listings archived more than ARCHIVE_AFTER_DAYS ago
+#    move from `properties` (and their rows in `property_images`) to the
+#    properties_archive cold table, ARCHIVE_BATCH_SIZE listings per
+#    transaction, so the hot table and its indexes only hold listings that
+#    can still come back.
+# 2. Orphaned media. Uploads in MEDIA_DIR that no image row references (live
+#    or archived), with their variants, are deleted once their newest file
+#    is older than MEDIA_GRACE_HOURS. Leftover *.part files from aborted
+#    uploads are too. The grace period covers the gap between
+#    POST /uploads/image and attaching the URL to a listing; re-uploading
+#    an existing photo restarts it.
+#
+# Run it from cron or by hand; it prints what it reclaimed as JSON:
+#
+#   python maintenance.py                 # both jobs
+#   python maintenance.py --dry-run       # report only
+#   python maintenance.py --skip-media --vacuum
+#
+# or in the API process with MAINTENANCE_INTERVAL_SECONDS > 0. On Postgres
+# an advisory lock makes concurrent runs skip instead of racing.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from starlette.concurrency import run_in_threadpool
+
+import models
+from derivatives import VARIANT_WIDTHS
+from media import MEDIA_DIR
+
+logger = logging.getLogger("coastal.maintenance")
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+MEDIA_GRACE_HOURS = float(os.getenv("MEDIA_GRACE_HOURS", "24"))
+# Run both jobs in the API process this often (0 = only from the CLI).
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "0"))
+
+# Postgres advisory lock key; see schema.py for the migration one.
+_MAINTENANCE_LOCK = 726_413_902
+
+# Uploads are named by their SHA-256; variants add _<name> to the stem, and
+# the manifest listing them is <stem>_variants.json.
+_UPLOAD_NAME = re.compile(
+    r"^(?P<stem>[0-9a-f]{64})(?:_(?:%s|variants))?\.[A-Za-z0-9]+$" % "|".join(VARIANT_WIDTHS)
+)
+
+_HOT_TABLES = ("properties", "property_images")
+
+_properties = models.Property.__table__
+_images = models.PropertyImage.__table__
+_archive = models.ArchivedProperty.__table__
+
+_ARCHIVED_COLUMNS = [
+    column.name for column in _archive.columns if column.name not in ("moved_at", "images")
+]
+
+
+@dataclass
+class MaintenanceReport:
+    dry_run: bool = False
+    skipped: Optional[str] = None
+    listings_archived: int = 0
+    images_archived: int = 0
+    archive_batches: int = 0
+    hot_table_bytes_before: Optional[int] = None
+    hot_table_bytes_after: Optional[int] = None
+    media_files_deleted: int = 0
+    media_bytes_deleted: int = 0
+    media_files_kept: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+# -------- Archive compaction --------
+
+def hot_table_bytes(conn: Connection) -> Optional[int]:
+    """
+    Space taken by properties + property_images and their indexes, or None
+    when the backend can't tell (SQLite built without dbstat).
+
+    SQLite: bytes in use inside their pages, so rows deleted from a page
+    that stays allocated count as reclaimed (SQLite reuses that space).
+    Postgres: relation size, which only drops after VACUUM FULL; a plain
+    (auto)vacuum makes the space reusable without shrinking the files.
+    """
+    if conn.dialect.name == "postgresql":
+        return sum(
+            conn.execute(text("SELECT pg_total_relation_size(:name)"), {"name": name}).scalar()
+            for name in _HOT_TABLES
+        )
+    if conn.dialect.name == "sqlite":
+        try:
+            return conn.execute(
+                text(
+                    "SELECT coalesce(sum(pgsize - unused), 0) FROM dbstat WHERE name IN "
+                    "(SELECT name FROM sqlite_master WHERE tbl_name IN ('properties', 'property_images'))"
+                )
+            ).scalar()
+        except Exception:
+            conn.rollback()
+            return None
+    return None
+
+
+def archive_batch(conn: Connection, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    """
+    Move up to `batch_size` listings archived before `cutoff` into
+    properties_archive, in the caller's transaction. Returns
+    (listings, images) moved.
+    """
+    query = (
+        select(*(_properties.c[name] for name in _ARCHIVED_COLUMNS))
+        .where(_properties.c.is_archived == True, _properties.c.archived_at < cutoff)
+        .order_by(_properties.c.id)
+        .limit(batch_size)
+    )
+    if conn.dialect.name == "postgresql":
+        # rows someone is editing (e.g. un-archiving) wait for the next run
+        query = query.with_for_update(skip_locked=True)
+    listings = [dict(row._mapping) for row in conn.execute(query)]
+    if not listings:
+        return 0, 0
+    ids = [listing["id"] for listing in listings]
+
+    galleries: Dict[int, List[dict]] = {listing_id: [] for listing_id in ids}
+    image_rows = conn.execute(
+        select(_images.c.property_id, _images.c.url, _images.c.caption, _images.c.order_index)
+        .where(_images.c.property_id.in_(ids))
+        .order_by(_images.c.property_id, _images.c.order_index, _images.c.id)
+    )
+    images = 0
+    for property_id, url, caption, order_index in image_rows:
+        galleries[property_id].append({"url": url, "caption": caption, "order_index": order_index})
+        images += 1
+
+    conn.execute(
+        insert(_archive),
+        [{**listing, "images": galleries[listing["id"]]} for listing in listings],
+    )
+    conn.execute(delete(_images).where(_images.c.property_id.in_(ids)))
+    conn.execute(delete(_properties).where(_properties.c.id.in_(ids)))
+    return len(listings), images
+
+
+def compact_archive(
+    engine: Engine,
+    report: MaintenanceReport,
+    older_than_days: float = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    vacuum: bool = False,
+) -> None:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+
+    with engine.connect() as conn:
+        report.hot_table_bytes_before = hot_table_bytes(conn)
+        conn.commit()
+
+    if report.dry_run:
+        with engine.connect() as conn:
+            ids = select(_properties.c.id).where(
+                _properties.c.is_archived == True, _properties.c.archived_at < cutoff
+            )
+            report.listings_archived = conn.execute(
+                select(func.count()).select_from(ids.subquery())
+            ).scalar()
+            report.images_archived = conn.execute(
+                select(func.count()).select_from(_images).where(_images.c.property_id.in_(ids))
+            ).scalar()
+        return
+
+    while True:
+        with engine.begin() as conn:
+            listings, images = archive_batch(conn, cutoff, batch_size)
+        if not listings:
+            break
+        report.listings_archived += listings
+        report.images_archived += images
+        report.archive_batches += 1
+        if listings < batch_size:
+            break
+
+    if vacuum and report.listings_archived:
+        _vacuum(engine)
+
+    with engine.connect() as conn:
+        report.hot_table_bytes_after = hot_table_bytes(conn)
+        conn.commit()
+
+
+def _vacuum(engine: Engine) -> None:
+    """
+    Make the freed space reusable now instead of at the next autovacuum.
+    SQLite reuses freed pages without it (VACUUM there rewrites the whole
+    file, so it's left to the operator).
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name in _HOT_TABLES:
+            conn.execute(text(f"VACUUM (ANALYZE) {name}"))
+
+
+# -------- Orphaned media --------
+
+def referenced_stems(engine: Engine) -> Set[str]:
+    """
+    Upload stems (the SHA-256 part of /media/<sha>.<ext>) that a live or
+    archived image still points at.
+    """
+    stems = set()
+
+    def note(url: Optional[str]) -> None:
+        if url and url.startswith("/media/"):
+            stems.add(os.path.splitext(url.rpartition("/")[2])[0])
+
+    with engine.connect() as conn:
+        for (url,) in conn.execute(
+            select(_images.c.url).where(_images.c.url.like("/media/%")),
+            execution_options={"yield_per": 5000},
+        ):
+            note(url)
+        for (gallery,) in conn.execute(
+            select(_archive.c.images), execution_options={"yield_per": 1000}
+        ):
+            for image in gallery or []:
+                note(image.get("url"))
+    return stems
+
+
+def _newest_mtime(paths: List[str]) -> Optional[float]:
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes) if mtimes else None
+
+
+def _delete(paths: List[str], report: MaintenanceReport) -> None:
+    for path in paths:
+        try:
+            size = os.stat(path).st_size
+            if not report.dry_run:
+                os.remove(path)
+        except FileNotFoundError:
+            continue
+        report.media_files_deleted += 1
+        report.media_bytes_deleted += size
+
+
+def collect_media(
+    engine: Engine,
+    report: MaintenanceReport,
+    media_dir: str = MEDIA_DIR,
+    grace_hours: float = MEDIA_GRACE_HOURS,
+) -> None:
+    if not os.path.isdir(media_dir):
+        return
+    cutoff = time.time() - grace_hours * 3600
+
+    # list files before reading references, so an image attached meanwhile
+    # is seen as referenced
+    groups: Dict[str, List[str]] = {}
+    parts = []
+    for entry in os.scandir(media_dir):
+        if not entry.is_file():
+            continue
+        if entry.name.endswith(".part"):
+            parts.append(entry.path)
+            continue
+        match = _UPLOAD_NAME.match(entry.name)
+        if match is None:
+            # not something the upload routes wrote; leave it alone
+            continue
+        groups.setdefault(match.group("stem"), []).append(entry.path)
+
+    referenced = referenced_stems(engine)
+
+    for part in parts:
+        newest = _newest_mtime([part])
+        if newest is not None and newest < cutoff:
+            _delete([part], report)
+
+    for stem, paths in groups.items():
+        if stem in referenced:
+            report.media_files_kept += len(paths)
+            continue
+        # re-read just before deleting: a re-upload bumps the mtime
+        newest = _newest_mtime(paths)
+        if newest is None or newest >= cutoff:
+            report.media_files_kept += len(paths)
+            continue
+        _delete(paths, report)
+
+
+# -------- Runner --------
+
+def _try_lock(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return True
+    locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _MAINTENANCE_LOCK}).scalar()
+    conn.commit()
+    return bool(locked)
+
+
+def run_maintenance(
+    engine: Engine,
+    archive: bool = True,
+    media: bool = True,
+    dry_run: bool = False,
+    vacuum: bool = False,
+    older_than_days: float = ARCHIVE_AFTER_DAYS,
+    grace_hours: float = MEDIA_GRACE_HOURS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> MaintenanceReport:
+    """
+    Blocking: run from the CLI or a worker thread.
+    """
+    report = MaintenanceReport(dry_run=dry_run)
+    started = time.perf_counter()
+    # the lock is held by this connection for the whole run
+    with engine.connect() as lock_conn:
+        if not _try_lock(lock_conn):
+            report.skipped = "another maintenance run holds the lock"
+            return report
+        try:
+            if archive:
+                try:
+                    compact_archive(engine, report, older_than_days, batch_size, vacuum)
+                except Exception as exc:
+                    logger.exception("Archive compaction failed")
+                    report.errors.append(f"archive: {exc.__class__.__name__}: {exc}")
+            if media:
+                try:
+                    collect_media(engine, report, grace_hours=grace_hours)
+                except Exception as exc:
+                    logger.exception("Orphaned-media sweep failed")
+                    report.errors.append(f"media: {exc.__class__.__name__}: {exc}")
+        finally:
+            if lock_conn.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MAINTENANCE_LOCK})
+                lock_conn.commit()
+    report.seconds = round(time.perf_counter() - started, 3)
+    return report
+
+
+async def keep_maintained(engine: Engine, interval: float = MAINTENANCE_INTERVAL_SECONDS) -> None:
+    """
+    Run both jobs every `interval` seconds, the first one after a full
+    interval so boot stays cheap. Run as a task.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await run_in_threadpool(run_maintenance, engine)
+        except Exception:
+            logger.exception("Maintenance run failed")
+            continue
+        logger.info("Maintenance: %s", json.dumps(asdict(report)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move long-archived listings to cold storage and delete orphaned media")
+    parser.add_argument("--archive-days", type=float, default=ARCHIVE_AFTER_DAYS, help="archived longer than this moves")
+    parser.add_argument("--grace-hours", type=float, default=MEDIA_GRACE_HOURS, help="unreferenced files older than this go")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--skip-archive", action="store_true")
+    parser.add_argument("--skip-media", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be reclaimed, change nothing")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the hot tables afterwards (Postgres)")
+    args = parser.parse_args()
+
+    from database import engine
+
+    report = run_maintenance(
+        engine,
+        archive=not args.skip_archive,
+        media=not args.skip_media,
+        dry_run=args.dry_run,
+        vacuum=args.vacuum,
+        older_than_days=args.archive_days,
+        grace_hours=args.grace_hours,
+        batch_size=args.batch_size,
+    )
+    print(json.dumps(asdict(report), indent=2))
+    sys.exit(1 if report.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# api/media.py
+import asyncio
+import hashlib
+import os
+from typing import List, Optional
+from uuid import uuid4
+
+import anyio
+from fastapi import HTTPException, Request
+from fastapi.staticfiles import StaticFiles
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.responses import FileResponse, Response
+from starlette.datastructures import Headers
+
+from derivatives import generate_variants
+
+MEDIA_DIR = os.getenv("MEDIA_DIR", "media")
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", "40"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# magic-byte prefix -> (content type, extension)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", ("image/jpeg", ".jpg")),
+    (b"\x89PNG\r\n\x1a\n", ("image/png", ".png")),
+    (b"GIF87a", ("image/gif", ".gif")),
+    (b"GIF89a", ("image/gif", ".gif")),
+]
+
+_HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"mif1", b"msf1"}
+
+
+def sniff_image_type(head: bytes) -> Optional[tuple]:
+    """
+    Identify an image from its first bytes; the client's content type and
+    file name are not trusted. Returns (content type, extension) or None.
+    """
+    for magic, kind in _SIGNATURES:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ("image/webp", ".webp")
+    if head[4:8] == b"ftyp" and head[8:12] in _HEIF_BRANDS:
+        return ("image/heic", ".heic")
+    return None
+
+
+# Room for a part's boundary line and headers on top of its file bytes.
+UPLOAD_PART_OVERHEAD = 16 * 1024
+
+
+def upload_limit(max_files: int) -> int:
+    """
+    Largest multipart body a route taking `max_files` images accepts.
+    """
+    return max_files * (MAX_UPLOAD_BYTES + UPLOAD_PART_OVERHEAD)
+
+
+def request_too_large(content_length: Optional[str], limit: int) -> bool:
+    """
+    Cheap pre-check on Content-Length so an oversized upload is refused
+    before any of the body is read. Bodies without one (chunked) are
+    counted as they stream in instead.
+    """
+    if not content_length:
+        return False
+    try:
+        length = int(content_length)
+    except ValueError:
+        return False
+    return length > limit
+
+
+class _ImagePart:
+    """
+    One file part of the form, written to a .part file as it arrives.
+    """
+
+    def __init__(self) -> None:
+        # the final name isn't known until the last byte is hashed
+        self.tmp_path = os.path.join(MEDIA_DIR, f"{uuid4().hex}.part")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.ext: Optional[str] = None
+        self.out = None
+
+    async def open(self) -> None:
+        self.out = await anyio.open_file(self.tmp_path, "wb")
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image is too large")
+        if self.ext is None:
+            # sniff once there are enough bytes for every signature
+            self.head += data
+            if len(self.head) >= 12:
+                self._sniff()
+        self.digest.update(data)
+        await self.out.write(data)
+
+    async def close(self) -> None:
+        if self.ext is None:
+            self._sniff()
+        await self.out.aclose()
+        self.out = None
+
+    async def discard(self) -> None:
+        if self.out is not None:
+            await self.out.aclose()
+            self.out = None
+        await anyio.to_thread.run_sync(_remove_quietly, self.tmp_path)
+
+    def _sniff(self) -> None:
+        kind = sniff_image_type(self.head)
+        if kind is None:
+            raise HTTPException(status_code=415, detail="Unsupported image type")
+        self.ext = kind[1]
+        self.head = b""
+
+
+async def _store(part: _ImagePart) -> str:
+    """
+    Move a received image to its content-addressed name and render its
+    variants. Returns the public URL.
+
+    Files are named by the SHA-256 of their bytes, so re-uploading the same
+    photo returns the existing URL instead of storing another copy.
+    """
+    filename = f"{part.digest.hexdigest()}{part.ext}"
+    file_path = os.path.join(MEDIA_DIR, filename)
+    try:
+        if await anyio.to_thread.run_sync(_touch, file_path):
+            # duplicate: keep the stored copy (and its variants)
+            await anyio.to_thread.run_sync(_remove_quietly, part.tmp_path)
+            return f"/media/{filename}"
+        await anyio.to_thread.run_sync(os.replace, part.tmp_path, file_path)
+    except BaseException:
+        await anyio.to_thread.run_sync(_remove_quietly, part.tmp_path)
+        raise
+
+    try:
+        await generate_variants(file_path)
+    except Exception:
+        # right magic bytes, but the decoder couldn't read the rest
+        await anyio.to_thread.run_sync(_remove_quietly, file_path)
+        raise HTTPException(status_code=415, detail="Could not decode image")
+
+    # Public URL (served by StaticFiles)
+    return f"/media/{filename}"
+
+
+def _form_parser(request: Request, events: list) -> MultipartParser:
+    """
+    A streaming multipart/form-data parser for the request that appends
+    ("headers", {name: value}), ("data", bytes) and ("end", None) to
+    `events` as it recognises them.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Send the images as multipart/form-data")
+
+    headers = {}
+    header = [b"", b""]
+
+    def on_header_field(data, start, end):
+        header[0] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header[1] += data[start:end]
+
+    def on_header_end():
+        headers[header[0].decode("latin-1").lower()] = header[1]
+        header[0], header[1] = b"", b""
+
+    def on_headers_finished():
+        events.append(("headers", dict(headers)))
+        headers.clear()
+
+    def on_part_data(data, start, end):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    return MultipartParser(
+        boundary,
+        {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+
+async def receive_images(request: Request, field: str, max_files: int) -> List[str]:
+    """
+    Stream the images in form field `field` straight from the request body
+    to MEDIA_DIR: nothing is buffered beyond the chunk being parsed.
+    Rejects with 413 as soon as a file passes MAX_UPLOAD_BYTES, the form
+    has more than `max_files` of them, or the body passes
+    upload_limit(max_files) (Content-Length is checked before reading), and
+    with 415 when a file isn't a supported image.
+
+    Each file is stored (renamed, variants rendered) while the next one
+    arrives, UPLOAD_CONCURRENCY at a time. URLs come back in the order the
+    files were sent.
+    """
+    limit = upload_limit(max_files)
+    if request_too_large(request.headers.get("content-length"), limit):
+        raise HTTPException(status_code=413, detail="Upload is too large")
+
+    events: list = []
+    parser = _form_parser(request, events)
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    stores: List[asyncio.Task] = []
+    received_parts: List[_ImagePart] = []
+    part: Optional[_ImagePart] = None
+    received = 0
+
+    async def store(part: _ImagePart) -> str:
+        async with semaphore:
+            return await _store(part)
+
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise HTTPException(status_code=413, detail="Upload is too large")
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise HTTPException(status_code=400, detail="Malformed multipart body")
+
+            for kind, value in events:
+                if kind == "headers":
+                    _, options = parse_options_header(value.get("content-disposition"))
+                    if options.get(b"name") != field.encode() or b"filename" not in options:
+                        continue  # other form fields are ignored
+                    if len(stores) >= max_files:
+                        raise HTTPException(status_code=413, detail="Too many files")
+                    part = _ImagePart()
+                    await part.open()
+                elif part is None:
+                    continue
+                elif kind == "data":
+                    await part.write(value)
+                else:
+                    await part.close()
+                    received_parts.append(part)
+                    stores.append(asyncio.create_task(store(part)))
+                    part = None
+            events.clear()
+        parser.finalize()
+
+        if part is not None or not stores:
+            raise HTTPException(status_code=400, detail=f"No complete file in form field '{field}'")
+        return list(await asyncio.gather(*stores))
+    except BaseException:
+        if part is not None:
+            await part.discard()
+        for task in stores:
+            task.cancel()
+        await asyncio.gather(*stores, return_exceptions=True)
+        # files already stored stay: they're content-addressed, and the
+        # orphaned-media sweep removes them if nothing references them
+        for received_part in received_parts:
+            await anyio.to_thread.run_sync(_remove_quietly, received_part.tmp_path)
+        raise
+
+
+def _touch(path: str) -> bool:
+    """
+    Bump an existing file's mtime, restarting its grace period in the
+    orphaned-media sweep (maintenance.py). False when there's no such file.
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for MEDIA_DIR. Every file there is write-once (uploads are
+    content-addressed, variants are derived from them), so responses are
+    cacheable forever and the file name itself is a strong ETag.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        if str(full_path).endswith(".part"):
+            # upload still being written
+            return Response(status_code=404)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        stem = os.path.splitext(os.path.basename(full_path))[0]
+        response.headers["etag"] = f'"{stem}"'
+        response.headers["cache-control"] = "public, max-age=31536000, immutable"
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return Response(
+                status_code=304,
+                headers={
+                    "etag": response.headers["etag"],
+                    "cache-control": response.headers["cache-control"],
+                },
+            )
+        return response
@@ -0,0 +1,395 @@
+# api/metrics.py
+#
+# Prometheus metrics for GET /metrics:
+#
+#   http_request_duration_seconds{method,route,status}   end-to-end latency
+#   http_request_phase_seconds{route,phase}              where that time went:
+#       sql  - time inside cursor.execute
+#       auth - token decode and user lookup, excluding its SQL
+#       app  - everything else (handler code, serialization)
+#   http_request_sql_statements{route}                   statements per request
+#   db_statement_duration_seconds{engine,operation}      every statement
+#   db_pool_*{engine}                                    checkouts, waits,
+#       timeouts, new connections and the time to open them, and size /
+#       checked out / overflow gauges
+#
+# Routes are labelled by their template (/properties/{property_id}), never
+# the raw path, so label cardinality stays fixed. Statements slower than
+# SLOW_QUERY_MS (0 = off) are logged to coastal.sql with the request path.
+#
+# Latency is measured until the response starts; a streamed body (export,
+# SSE) keeps running after that.
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger("coastal.sql")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+# Longest statement text written to the slow-query log.
+SLOW_QUERY_MAX_CHARS = 1000
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from request to response start",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+PHASE_SECONDS = Histogram(
+    "http_request_phase_seconds",
+    "Per-request time split into sql, auth and app",
+    ["route", "phase"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_sql_statements",
+    "SQL statements run per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 6, 10, 20, 50, 100),
+    registry=registry,
+)
+STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "Time inside cursor.execute per statement",
+    ["engine", "operation"],
+    buckets=SQL_BUCKETS,
+    registry=registry,
+)
+SLOW_STATEMENTS = Counter(
+    "db_slow_statements",
+    "Statements over SLOW_QUERY_MS",
+    ["engine"],
+    registry=registry,
+)
+POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts",
+    "Connections handed out by the pool",
+    ["engine"],
+    registry=registry,
+)
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection, not counting opening new ones",
+    ["engine"],
+    buckets=SQL_BUCKETS,
+    registry=registry,
+)
+POOL_CONNECT_SECONDS = Histogram(
+    "db_pool_connect_seconds",
+    "Time to open a new DBAPI connection during a checkout",
+    ["engine"],
+    buckets=SQL_BUCKETS,
+    registry=registry,
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts",
+    "Checkouts that gave up after pool_timeout",
+    ["engine"],
+    registry=registry,
+)
+POOL_CONNECTS = Counter(
+    "db_pool_connections_created",
+    "New DBAPI connections opened",
+    ["engine"],
+    registry=registry,
+)
+
+
+# -------- Per-request accounting --------
+
+class RequestStats:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.phases: Dict[str, float] = {}
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_metrics", default=None
+)
+
+
+@contextmanager
+def track_request(path: str) -> Iterator[RequestStats]:
+    """
+    Collect SQL and phase timings for the request to `path`.
+    """
+    stats = RequestStats(path)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """
+    Attribute the enclosed time (minus any SQL it runs) to `name`.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        yield
+        return
+    started, sql_before = time.perf_counter(), stats.sql_seconds
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (stats.sql_seconds - sql_before)
+        stats.phases[name] = stats.phases.get(name, 0.0) + max(elapsed, 0.0)
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("path", "").startswith("/media/"):
+        return "/media"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task per request): times
+    each HTTP request until its response starts and records it by route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        observed = False
+
+        with track_request(scope["path"]) as stats:
+
+            def observe():
+                nonlocal observed
+                if not observed:
+                    observed = True
+                    observe_request(
+                        scope["method"],
+                        route_label(scope),
+                        status_code,
+                        time.perf_counter() - started,
+                        stats,
+                    )
+
+            async def send_timed(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    observe()
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_timed)
+            finally:
+                observe()
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+    REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+    REQUEST_STATEMENTS.labels(route).observe(stats.statements)
+    PHASE_SECONDS.labels(route, "sql").observe(stats.sql_seconds)
+    for phase, phase_seconds in stats.phases.items():
+        PHASE_SECONDS.labels(route, phase).observe(phase_seconds)
+    app_seconds = seconds - stats.sql_seconds - sum(stats.phases.values())
+    PHASE_SECONDS.labels(route, "app").observe(max(app_seconds, 0.0))
+
+
+# -------- SQLAlchemy hooks --------
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[:1]
+    operation = word[0].upper() if word else ""
+    return operation if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def _instrument_statements(engine: Engine, name: str) -> None:
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["metrics_started"].pop()
+        STATEMENT_SECONDS.labels(name, _operation(statement)).observe(seconds)
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += seconds
+
+        if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+            SLOW_STATEMENTS.labels(name).inc()
+            logger.warning(
+                "Slow SQL (%.1f ms, engine=%s, path=%s): %s",
+                seconds * 1000,
+                name,
+                stats.path if stats is not None else "-",
+                " ".join(statement.split())[:SLOW_QUERY_MAX_CHARS],
+            )
+
+    def failed(exception_context):
+        started = exception_context.connection.info.get("metrics_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    event.listen(engine, "handle_error", failed)
+
+
+# The checkout in progress in this thread / task:
+# [started, seconds spent connecting, current connect started or None]
+_checkout: ContextVar[Optional[List]] = ContextVar("pool_checkout", default=None)
+
+
+def _observe_wait(name: str, state: List) -> None:
+    waited = time.perf_counter() - state[0] - state[1]
+    POOL_WAIT_SECONDS.labels(name).observe(max(waited, 0.0))
+
+
+class TimedCheckouts:
+    """
+    Pool mixin timing each checkout's wait. QueuePool has no "about to wait"
+    event, so the pool's own _do_get() (take an idle connection, open a new
+    one, or wait for one to come back) is timed; opening a new connection
+    in between (the dialect's do_connect to the pool's connect event) counts
+    as connecting, not waiting. instrument_engine() names the pool, and
+    recreate() (engine.dispose()) keeps the name.
+    """
+
+    metrics_name: Optional[str] = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+    def _do_get(self):
+        name = self.metrics_name
+        if name is None:
+            return super()._do_get()
+        state = [time.perf_counter(), 0.0, None]
+        token = _checkout.set(state)
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.labels(name).inc()
+            _observe_wait(name, state)
+            raise
+        finally:
+            _checkout.reset(token)
+        _observe_wait(name, state)
+        return connection
+
+
+class TimedQueuePool(TimedCheckouts, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedCheckouts, AsyncAdaptedQueuePool):
+    pass
+
+
+def _instrument_pool(engine: Engine, name: str) -> None:
+    """
+    Count checkouts and new connections, and time opening them, with pool
+    events; waits are timed by the pool itself when it's one of the Timed*
+    pools above (database.engine_options picks them). The listeners hang off
+    the engine, so they outlive dispose() swapping in a fresh pool.
+    """
+    if isinstance(engine.pool, TimedCheckouts):
+        engine.pool.metrics_name = name
+
+    def connecting(dialect, conn_rec, cargs, cparams):
+        state = _checkout.get()
+        if state is not None:
+            state[2] = time.perf_counter()
+
+    def connected(dbapi_connection, connection_record):
+        POOL_CONNECTS.labels(name).inc()
+        state = _checkout.get()
+        if state is not None and state[2] is not None:
+            seconds = time.perf_counter() - state[2]
+            state[1] += seconds
+            state[2] = None
+            POOL_CONNECT_SECONDS.labels(name).observe(seconds)
+
+    def checked_out(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.labels(name).inc()
+
+    event.listen(engine, "do_connect", connecting)
+    event.listen(engine, "connect", connected)
+    event.listen(engine, "checkout", checked_out)
+
+
+_engines: Dict[str, Engine] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Time statements and pool checkouts of a sync Engine (for an AsyncEngine,
+    pass .sync_engine). Calling it again for the same name is a no-op.
+    """
+    if not METRICS_ENABLED or name in _engines:
+        return
+    _engines[name] = engine
+    _instrument_statements(engine, name)
+    _instrument_pool(engine, name)
+
+
+class PoolCollector:
+    """
+    Pool occupancy read at scrape time.
+    """
+
+    def collect(self):
+        gauges = {
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["engine"]),
+            "checkedout": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"]),
+            "checkedin": GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["engine"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections open beyond pool_size", labels=["engine"]),
+        }
+        for name, engine in _engines.items():
+            for method, gauge in gauges.items():
+                reading = getattr(engine.pool, method, None)
+                if reading is not None:
+                    # QueuePool.overflow() is negative until pool_size is reached
+                    gauge.add_metric([name], max(reading(), 0))
+        return list(gauges.values())
+
+
+registry.register(PoolCollector())
+
+
+def render() -> bytes:
+    return generate_latest(registry)
+
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
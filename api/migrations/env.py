@@ -0,0 +1,56 @@
+# api/migrations/env.py
+from alembic import context
+
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from database import Base, DATABASE_URL, engine
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # the SQLite FTS5 search table and its shadow tables (see search.py)
+    return not (type_ == "table" and name.startswith("property_search"))
+
+
+def run_migrations_offline():
+    """
+    `alembic upgrade head --sql`: print the DDL instead of running it.
+    """
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # schema.migrate() passes the app's connection in; the CLI uses the engine
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite can't ALTER most things; batch mode recreates the table
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,100 @@
+"""baseline: the schema as create_all built it
+
+Exactly the tables and indexes the original models gave create_all, so a
+database created before migrations existed matches it: schema.migrate()
+stamps those at this revision instead of running it, and everything added
+since comes from the later revisions.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.Text(), nullable=False),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("broker_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.CheckConstraint("role IN ('broker','agent')", name="role_check"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "properties",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("mls_id", sa.String(50), nullable=True),
+        sa.Column("address", sa.Text(), nullable=False),
+        sa.Column("city", sa.Text(), nullable=False),
+        sa.Column("state", sa.String(2), nullable=False),
+        sa.Column("zip_code", sa.String(10), nullable=False),
+        sa.Column("price", sa.Numeric(12, 2), nullable=True),
+        sa.Column("beds", sa.Integer(), nullable=True),
+        sa.Column("baths", sa.Numeric(4, 1), nullable=True),
+        sa.Column("sqft", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("is_archived", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_properties_id", "properties", ["id"])
+
+    op.create_table(
+        "property_images",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "property_id",
+            sa.Integer(),
+            sa.ForeignKey("properties.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("caption", sa.Text(), nullable=True),
+        sa.Column("order_index", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_property_images_id", "property_images", ["id"])
+
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_identifier", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "session_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("chat_sessions.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("sender", sa.String(10), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.CheckConstraint("sender IN ('user', 'bot')", name="sender_check"),
+    )
+    op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+
+
+def downgrade():
+    op.drop_table("chat_messages")
+    op.drop_table("chat_sessions")
+    op.drop_table("property_images")
+    op.drop_table("properties")
+    op.drop_table("users")
@@ -0,0 +1,82 @@
+"""filtered-feed indexes, listing search and the mls_id unique index
+
+What the app added to the schema before migrations existed, for databases
+that only have the 0001 baseline (every step is skipped where a database
+created later already has it):
+
+- ix_properties_feed, ix_properties_zip_feed, ix_properties_city_feed,
+  ix_properties_price: the /public/properties keyset feed and its filters.
+  0003 replaces ix_properties_feed with a partial index.
+- the search index (search.py): Postgres tsvector + trigram indexes, or on
+  SQLite the property_search FTS table with its triggers, backfilled from
+  the live listings.
+- ux_properties_mls_id: bulk import upserts on mls_id. Where several
+  listings share one, the oldest (lowest id) keeps it and the others'
+  mls_id is set to NULL; the number cleared is logged.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from search import create_search_index, drop_search_index, search_index_sql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+_DEDUPLICATE_MLS_IDS = """
+    UPDATE properties SET mls_id = NULL
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (PARTITION BY mls_id ORDER BY id) AS copy
+            FROM properties WHERE mls_id IS NOT NULL
+        ) numbered
+        WHERE copy > 1
+    )
+"""
+
+
+def upgrade():
+    op.create_index(
+        "ix_properties_feed", "properties", ["is_archived", "created_at", "id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_properties_zip_feed", "properties", ["zip_code", "created_at", "id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_properties_city_feed",
+        "properties",
+        [sa.text("lower(city)"), "created_at", "id"],
+        if_not_exists=True,
+    )
+    op.create_index("ix_properties_price", "properties", ["is_archived", "price"], if_not_exists=True)
+
+    if context.is_offline_mode():
+        for statement in search_index_sql(op.get_context().dialect.name):
+            op.execute(statement)
+        op.execute(_DEDUPLICATE_MLS_IDS)
+    else:
+        conn = op.get_bind()
+        create_search_index(conn)
+        cleared = conn.execute(sa.text(_DEDUPLICATE_MLS_IDS)).rowcount
+        if cleared:
+            logger.warning("cleared %s duplicate mls_id values before adding ux_properties_mls_id", cleared)
+    op.create_index("ux_properties_mls_id", "properties", ["mls_id"], unique=True, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ux_properties_mls_id", table_name="properties")
+    if not context.is_offline_mode():
+        drop_search_index(op.get_bind())
+    op.drop_index("ix_properties_price", table_name="properties")
+    op.drop_index("ix_properties_city_feed", table_name="properties")
+    op.drop_index("ix_properties_zip_feed", table_name="properties")
+    op.drop_index("ix_properties_feed", table_name="properties", if_exists=True)
@@ -0,0 +1,83 @@
+"""indexes for the list and permission query shapes
+
+- ix_properties_live_feed: public feed, WHERE NOT is_archived ORDER BY
+  created_at DESC, id DESC. Partial, so archived rows cost nothing; it
+  replaces the full (is_archived, created_at, id) index.
+- ix_properties_owner: GET /properties, owner_id IN (...) AND NOT
+  is_archived ORDER BY created_at DESC.
+- ix_users_broker_id: a broker's agents (permission checks).
+- ix_property_images_property: every gallery load, property_id IN (...)
+  ORDER BY order_index, id.
+
+On Postgres the indexes are built CONCURRENTLY so writes keep flowing.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text("is_archived = false")
+# SQLite only uses a partial index when the query's WHERE term matches it;
+# SQLAlchemy renders `is_archived == False` there as `is_archived = 0`.
+LIVE_SQLITE = sa.text("is_archived = 0")
+
+
+def _create(name, table, columns, **kw):
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+    else:
+        op.create_index(name, table, columns, if_not_exists=True, **kw)
+
+
+def _drop(name, table):
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+def upgrade():
+    _create(
+        "ix_properties_live_feed",
+        "properties",
+        ["created_at", "id"],
+        postgresql_where=LIVE,
+        sqlite_where=LIVE_SQLITE,
+    )
+    _drop("ix_properties_feed", "properties")
+    _create(
+        "ix_properties_owner",
+        "properties",
+        ["owner_id", "created_at"],
+        postgresql_where=LIVE,
+        sqlite_where=LIVE_SQLITE,
+    )
+    _create(
+        "ix_users_broker_id",
+        "users",
+        ["broker_id"],
+        postgresql_where=sa.text("broker_id IS NOT NULL"),
+        sqlite_where=sa.text("broker_id IS NOT NULL"),
+    )
+    _create(
+        "ix_property_images_property",
+        "property_images",
+        ["property_id", "order_index", "id"],
+    )
+
+
+def downgrade():
+    _drop("ix_property_images_property", "property_images")
+    _drop("ix_users_broker_id", "users")
+    _drop("ix_properties_owner", "properties")
+    _create("ix_properties_feed", "properties", ["is_archived", "created_at", "id"])
+    _drop("ix_properties_live_feed", "properties")
@@ -0,0 +1,33 @@
+"""listing_stats: broker dashboard aggregate
+
+Live listings per (owner, city, price bucket) with their summed price,
+maintained by the property write paths (see listing_stats.py). It's filled
+from the existing listings by 0006, once the table has every column
+listing_stats.rebuild() writes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "listing_stats",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("city", sa.Text(), primary_key=True),
+        sa.Column("price_bucket", sa.Integer(), primary_key=True),
+        sa.Column("listings", sa.Integer(), nullable=False),
+        sa.Column("price_total", sa.Numeric(16, 2), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("listing_stats")
@@ -0,0 +1,52 @@
+"""properties.archived_at and the properties_archive cold table
+
+archived_at records when a listing was archived, so maintenance.py can move
+listings archived longer than ARCHIVE_AFTER_DAYS out of the hot table.
+Listings already archived get the migration time, which starts their
+retention period now.
+
+properties_archive holds the moved listings, their gallery folded into a
+JSON column. It has no foreign keys or secondary indexes: it's only
+written in batches and read by hand.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # plain ALTERs: a batch (copy-and-swap) on SQLite would drop the search triggers
+    op.add_column("properties", sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE properties SET archived_at = CURRENT_TIMESTAMP WHERE is_archived")
+
+    op.create_table(
+        "properties_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("mls_id", sa.String(50), nullable=True),
+        sa.Column("address", sa.Text(), nullable=False),
+        sa.Column("city", sa.Text(), nullable=False),
+        sa.Column("state", sa.String(2), nullable=False),
+        sa.Column("zip_code", sa.String(10), nullable=False),
+        sa.Column("price", sa.Numeric(12, 2), nullable=True),
+        sa.Column("beds", sa.Integer(), nullable=True),
+        sa.Column("baths", sa.Numeric(4, 1), nullable=True),
+        sa.Column("sqft", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("moved_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("images", sa.JSON(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("properties_archive")
+    op.drop_column("properties", "archived_at")
@@ -0,0 +1,33 @@
+"""listing_stats.price_min / price_max
+
+The lowest and highest price each bucket holds, so a median interpolated
+inside a bucket stays within its listings' prices. The table is (re)built
+from the existing listings here; offline (--sql) runs only add the
+columns, rebuild afterwards with `python listing_stats.py`.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+from listing_stats import rebuild
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("listing_stats", sa.Column("price_min", sa.Numeric(12, 2), nullable=True))
+    op.add_column("listing_stats", sa.Column("price_max", sa.Numeric(12, 2), nullable=True))
+    if not context.is_offline_mode():
+        rebuild(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table("listing_stats") as batch:
+        batch.drop_column("price_max")
+        batch.drop_column("price_min")
@@ -0,0 +1,312 @@
+# api/mls_import.py
+import codecs
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import anyio.from_thread
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+import models
+from auth import CurrentUser
+from cache import public_cache, property_tag, LISTINGS_TAG
+from database import SessionLocal, insert_for
+from listing_index import listing_index
+from listing_stats import StatsDelta
+from permissions import owner_ids_for
+from schemas import PropertyImportRow, ImportReport, ImportRowError
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# keep the report bounded on a badly broken feed; `failed` still counts all
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+_UPSERT_COLUMNS = (
+    "address",
+    "city",
+    "state",
+    "zip_code",
+    "price",
+    "beds",
+    "baths",
+    "sqft",
+)
+
+
+def sync_chunks(stream) -> Iterator[bytes]:
+    """
+    Pull an async request body stream from a worker thread, one chunk at a
+    time, so the importer can use plain (sync) csv and Session code.
+    """
+    async def next_chunk():
+        return await stream.__anext__()
+
+    while True:
+        try:
+            chunk = anyio.from_thread.run(next_chunk)
+        except StopAsyncIteration:
+            return
+        if chunk:
+            yield chunk
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Lines end at \n (so \r\n too) only: str.splitlines() would also break
+    on \u2028, \x85 and the like, which are plain text inside a field.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        # the last piece may be a partial line; wait for the next chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yields (row number, raw record). Rows are numbered from 1, not counting
+    the CSV header. A record that can't be parsed is yielded as an exception.
+    """
+    if fmt == "csv":
+        for row_number, record in enumerate(csv.DictReader(lines), start=1):
+            if record.get("images"):
+                record["images"] = [u for u in record["images"].replace("|", " ").split() if u]
+            yield row_number, {k: v for k, v in record.items() if k and v not in ("", None)}
+        return
+
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as exc:
+            yield row_number, exc
+
+
+class ListingImporter:
+    """
+    Upserts validated rows into `properties` keyed on mls_id, one batch per
+    transaction: one SELECT for existing owners, one INSERT .. ON CONFLICT
+    .. RETURNING, then one DELETE + one multi-row INSERT for the galleries
+    and one upsert of the broker stats.
+
+    A batch the database rejects (e.g. a value Postgres won't store) is
+    bisected, like chat_log does, until the rows at fault are found; those
+    are reported as row errors and the rest are written.
+    """
+
+    def __init__(self, db: Session, current_user: CurrentUser):
+        self.db = db
+        self.current_user = current_user
+        self.owner_ids = owner_ids_for(db, current_user)
+        self.report = ImportReport()
+        self.touched_ids: List[int] = []
+
+    def fail(self, row: int, mls_id: Optional[str], error: str) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(ImportRowError(row=row, mls_id=mls_id, error=error))
+
+    def run(self, records: Iterable[Tuple[int, object]]) -> ImportReport:
+        batch: Dict[str, Tuple[int, PropertyImportRow]] = {}
+
+        for row_number, raw in records:
+            if isinstance(raw, Exception):
+                self.fail(row_number, None, f"Invalid JSON: {raw}")
+                continue
+            if not isinstance(raw, dict):
+                self.fail(row_number, None, "Expected an object")
+                continue
+            try:
+                row = PropertyImportRow.model_validate(raw)
+            except ValidationError as exc:
+                self.fail(row_number, raw.get("mls_id"), _describe(exc))
+                continue
+
+            if row.mls_id in batch:
+                # later rows win, like a feed replay would
+                earlier_row, _ = batch[row.mls_id]
+                self.fail(earlier_row, row.mls_id, f"Superseded by row {row_number}")
+            batch[row.mls_id] = (row_number, row)
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self.flush(batch)
+                batch = {}
+
+        if batch:
+            self.flush(batch)
+
+        if self.touched_ids:
+            public_cache.invalidate(LISTINGS_TAG, *(property_tag(i) for i in self.touched_ids))
+            listing_index.refresh_ids(self.db, self.touched_ids)
+        return self.report
+
+    def flush(self, batch: Dict[str, Tuple[int, PropertyImportRow]]) -> None:
+        parts = [list(batch.items())]
+        while parts:
+            part = parts.pop()
+            try:
+                outcome, touched = self._write(dict(part))
+            except DBAPIError as exc:
+                self.db.rollback()
+                if isinstance(exc, (OperationalError, InterfaceError)) or exc.connection_invalidated:
+                    # the database is unavailable, not the rows at fault
+                    raise
+                if len(part) == 1:
+                    mls_id, (row_number, _) = part[0]
+                    self.fail(row_number, mls_id, f"Rejected by the database: {_db_error(exc)}")
+                    continue
+                middle = len(part) // 2
+                parts += [part[middle:], part[:middle]]
+                continue
+
+            self.report.inserted += outcome.inserted
+            self.report.updated += outcome.updated
+            for error in outcome.errors:
+                self.fail(error.row, error.mls_id, error.error)
+            self.touched_ids.extend(touched)
+
+    def _write(
+        self, batch: Dict[str, Tuple[int, PropertyImportRow]]
+    ) -> Tuple[ImportReport, List[int]]:
+        """
+        One batch in one transaction; returns its outcome and the ids it
+        touched, counted only once it has committed.
+        """
+        db = self.db
+        outcome = ImportReport()
+        touched: List[int] = []
+
+        def fail(row_number: int, mls_id: str, error: str) -> None:
+            outcome.failed += 1
+            outcome.errors.append(ImportRowError(row=row_number, mls_id=mls_id, error=error))
+
+        # mls_id -> (owner_id, city, price, is_archived), i.e. listing_state().
+        # Locked until the batch commits, so the stats delta is computed from
+        # the rows the upsert overwrites; taken in mls_id order so two
+        # overlapping imports queue instead of deadlocking.
+        previous = {
+            mls_id: tuple(state)
+            for mls_id, *state in db.execute(
+                select(
+                    models.Property.mls_id,
+                    models.Property.owner_id,
+                    models.Property.city,
+                    models.Property.price,
+                    models.Property.is_archived,
+                )
+                .where(models.Property.mls_id.in_(batch.keys()))
+                .order_by(models.Property.mls_id)
+                .with_for_update()
+            ).all()
+        }
+        existing = {mls_id: state[0] for mls_id, state in previous.items()}
+
+        values = []
+        for mls_id, (row_number, row) in batch.items():
+            if mls_id in existing and existing[mls_id] not in self.owner_ids:
+                fail(row_number, mls_id, "Listing belongs to another brokerage")
+                continue
+            data = row.model_dump(exclude={"images"})
+            values.append({**data, "owner_id": self.current_user.id, "is_archived": False})
+
+        if not values:
+            db.rollback()  # releases the row locks
+            return outcome, touched
+
+        # executemany form: SQLAlchemy batches it into multi-row
+        # INSERT .. VALUES .. RETURNING ("insertmanyvalues") with one cached
+        # compile, instead of compiling a 500-row VALUES clause every batch
+        table = models.Property.__table__
+        stmt = insert_for(db)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.mls_id],
+            set_={column: stmt.excluded[column] for column in _UPSERT_COLUMNS},
+            # never take over a listing we didn't own when the batch was checked
+            where=or_(*(table.c.owner_id == owner_id for owner_id in sorted(self.owner_ids))),
+        ).returning(table.c.id, table.c.mls_id)
+        ids_by_mls = dict((mls_id, pk) for pk, mls_id in db.execute(stmt, values).all())
+
+        images = []
+        replaced_galleries = []
+        stats = StatsDelta()
+        for mls_id, (row_number, row) in batch.items():
+            property_id = ids_by_mls.get(mls_id)
+            if property_id is None:
+                if mls_id not in existing or existing[mls_id] in self.owner_ids:
+                    # ownership changed between the check and the upsert
+                    fail(row_number, mls_id, "Listing belongs to another brokerage")
+                continue
+            if mls_id in existing:
+                outcome.updated += 1
+                # the upsert keeps the owner and archived flag
+                owner_id, _, _, is_archived = previous[mls_id]
+                stats.replace(previous[mls_id], (owner_id, row.city, row.price, bool(is_archived)))
+            else:
+                outcome.inserted += 1
+                stats.add(self.current_user.id, row.city, row.price)
+            touched.append(property_id)
+
+            if row.images is not None:
+                replaced_galleries.append(property_id)
+                images.extend(
+                    {"property_id": property_id, "url": url, "order_index": index}
+                    for index, url in enumerate(row.images)
+                )
+
+        if replaced_galleries:
+            db.execute(
+                delete(models.PropertyImage).where(
+                    models.PropertyImage.property_id.in_(replaced_galleries)
+                )
+            )
+        if images:
+            db.execute(insert(models.PropertyImage), images)
+        stats.apply(db)
+
+        db.commit()
+        return outcome, touched
+
+
+def _db_error(exc: DBAPIError) -> str:
+    # the driver's message, without SQLAlchemy's statement and parameters
+    message = str(exc.orig).strip()
+    return message.splitlines()[0] if message else type(exc.orig).__name__
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def import_listings(stream, fmt: str, current_user: CurrentUser) -> ImportReport:
+    """
+    Blocking: run in a worker thread. Reads the request body incrementally,
+    so memory stays at one batch regardless of feed size.
+    """
+    db = SessionLocal()
+    try:
+        records = iter_records(iter_lines(sync_chunks(stream)), fmt)
+        return ListingImporter(db, current_user).run(records)
+    finally:
+        db.close()
@@ -9,14 +9,56 @@ from sqlalchemy import (
     ForeignKey,
     CheckConstraint,
     Boolean,
+    Index,
+    JSON,
+    TypeDecorator,
+    text,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
+from decimal import ROUND_HALF_UP, Decimal
 
 from database import Base
 
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind Python datetimes
+# in the same format so keyset comparisons on created_at line up locally.
+KeysetTimestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
+def to_cents(price):
+    if price is None:
+        return None
+    return Decimal(str(price)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class Price(TypeDecorator):
+    """
+    Numeric(12, 2) rounded to cents before it's bound, so every backend
+    stores the value the app saw (Postgres would round a float itself,
+    SQLite would keep it as is) and listing_stats sums match the rows.
+    """
+    impl = Numeric(12, 2)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_cents(value)
+
+
+# Partial-index predicate for live (non-archived) listings. SQLite only uses
+# a partial index when the query's WHERE term matches it, and SQLAlchemy
+# renders `is_archived == False` there as `is_archived = 0`.
+LIVE_LISTINGS = {
+    "postgresql_where": text("is_archived = false"),
+    "sqlite_where": text("is_archived = 0"),
+}
 
 class User(Base):
     __tablename__ = "users"
@@ -36,6 +78,13 @@ class User(Base):
 
     __table_args__ = (
         CheckConstraint("role IN ('broker','agent')", name="role_check"),
+        # a broker's agents, for every permission check
+        Index(
+            "ix_users_broker_id",
+            "broker_id",
+            postgresql_where=text("broker_id IS NOT NULL"),
+            sqlite_where=text("broker_id IS NOT NULL"),
+        ),
     )
 
 
@@ -48,24 +97,49 @@ class Property(Base):
     city = Column(Text, nullable=False)
     state = Column(String(2), nullable=False)
     zip_code = Column(String(10), nullable=False)
-    price = Column(Numeric(12, 2), nullable=True)
+    price = Column(Price, nullable=True)
     beds = Column(Integer, nullable=True)
     baths = Column(Numeric(4, 1), nullable=True)
     sqft = Column(Integer, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(KeysetTimestamp, server_default=func.now())
 
     # Who owns/manages this listing
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
-    # Soft delete
+    # Soft delete; maintenance.py moves long-archived rows to properties_archive
     is_archived = Column(Boolean, default=False)
+    archived_at = Column(KeysetTimestamp, nullable=True)
     
     images = relationship(
         "PropertyImage",
         back_populates="property",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="PropertyImage.order_index, PropertyImage.id",
+        # every PropertyOut serializes images; batch them in one SELECT ... IN
+        lazy="selectin",
     )
 
+    __table_args__ = (
+        # Public feed: non-archived listings, newest first, keyset on (created_at, id)
+        Index("ix_properties_live_feed", "created_at", "id", **LIVE_LISTINGS),
+        # GET /properties: owner_id IN (...) newest first
+        Index("ix_properties_owner", "owner_id", "created_at", **LIVE_LISTINGS),
+        # Filtered feeds keep the same keyset ordering after the equality column
+        Index("ix_properties_zip_feed", "zip_code", "created_at", "id"),
+        Index("ix_properties_price", "is_archived", "price"),
+        # Bulk MLS import upserts on mls_id; NULLs (hand-entered listings) don't collide
+        Index("ux_properties_mls_id", "mls_id", unique=True),
+    )
+
+
+# City filter is case-insensitive, so index the lowered value
+Index(
+    "ix_properties_city_feed",
+    func.lower(Property.city),
+    Property.created_at,
+    Property.id,
+)
+
 class PropertyImage(Base):
     __tablename__ = "property_images"
 
@@ -77,6 +151,52 @@ class PropertyImage(Base):
 
     property = relationship("Property", back_populates="images")
 
+    __table_args__ = (
+        # galleries load as property_id IN (...) ORDER BY order_index, id
+        Index("ix_property_images_property", "property_id", "order_index", "id"),
+    )
+
+class ListingStat(Base):
+    """
+    Live listings per (owner, city, price bucket), kept in step by the
+    property write paths; see listing_stats.py.
+    """
+    __tablename__ = "listing_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    city = Column(Text, primary_key=True)
+    # log-scale bucket of the price, -1 for listings without one
+    price_bucket = Column(Integer, primary_key=True)
+    listings = Column(Integer, nullable=False, default=0)
+    price_total = Column(Numeric(16, 2), nullable=False, default=0)
+    # lowest / highest price the bucket has held since it was last empty
+    price_min = Column(Numeric(12, 2), nullable=True)
+    price_max = Column(Numeric(12, 2), nullable=True)
+
+class ArchivedProperty(Base):
+    """
+    Cold storage for listings archived longer than ARCHIVE_AFTER_DAYS, with
+    their gallery as JSON ([{"url", "caption", "order_index"}, ...]).
+    """
+    __tablename__ = "properties_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    mls_id = Column(String(50), nullable=True)
+    address = Column(Text, nullable=False)
+    city = Column(Text, nullable=False)
+    state = Column(String(2), nullable=False)
+    zip_code = Column(String(10), nullable=False)
+    price = Column(Price, nullable=True)
+    beds = Column(Integer, nullable=True)
+    baths = Column(Numeric(4, 1), nullable=True)
+    sqft = Column(Integer, nullable=True)
+    created_at = Column(KeysetTimestamp, nullable=True)
+    owner_id = Column(Integer, nullable=True)
+    archived_at = Column(KeysetTimestamp, nullable=True)
+    moved_at = Column(DateTime(timezone=True), server_default=func.now())
+    images = Column(JSON, nullable=False)
+
+
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
 
@@ -0,0 +1,25 @@
+# api/pagination.py
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, property_id: int) -> str:
+    """
+    Opaque keyset cursor for the (created_at, id) ordering.
+    """
+    raw = f"{created_at.isoformat()}|{property_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Raises ValueError for anything that isn't a cursor we handed out.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, property_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(property_id)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,113 @@
+# api/permissions.py
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, lazyload
+
+import models
+from auth import CurrentUser
+
+# Per-process, like the user cache: create_user / update_user / register
+# invalidate locally, the TTL bounds staleness on other workers.
+BROKER_AGENTS_TTL_SECONDS = float(os.getenv("BROKER_AGENTS_TTL_SECONDS", "300"))
+
+
+class BrokerAgentCache:
+    """
+    broker id -> frozenset of the ids of users whose broker_id points at them.
+
+    Each broker has a generation that invalidate() bumps (clear() bumps them
+    all): a get() that read the set before an invalidation doesn't store it
+    afterwards.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[FrozenSet[int], float]] = {}
+        self._generations: Dict[int, int] = {}
+        self._cleared = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, broker_id: int) -> Tuple[int, int]:
+        return self._cleared, self._generations.get(broker_id, 0)
+
+    def get(self, db: Session, broker_id: int) -> FrozenSet[int]:
+        with self._lock:
+            entry = self._entries.get(broker_id)
+            generation = self._generation(broker_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        agent_ids = frozenset(
+            row[0]
+            for row in db.query(models.User.id).filter(models.User.broker_id == broker_id)
+        )
+        with self._lock:
+            if self._generation(broker_id) == generation:
+                self._entries[broker_id] = (agent_ids, time.monotonic() + self.ttl_seconds)
+        return agent_ids
+
+    def invalidate(self, *broker_ids) -> None:
+        with self._lock:
+            for broker_id in broker_ids:
+                if broker_id is not None:
+                    self._entries.pop(broker_id, None)
+                    self._generations[broker_id] = self._generations.get(broker_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._cleared += 1
+
+
+broker_agents = BrokerAgentCache(BROKER_AGENTS_TTL_SECONDS)
+
+
+def owner_ids_for(db: Session, current_user: CurrentUser) -> FrozenSet[int]:
+    """
+    Brokers: themselves plus their agents.
+    Agents: only themselves.
+    """
+    if current_user.role == "broker":
+        return broker_agents.get(db, current_user.id) | {current_user.id}
+    return frozenset({current_user.id})
+
+
+def get_owned_property(
+    db: Session,
+    property_id: int,
+    current_user: CurrentUser,
+    action: str,
+    allow_archived: bool = False,
+    load_images: bool = True,
+    for_update: bool = False,
+) -> models.Property:
+    """
+    Fetch a property and check the caller may act on it, in one statement.
+
+    404 when it doesn't exist (or is archived, unless allow_archived),
+    403 "Not allowed to <action> this property" when it isn't theirs.
+
+    for_update locks the row until the transaction ends (SELECT .. FOR
+    UPDATE), for writes that compute something from what they read, like
+    the listing_stats delta.
+    """
+    allowed = models.Property.owner_id.in_(owner_ids_for(db, current_user))
+    query = db.query(models.Property, allowed.label("allowed")).filter(
+        models.Property.id == property_id
+    )
+    if not load_images:
+        query = query.options(lazyload(models.Property.images))
+    if for_update:
+        query = query.with_for_update(of=models.Property)
+
+    row = query.first()
+    if row is None or (row.Property.is_archived and not allow_archived):
+        raise HTTPException(status_code=404, detail="Property not found")
+    if not row.allowed:
+        raise HTTPException(status_code=403, detail=f"Not allowed to {action} this property")
+
+    return row.Property
@@ -0,0 +1,61 @@
+# api/replica_sync.py
+#
+# Stand-in for replication when developing against two SQLite files:
+# copies DATABASE_URL onto DATABASE_REPLICA_URL with SQLite's online backup,
+# once or every --interval seconds. The interval is the replica lag, so
+# read-your-writes can be watched locally:
+#
+#   export DATABASE_URL=sqlite:///./primary.db
+#   export DATABASE_REPLICA_URL=sqlite:///./replica.db
+#   python replica_sync.py --interval 3 &
+#   uvicorn main:app
+#
+# With Postgres, point DATABASE_REPLICA_URL at a real streaming replica
+# instead; this script is SQLite-only.
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from sqlalchemy.engine import make_url
+
+
+def sqlite_path(env_name: str) -> str:
+    url = os.getenv(env_name)
+    if not url:
+        sys.exit(f"{env_name} is not set")
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        sys.exit(f"{env_name} must be a SQLite file URL, got {url}")
+    return parsed.database
+
+
+def copy_once(primary: str, replica: str) -> None:
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the SQLite primary onto the replica file")
+    parser.add_argument("--interval", type=float, default=0, help="repeat every N seconds (0 = copy once)")
+    args = parser.parse_args()
+
+    primary = sqlite_path("DATABASE_URL")
+    replica = sqlite_path("DATABASE_REPLICA_URL")
+    while True:
+        copy_once(primary, replica)
+        print(f"copied {primary} -> {replica}", file=sys.stderr)
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
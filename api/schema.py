@@ -0,0 +1,74 @@
+# api/schema.py
+#
+# Schema migrations (Alembic, see migrations/) applied from code: the app
+# calls migrate() on startup, deploy scripts can run `python schema.py` or
+# `alembic upgrade head` instead.
+#
+# With DB_MIGRATE_ON_STARTUP=0 the app does no schema work at boot at all
+# (no connection, no introspection, Alembic never imported); the deploy
+# runs the migration once before new instances start.
+#
+# Databases built by the old create_all() startup have every table but no
+# alembic_version; they're stamped at the baseline revision first, so only
+# the later migrations run against them.
+
+import os
+import sys
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# Alembic is imported inside the functions below: it's a tenth of a second
+# of cold start that instances skipping migrations never need.
+
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+
+BASELINE_REVISION = "0001"
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Postgres advisory lock key, so several workers booting at once migrate
+# one at a time (the rest then find nothing to do).
+_MIGRATION_LOCK = 726_413_901
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(_HERE, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(_HERE, "migrations"))
+    return config
+
+
+def migrate(engine: Engine, revision: str = "head") -> None:
+    """
+    Upgrade the database to `revision`. A no-op when it's already there.
+    """
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+
+    config = alembic_config()
+    with engine.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK})
+            conn.commit()
+        try:
+            config.attributes["connection"] = conn
+            current = MigrationContext.configure(conn).get_current_revision()
+            if current is None and inspect(conn).has_table("properties"):
+                command.stamp(config, BASELINE_REVISION)
+            # end the read above, so the migrations run in their own transactions
+            conn.commit()
+            command.upgrade(config, revision)
+            conn.commit()
+        finally:
+            if postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK})
+                conn.commit()
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    migrate(engine, sys.argv[1] if len(sys.argv) > 1 else "head")
@@ -1,8 +1,12 @@
 # api/schemas.py
 from __future__ import annotations
 
-from pydantic import BaseModel, EmailStr, constr
-from typing import Optional, Literal, List
+from pydantic import BaseModel, EmailStr, computed_field, confloat, conint, constr
+from datetime import datetime
+from typing import Dict, Optional, Literal, List
+from uuid import UUID
+
+from derivatives import variant_urls
 
 
 # -------- Users --------
@@ -60,9 +64,22 @@ class PropertyImageOut(PropertyImageBase):
     id: int
     property_id: int
 
+    @computed_field
+    @property
+    def variants(self) -> Dict[str, str]:
+        """
+        Resized copies of an uploaded image: thumb / card / hero, each also
+        as *_webp, as far as they were rendered. Empty for external URLs.
+        """
+        return variant_urls(self.url)
+
     class Config:
         from_attributes = True
 
+class PropertyImageOrder(BaseModel):
+    image_ids: List[int]
+
+
 class PropertyBase(BaseModel):
     mls_id: Optional[str] = None
     address: str
@@ -75,20 +92,41 @@ class PropertyBase(BaseModel):
     sqft: Optional[int] = None
 
 
-class PropertyCreate(PropertyBase):
+# Input bounds matching the columns (models.Property), so a value the
+# database can't store is a 422 or an import row error, not a DataError.
+# Responses keep the plain PropertyBase types.
+MlsId = constr(max_length=50)
+StateCode = constr(max_length=2)
+ZipCode = constr(max_length=10)
+PriceIn = confloat(ge=0, lt=10**10)  # Numeric(12, 2)
+BathsIn = confloat(ge=0, lt=1000)  # Numeric(4, 1)
+CountIn = conint(ge=0, le=2**31 - 1)  # Integer
+
+
+class PropertyIn(PropertyBase):
+    mls_id: Optional[MlsId] = None
+    state: StateCode
+    zip_code: ZipCode
+    price: Optional[PriceIn] = None
+    beds: Optional[CountIn] = None
+    baths: Optional[BathsIn] = None
+    sqft: Optional[CountIn] = None
+
+
+class PropertyCreate(PropertyIn):
     images: Optional[List[PropertyImageCreate]] = None
 
 
 class PropertyUpdate(BaseModel):
-    mls_id: Optional[str] = None
+    mls_id: Optional[MlsId] = None
     address: Optional[str] = None
     city: Optional[str] = None
-    state: Optional[str] = None
-    zip_code: Optional[str] = None
-    price: Optional[float] = None
-    beds: Optional[int] = None
-    baths: Optional[float] = None
-    sqft: Optional[int] = None
+    state: Optional[StateCode] = None
+    zip_code: Optional[ZipCode] = None
+    price: Optional[PriceIn] = None
+    beds: Optional[CountIn] = None
+    baths: Optional[BathsIn] = None
+    sqft: Optional[CountIn] = None
     is_archived: Optional[bool] = None
 
 
@@ -101,3 +139,73 @@ class PropertyOut(PropertyBase):
     class Config:
         from_attributes = True
 
+
+
+# -------- Bulk import --------
+
+class PropertyImportRow(PropertyIn):
+    """
+    One listing from an MLS feed. mls_id is the upsert key; images are
+    plain URLs and replace the listing's gallery when present.
+    """
+    mls_id: constr(min_length=1, max_length=50)
+    images: Optional[List[str]] = None
+
+
+class ImportRowError(BaseModel):
+    row: int
+    mls_id: Optional[str] = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
+
+# -------- Broker stats --------
+
+class PriceStats(BaseModel):
+    listings: int
+    priced_listings: int
+    average_price: Optional[float] = None
+    # estimated from 5% price bands; see listing_stats.py
+    median_price: Optional[float] = None
+
+
+class CityStats(PriceStats):
+    city: str
+
+
+class AgentStats(PriceStats):
+    user_id: int
+    email: str
+
+
+class BrokerStatsOut(PriceStats):
+    """
+    Live listings of a broker and their agents: overall, per city and per
+    owner (the broker included).
+    """
+    by_city: List[CityStats] = []
+    by_agent: List[AgentStats] = []
+
+
+# -------- Chat --------
+
+class ChatMessageOut(BaseModel):
+    id: int
+    sender: Literal["user", "bot"]
+    message: str
+    created_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class ChatSessionOut(BaseModel):
+    id: UUID
+    started_at: Optional[datetime]
+    messages: List[ChatMessageOut] = []
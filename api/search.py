@@ -0,0 +1,183 @@
+# api/search.py
+#
+# Listing search over address, city, zip_code and mls_id.
+#
+# Postgres: a GIN tsvector index for whole-word matches plus a pg_trgm index
+# for typo tolerance, both partial on non-archived rows. Expression indexes
+# follow every insert/update on their own.
+#
+# SQLite (local runs): an FTS5 table with the trigram tokenizer, kept in sync
+# with `properties` by triggers so every write path (create, update, archive,
+# bulk import) updates it.
+
+import re
+from typing import List, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# Trigram overlap (0..1) a listing needs to count as a typo-tolerant hit.
+SQLITE_MIN_OVERLAP = 0.4
+
+_PG_DOCUMENT = (
+    "coalesce(address, '') || ' ' || coalesce(city, '') || ' ' "
+    "|| coalesce(zip_code, '') || ' ' || coalesce(mls_id, '')"
+)
+
+_PG_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_properties_search_tsv ON properties
+    USING gin (to_tsvector('simple', {_PG_DOCUMENT})) WHERE NOT is_archived
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_properties_search_trgm ON properties
+    USING gin (({_PG_DOCUMENT}) gin_trgm_ops) WHERE NOT is_archived
+    """,
+]
+
+_PG_SEARCH = f"""
+    SELECT id,
+           ts_rank(to_tsvector('simple', {_PG_DOCUMENT}), plainto_tsquery('simple', :q))
+           + word_similarity(:q, {_PG_DOCUMENT}) AS rank
+    FROM properties
+    WHERE NOT is_archived
+      AND (
+        to_tsvector('simple', {_PG_DOCUMENT}) @@ plainto_tsquery('simple', :q)
+        OR :q <% ({_PG_DOCUMENT})
+      )
+    ORDER BY rank DESC, id DESC
+    LIMIT :limit
+"""
+
+_SQLITE_COLUMNS = "address, city, zip_code, mls_id"
+
+_SQLITE_SETUP = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS property_search
+    USING fts5({_SQLITE_COLUMNS}, tokenize='trigram')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS property_search_ai AFTER INSERT ON properties
+    WHEN coalesce(NEW.is_archived, 0) = 0
+    BEGIN
+        INSERT INTO property_search(rowid, {_SQLITE_COLUMNS})
+        VALUES (NEW.id, NEW.address, NEW.city, NEW.zip_code, NEW.mls_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS property_search_au AFTER UPDATE ON properties
+    BEGIN
+        DELETE FROM property_search WHERE rowid = OLD.id;
+        INSERT INTO property_search(rowid, {_SQLITE_COLUMNS})
+        SELECT NEW.id, NEW.address, NEW.city, NEW.zip_code, NEW.mls_id
+        WHERE coalesce(NEW.is_archived, 0) = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS property_search_ad AFTER DELETE ON properties
+    BEGIN
+        DELETE FROM property_search WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+_SQLITE_BACKFILL = f"""
+    INSERT INTO property_search(rowid, {_SQLITE_COLUMNS})
+    SELECT id, {_SQLITE_COLUMNS} FROM properties
+    WHERE coalesce(is_archived, 0) = 0
+"""
+
+
+def create_search_index(conn: Connection) -> None:
+    """
+    Create the search index for this dialect if it isn't there yet, filled
+    from the existing listings. Run from migration 0002.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for statement in _PG_SETUP:
+            conn.execute(text(statement))
+    elif dialect == "sqlite":
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'property_search'")
+        ).first()
+        for statement in _SQLITE_SETUP:
+            conn.execute(text(statement))
+        if not existed:
+            conn.execute(text(_SQLITE_BACKFILL))
+
+
+def search_index_sql(dialect: str) -> List[str]:
+    """
+    The statements create_search_index() runs on an empty database, for
+    offline (--sql) migrations.
+    """
+    if dialect == "postgresql":
+        return list(_PG_SETUP)
+    if dialect == "sqlite":
+        return _SQLITE_SETUP + [_SQLITE_BACKFILL]
+    return []
+
+
+def drop_search_index(conn: Connection) -> None:
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text("DROP INDEX IF EXISTS ix_properties_search_trgm"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_properties_search_tsv"))
+    elif dialect == "sqlite":
+        for trigger in ("property_search_ai", "property_search_au", "property_search_ad"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        conn.execute(text("DROP TABLE IF EXISTS property_search"))
+
+
+def _trigrams(value: str) -> Set[str]:
+    trigrams = set()
+    for word in re.findall(r"\w+", value.lower()):
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+def search_property_ids(db: Session, q: str, limit: int) -> List[int]:
+    """
+    Ids of non-archived listings matching q, best match first.
+    """
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        rows = db.execute(text(_PG_SEARCH), {"q": q, "limit": limit})
+        return [row.id for row in rows]
+
+    if dialect != "sqlite":
+        raise RuntimeError(f"Listing search is not supported on {dialect}")
+
+    query_trigrams = _trigrams(q)
+    if not query_trigrams:
+        return []
+
+    # Any shared trigram is a candidate (that's what makes "charlston" find
+    # "Charleston"); bm25 orders them, then weak overlaps are dropped.
+    match = " OR ".join(f'"{t}"' for t in sorted(query_trigrams))
+    rows = db.execute(
+        text(
+            f"""
+            SELECT rowid AS id, {_SQLITE_COLUMNS}
+            FROM property_search
+            WHERE property_search MATCH :match
+            ORDER BY bm25(property_search)
+            LIMIT :candidates
+            """
+        ),
+        {"match": match, "candidates": limit * 5},
+    )
+
+    scored = []
+    for position, row in enumerate(rows):
+        document = " ".join(filter(None, (row.address, row.city, row.zip_code, row.mls_id)))
+        overlap = len(query_trigrams & _trigrams(document)) / len(query_trigrams)
+        if overlap >= SQLITE_MIN_OVERLAP:
+            scored.append((-overlap, position, row.id))
+
+    scored.sort()
+    return [property_id for _, _, property_id in scored[:limit]]
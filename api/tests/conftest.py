@@ -0,0 +1,73 @@
+# api/tests/conftest.py
+#
+# The suite runs against a scratch SQLite database (or TEST_DATABASE_URL),
+# migrated and seeded once per session with bench_routes' generator at a
+# size where list pages, image batching and query plans behave like they
+# do in production.
+
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="coastal-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_scratch}/test.db")
+os.environ["MEDIA_DIR"] = os.path.join(_scratch, "media")
+os.environ.pop("DATABASE_REPLICA_URL", None)
+# The sync engine unless TEST_DB_ASYNC=1 (test_async_engine.py reruns the
+# suite that way)
+os.environ["DB_ASYNC"] = os.getenv("TEST_DB_ASYNC", "0")
+os.environ.setdefault("PASSWORD_WORKERS", "0")
+
+import argparse
+import copy
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+DATASET = argparse.Namespace(
+    brokers=3,
+    agents_per_broker=4,
+    properties=5000,
+    images_per_property=4,
+)
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    """
+    Ids from bench_routes.seed(); use `data` for a copy that's safe to mutate.
+    """
+    import bench_routes
+    import schema
+    from database import engine
+
+    schema.migrate(engine)
+    return bench_routes.seed(DATASET, random.Random(1))
+
+
+@pytest.fixture
+def data(dataset):
+    return copy.deepcopy(dataset)
+
+
+@pytest.fixture(scope="module")
+def client(dataset):
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def broker(client, dataset):
+    """
+    Authorization header for the first seeded broker.
+    """
+    import bench_routes
+
+    response = client.post(
+        "/auth/login",
+        data={"username": dataset["broker_email"], "password": bench_routes.PASSWORD},
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,42 @@
+# api/tests/test_async_engine.py
+#
+# The routes behave the same on the asyncio engine (DB_ASYNC=1): the
+# default run repeats the suite against it in a subprocess, and that run
+# checks its requests really go through the async pool.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import database
+import metrics
+
+
+def _checkouts(name):
+    sample = metrics.registry.get_sample_value("db_pool_checkouts_total", {"engine": name})
+    return sample or 0.0
+
+
+def test_suite_passes_on_the_async_engine():
+    if database.DB_ASYNC:
+        pytest.skip("already running on the async engine")
+    if os.getenv("TEST_DATABASE_URL"):
+        pytest.skip("would reseed TEST_DATABASE_URL; run TEST_DB_ASYNC=1 separately")
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "TEST_DB_ASYNC": "1"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout[-4000:] + result.stderr[-4000:]
+
+
+def test_routes_use_the_async_pool(client, broker):
+    if not database.DB_ASYNC:
+        pytest.skip("runs in the DB_ASYNC=1 pass")
+    before = _checkouts("async")
+    assert client.get("/properties?limit=5", headers=broker).status_code == 200
+    assert _checkouts("async") > before
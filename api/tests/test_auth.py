@@ -0,0 +1,54 @@
+# api/tests/test_auth.py
+#
+# Authenticated requests take the user from the token's claims; the user
+# cache (or one lookup on a miss) only confirms the claims still hold.
+
+import uuid
+
+from auth import create_access_token, user_cache
+
+
+def _agent(client, broker):
+    """
+    A fresh agent of the test broker: (id, Authorization header).
+    """
+    email = f"agent-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post(
+        "/users",
+        json={"email": email, "password": "agent-password", "role": "agent"},
+        headers=broker,
+    )
+    assert response.status_code == 200, response.text
+    login = client.post("/auth/login", data={"username": email, "password": "agent-password"})
+    assert login.status_code == 200, login.text
+    return response.json()["id"], {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def test_cached_user_needs_no_queries(client, broker):
+    user_cache.clear()
+    first = client.get("/auth/me", headers=broker)
+    assert first.status_code == 200
+    assert int(first.headers["X-SQL-Queries"]) == 1
+
+    again = client.get("/auth/me", headers=broker)
+    assert again.json() == first.json()
+    assert int(again.headers["X-SQL-Queries"]) == 0
+
+
+def test_token_refused_once_its_claims_are_out_of_date(client, broker):
+    agent_id, agent = _agent(client, broker)
+    assert client.get("/auth/me", headers=agent).json()["role"] == "agent"
+
+    promoted = client.put(f"/users/{agent_id}", json={"role": "broker"}, headers=broker)
+    assert promoted.status_code == 200
+    stale = client.get("/auth/me", headers=agent)
+    assert stale.status_code == 401
+    assert stale.json()["detail"] == "Token is out of date, log in again"
+
+
+def test_tokens_without_role_claims_still_work(client, broker, dataset):
+    # issued before uid / role / broker_id were claims
+    legacy = create_access_token({"sub": dataset["broker_email"]})
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {legacy}"})
+    assert response.status_code == 200
+    assert response.json()["email"] == dataset["broker_email"]
@@ -0,0 +1,37 @@
+# api/tests/test_cache.py
+#
+# Cache keys keep query values apart, and a read that a write overtook
+# doesn't store what it read.
+
+from cache import ResponseCache, public_cache
+
+
+def test_encoded_query_values_get_their_own_key(client):
+    public_cache.clear()
+    literal = client.get("/public/properties?city=Charleston%26limit%3D1")
+    assert literal.status_code == 200 and literal.json() == []
+
+    real = client.get("/public/properties?city=Charleston&limit=1")
+    assert len(real.json()) == 1
+    assert real.headers.get("X-Next-Cursor")
+
+
+def test_read_overtaken_by_a_write_is_not_stored():
+    cache = ResponseCache(max_entries=8, ttl_seconds=30)
+
+    generation = cache.generation()
+    # the write lands after the read queried, before it stores its result
+    cache.invalidate("property:1")
+    entry = cache.set("/a", b"[1]", tags=["property:1"], generation=generation)
+    assert entry.body == b"[1]"
+    assert cache.get("/a") is None
+
+    # other tags, and reads that started after the write, are stored
+    cache.set("/b", b"[2]", tags=["property:2"], generation=generation)
+    cache.set("/a", b"[1]", tags=["property:1"], generation=cache.generation())
+    assert cache.get("/a") is not None and cache.get("/b") is not None
+
+    generation = cache.generation()
+    cache.clear()
+    cache.set("/b", b"[2]", tags=["property:2"], generation=generation)
+    assert cache.get("/b") is None
@@ -0,0 +1,97 @@
+# api/tests/test_chat_log.py
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import DataError, OperationalError
+
+import chat_log as chat_log_module
+import models
+from chat_log import CHAT_MESSAGE_MAX_CHARS, ChatLog
+from database import SessionLocal
+from instrumentation import count_queries
+
+
+def _stored(session_id):
+    with SessionLocal() as db:
+        return db.scalars(
+            select(models.ChatMessage.message)
+            .where(models.ChatMessage.session_id == session_id)
+            .order_by(models.ChatMessage.id)
+        ).all()
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def log(dataset):
+    return ChatLog(batch_size=8, interval=0.05, max_pending=100, wait_seconds=0.1)
+
+
+def test_rejected_message_does_not_block_the_rest(log, monkeypatch):
+    write = chat_log_module.write_batch
+
+    def picky_write(batch):
+        if any("\x00" in m.message for m in batch):
+            raise DataError("INSERT", {}, ValueError("A string literal cannot contain NUL (0x00) characters."))
+        write(batch)
+
+    monkeypatch.setattr(chat_log_module, "write_batch", picky_write)
+    session_id = uuid4()
+
+    async def scenario():
+        for n in range(20):
+            await log.record(session_id, "user", f"bad\x00{n}" if n == 13 else f"message {n}")
+        flushed = await log.flush()
+        await log.close()
+        return flushed
+
+    assert _run(scenario()) is True
+    assert log.rejected == 1
+    assert _stored(session_id) == [f"message {n}" for n in range(20) if n != 13]
+
+
+def test_unavailable_database_is_retried(log, monkeypatch):
+    write = chat_log_module.write_batch
+    failures = [2]
+
+    def flaky_write(batch):
+        if failures[0]:
+            failures[0] -= 1
+            raise OperationalError("INSERT", {}, ConnectionError("server closed the connection"))
+        write(batch)
+
+    monkeypatch.setattr(chat_log_module, "write_batch", flaky_write)
+    session_id = uuid4()
+
+    async def scenario():
+        await log.record(session_id, "user", "hello")
+        assert await log.flush() is False
+        while not await log.flush():
+            pass
+        await log.close()
+
+    _run(scenario())
+    assert log.rejected == 0
+    assert _stored(session_id) == ["hello"]
+
+
+def test_flusher_runs_outside_the_request_context(log):
+    async def scenario():
+        with count_queries() as counter:
+            # the first record() of a log without a lifespan starts the flusher
+            await log.record(uuid4(), "user", "hi")
+            await log.flush()
+        await log.close()
+        return counter.count
+
+    assert _run(scenario()) == 0
+
+
+def test_chat_message_length_is_capped(client):
+    response = client.post("/chat", json={"message": "x" * (CHAT_MESSAGE_MAX_CHARS + 1)})
+    assert response.status_code == 422
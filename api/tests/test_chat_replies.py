@@ -0,0 +1,136 @@
+# api/tests/test_chat_replies.py
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import models
+from chat_stream import ReplyGenerator, RuleReplyGenerator, generate_reply
+from intents import intent_matcher
+from listing_index import listing_index, parse_listing_query
+
+
+def _reply(message):
+    return asyncio.run(generate_reply(RuleReplyGenerator(), message, uuid4()))
+
+
+def _is_listing_answer(reply):
+    return reply.startswith(("Here are a few listings", "I don't see any listings"))
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "3 bed in Charleston under 450k",
+        "homes in Greenville",
+        "homes in Myrtle Beach",
+        "Charleston under 600k",
+        "show me 4 bedroom houses",
+        "find me something under $500,000 I can get a mortgage for",
+        "show me homes with up to 4 bedrooms",
+    ],
+)
+def test_listing_searches(dataset, message):
+    assert _is_listing_answer(_reply(message))
+
+
+@pytest.mark.parametrize(
+    "message, intent",
+    [
+        ("Can I get a mortgage for $400,000?", "financing"),
+        ("what loan do I need for a 300k house", "financing"),
+        ("can I book a tour this weekend", "tours"),
+        ("tell me about Greenville", "areas"),
+    ],
+)
+def test_other_topics_go_to_the_intents(dataset, message, intent):
+    reply = _reply(message)
+    assert not _is_listing_answer(reply)
+    assert reply == intent_matcher.match(message).render()
+    assert intent_matcher.match(message).intent.name == intent
+
+
+@pytest.mark.parametrize(
+    "message, budget",
+    [
+        ("show me homes with up to 4 bedrooms", None),
+        ("homes with max 3 baths", None),
+        ("homes up to $500k", 500_000),
+        ("homes under 450000", 450_000),
+        ("homes under 450k with 3 beds", 450_000),
+    ],
+)
+def test_budgets_need_a_money_cue(dataset, message, budget):
+    assert parse_listing_query(message)[2] == budget
+    if budget is None:
+        assert "under $" not in _reply(message)
+
+
+def test_cities_match_whatever_their_spacing(dataset):
+    listing_index.put(
+        models.Property(
+            id=10**9,
+            address="1 Spacing St",
+            city="North  Myrtle   Beach",
+            beds=3,
+            baths=2,
+            price=350_000,
+            is_archived=False,
+        )
+    )
+    try:
+        assert listing_index.find_city("homes in north myrtle  beach") == "north myrtle beach"
+        assert "1 Spacing St" in _reply("homes in North Myrtle Beach")
+    finally:
+        listing_index.discard(10**9)
+
+
+def test_generators_must_implement_stream():
+    class Incomplete(ReplyGenerator):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_websocket_closes_on_binary_frames(client):
+    with client.websocket_connect("/chat/ws") as ws:
+        assert ws.receive_json()["type"] == "session"
+        ws.send_json({"message": "can I book a tour this weekend"})
+        while ws.receive_json()["type"] != "done":
+            pass
+
+        ws.send_bytes(b'{"message": "hi"}')
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+        assert closed.value.code == 1003
+
+
+def test_stream_keeps_the_partial_reply_on_disconnect(monkeypatch):
+    import main
+
+    class Slow(ReplyGenerator):
+        async def stream(self, message, session_id):
+            yield "Hello"
+            yield " there"
+            await asyncio.sleep(60)
+            yield "never sent"
+
+    recorded = []
+
+    async def record(session_id, sender, message):
+        recorded.append((sender, message))
+
+    monkeypatch.setattr(main.chat_log, "record", record)
+
+    async def disconnect_mid_stream():
+        response = await main.chat_stream_endpoint(main.ChatRequest(message="hi"), Slow())
+        events = response.body_iterator
+        for _ in range(3):  # the session event and two tokens
+            await events.__anext__()
+        await events.aclose()
+
+    asyncio.run(disconnect_mid_stream())
+    assert recorded == [("user", "hi"), ("bot", "Hello there")]
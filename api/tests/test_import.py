@@ -0,0 +1,86 @@
+# api/tests/test_import.py
+#
+# Bad rows in an MLS feed are reported one by one, whether the schema or
+# the database refuses them, and the rest of the feed is imported.
+
+import pytest
+from sqlalchemy import select, text
+
+import models
+from database import SessionLocal, engine
+
+# every listing gets an image: the budget tests expect galleries
+HEADER = "mls_id,address,city,state,zip_code,price,images\n"
+IMAGE = ",https://img.example/import.jpg"
+
+
+def _import(client, broker, feed):
+    response = client.post(
+        "/properties/import",
+        content=feed.encode(),
+        headers={**broker, "content-type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _addresses(*mls_ids):
+    with SessionLocal() as db:
+        return dict(
+            db.execute(
+                select(models.Property.mls_id, models.Property.address).where(
+                    models.Property.mls_id.in_(mls_ids)
+                )
+            ).all()
+        )
+
+
+@pytest.fixture
+def rejecting_trigger():
+    """
+    Make the database itself refuse one address, like Postgres refusing a
+    value it can't store.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TRIGGER reject_import BEFORE INSERT ON properties "
+            "WHEN NEW.address = 'Rejected Rd' "
+            "BEGIN SELECT RAISE(ABORT, 'address refused'); END"
+        ))
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER reject_import"))
+
+
+def test_column_limits_are_row_errors(client, broker):
+    report = _import(
+        client,
+        broker,
+        HEADER
+        + "LIM-1,1 Long St,Charleston,South Carolina,29401,300000" + IMAGE + "\n"
+        + "LIM-2,2 Long St,Charleston,SC,29401-12345678,300000" + IMAGE + "\n"
+        + "LIM-3,3 Short St,Charleston,SC,29401,300000" + IMAGE + "\n",
+    )
+    assert report["inserted"] == 1 and report["failed"] == 2
+    assert [(e["row"], e["mls_id"]) for e in report["errors"]] == [(1, "LIM-1"), (2, "LIM-2")]
+    assert "state" in report["errors"][0]["error"]
+    assert list(_addresses("LIM-1", "LIM-2", "LIM-3")) == ["LIM-3"]
+
+
+def test_rows_the_database_rejects_are_found_and_reported(client, broker, rejecting_trigger):
+    rows = [f"DB-{n},{n} Fine Ave,Charleston,SC,29401,300000" + IMAGE + "\n" for n in range(7)]
+    rows[4] = "DB-4,Rejected Rd,Charleston,SC,29401,300000" + IMAGE + "\n"
+    report = _import(client, broker, HEADER + "".join(rows))
+
+    assert report["inserted"] == 6 and report["failed"] == 1
+    error, = report["errors"]
+    assert (error["row"], error["mls_id"]) == (5, "DB-4")
+    assert "address refused" in error["error"]
+    assert len(_addresses(*(f"DB-{n}" for n in range(7)))) == 6
+
+
+def test_only_newlines_end_a_row(client, broker):
+    address = "4 Line\u2028Sep\x85Ave"
+    report = _import(client, broker, HEADER + f"NL-1,{address},Charleston,SC,29401,300000" + IMAGE + "\r\n")
+    assert report == {"inserted": 1, "updated": 0, "failed": 0, "errors": []}
+    assert _addresses("NL-1") == {"NL-1": address}
@@ -0,0 +1,125 @@
+# api/tests/test_listing_stats.py
+#
+# The write paths read a listing's old state to compute their listing_stats
+# delta; that read must lock the row, and the aggregate must still match a
+# rebuild afterwards.
+
+import pytest
+from sqlalchemy import delete, event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import listing_stats
+import models
+from database import SessionLocal, engine
+
+
+@pytest.fixture
+def locked_reads():
+    """
+    Every SELECT run through a Session, rendered for Postgres (SQLite drops
+    FOR UPDATE), and whether it locks.
+    """
+    reads = []
+
+    def record(state):
+        if state.is_select:
+            sql = str(state.statement.compile(dialect=postgresql.dialect()))
+            reads.append((sql, "FOR UPDATE" in sql))
+
+    event.listen(Session, "do_orm_execute", record)
+    yield reads
+    event.remove(Session, "do_orm_execute", record)
+
+
+def _stats():
+    with SessionLocal() as db:
+        return sorted(
+            (row.owner_id, row.city, row.price_bucket, row.listings, row.price_total)
+            for row in db.scalars(select(models.ListingStat))
+            if row.listings
+        )
+
+
+def _rebuilt():
+    with engine.begin() as conn:
+        listing_stats.rebuild(conn)
+    return _stats()
+
+
+def _property_reads(reads):
+    return [locked for sql, locked in reads if "FROM properties" in sql]
+
+
+def test_writes_lock_the_listing_they_change(client, broker, locked_reads):
+    before = _rebuilt()
+
+    # a listing of its own, so the seeded ones stay as the other tests expect
+    feed = (
+        "mls_id,address,city,state,zip_code,price,images\n"
+        "LOCK-1,1 Lock St,Charleston,SC,29401,300000,https://img.example/lock-1.jpg\n"
+    )
+    for _ in range(2):  # insert, then update the same listing
+        response = client.post(
+            "/properties/import",
+            content=feed,
+            headers={**broker, "content-type": "text/csv"},
+        )
+        assert response.status_code == 200 and not response.json()["failed"]
+    assert any(_property_reads(locked_reads))
+    assert _stats() != before
+
+    with SessionLocal() as db:
+        property_id = db.scalar(select(models.Property.id).where(models.Property.mls_id == "LOCK-1"))
+
+    locked_reads.clear()
+    response = client.put(
+        f"/properties/{property_id}",
+        json={"city": "Beaufort", "price": 512345},
+        headers=broker,
+    )
+    assert response.status_code == 200
+    assert any(_property_reads(locked_reads))
+    assert _stats() == _rebuilt()
+
+    locked_reads.clear()
+    assert client.delete(f"/properties/{property_id}", headers=broker).status_code == 204
+    assert any(_property_reads(locked_reads))
+    assert _stats() == _rebuilt() == before
+
+
+def test_median_stays_within_the_prices(dataset):
+    with SessionLocal() as db:
+        owner_id = db.scalar(select(models.User.id).order_by(models.User.id))
+        skewed = (1000, 2000, 100000, 100001, 100002)
+        try:
+            for price in skewed:
+                # one write at a time, so the bounds go through the upsert
+                delta = listing_stats.StatsDelta()
+                delta.add(owner_id, "Skewville", price)
+                delta.apply(db)
+            db.commit()
+
+            city, = (c for c in listing_stats.broker_stats(db, [owner_id]).by_city if c.city == "Skewville")
+            assert city.median_price == 100000
+            assert city.average_price == sum(skewed) / len(skewed)
+
+            # an emptied bucket forgets its bounds
+            delta = listing_stats.StatsDelta()
+            for price in skewed[2:]:
+                delta.remove(owner_id, "Skewville", price)
+            delta.apply(db)
+            delta.add(owner_id, "Skewville", 99000)
+            delta.apply(db)
+            db.commit()
+            bounds = {
+                (row.price_min, row.price_max)
+                for row in db.scalars(
+                    select(models.ListingStat).where(models.ListingStat.city == "Skewville")
+                )
+                if row.listings
+            }
+            assert len(bounds) == 3 and all(low == high for low, high in bounds)
+        finally:
+            db.execute(delete(models.ListingStat).where(models.ListingStat.city == "Skewville"))
+            db.commit()
@@ -0,0 +1,84 @@
+# api/tests/test_metrics.py
+#
+# Pool checkouts are timed by the pool itself, however the connection is
+# asked for, with the time to open a new connection reported separately.
+
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+import metrics
+
+
+def _sample(metric, name):
+    return metrics.registry.get_sample_value(metric, {"engine": name}) or 0.0
+
+
+@pytest.fixture
+def pool_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metrics.TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2,
+    )
+    name = f"test_{tmp_path.name}"
+    metrics.instrument_engine(engine, name)
+    yield engine, name
+    engine.dispose()
+
+
+def test_connecting_is_not_counted_as_waiting(pool_engine):
+    engine, name = pool_engine
+
+    @event.listens_for(engine, "do_connect")
+    def slow_connect(dialect, conn_rec, cargs, cparams):
+        time.sleep(0.2)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert _sample("db_pool_connections_created_total", name) == 1
+    assert _sample("db_pool_connect_seconds_sum", name) >= 0.2
+    assert _sample("db_pool_wait_seconds_count", name) == 1
+    assert _sample("db_pool_wait_seconds_sum", name) < 0.1
+
+
+def test_timeouts_count_the_wait(pool_engine):
+    engine, name = pool_engine
+
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    assert _sample("db_pool_timeouts_total", name) == 1
+    assert _sample("db_pool_checkouts_total", name) == 1
+    assert _sample("db_pool_wait_seconds_count", name) == 2
+    assert _sample("db_pool_wait_seconds_sum", name) >= 0.2
+
+
+def test_checkouts_after_dispose_are_still_timed(pool_engine):
+    engine, name = pool_engine
+
+    engine.dispose()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert _sample("db_pool_checkouts_total", name) == 1
+    assert _sample("db_pool_wait_seconds_count", name) == 1
+
+
+def test_session_and_raw_connections_are_timed(pool_engine):
+    engine, name = pool_engine
+
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+    raw = engine.raw_connection()
+    raw.close()
+
+    assert _sample("db_pool_checkouts_total", name) == 2
+    assert _sample("db_pool_wait_seconds_count", name) == 2
@@ -0,0 +1,122 @@
+# api/tests/test_migrations.py
+#
+# Upgrading a database built by the original create_all() startup (no
+# alembic_version) must end with the same schema objects as a fresh one.
+
+from alembic import command
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+import schema
+from search import search_property_ids
+
+# What create_all() made from the original models.
+BASELINE_INDEXES = {
+    "users": {"ix_users_id", "ix_users_email"},
+    "properties": {"ix_properties_id"},
+    "property_images": {"ix_property_images_id"},
+    "chat_sessions": {"ix_chat_sessions_id"},
+    "chat_messages": {"ix_chat_messages_id"},
+}
+
+
+def _indexes(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def _head():
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(schema.alembic_config()).get_current_head()
+
+
+def _pre_migrations_database(tmp_path):
+    """
+    A database as the old startup left it: the baseline schema, some
+    listings (two sharing an mls_id, one archived), no alembic_version.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    schema.migrate(engine, "0001")
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE alembic_version"))
+        # plain SQL: the current models have columns the baseline doesn't
+        conn.execute(
+            text(
+                "INSERT INTO users (id, email, hashed_password, role, is_active) "
+                "VALUES (1, 'legacy@example.com', 'x', 'broker', 1)"
+            )
+        )
+        listing = {"city": "Charleston", "state": "SC", "zip_code": "29401", "owner_id": 1, "price": 450000}
+        conn.execute(
+            text(
+                "INSERT INTO properties (mls_id, address, city, state, zip_code, owner_id, price, is_archived) "
+                "VALUES (:mls_id, :address, :city, :state, :zip_code, :owner_id, :price, :is_archived)"
+            ),
+            [
+                {**listing, "mls_id": "DUP1", "address": "1 King St", "is_archived": False},
+                {**listing, "mls_id": "DUP1", "address": "2 Meeting St", "is_archived": False},
+                {**listing, "mls_id": "UNIQUE1", "address": "3 Ocean Blvd", "is_archived": False},
+                {**listing, "mls_id": None, "address": "4 Bay St", "is_archived": True},
+            ],
+        )
+    return engine
+
+
+def test_baseline_matches_create_all(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    schema.migrate(engine, "0001")
+    tables = set(inspect(engine).get_table_names()) - {"alembic_version"}
+    assert tables == set(BASELINE_INDEXES)
+    for table, indexes in BASELINE_INDEXES.items():
+        assert _indexes(engine, table) == indexes
+
+
+def test_upgrade_from_create_all_database(tmp_path):
+    engine = _pre_migrations_database(tmp_path)
+    schema.migrate(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == _head()
+
+    fresh = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    schema.migrate(fresh)
+    for table in inspect(fresh).get_table_names():
+        assert _indexes(engine, table) == _indexes(fresh, table), table
+    assert "property_search" in inspect(engine).get_table_names()
+
+    with Session(engine) as db:
+        # the duplicate kept by its oldest listing, the rest cleared
+        mls_ids = db.execute(select(models.Property.address, models.Property.mls_id).order_by(models.Property.id)).all()
+        assert [mls_id for _, mls_id in mls_ids] == ["DUP1", None, "UNIQUE1", None]
+
+        # search was backfilled with the live listings and follows new writes
+        assert set(search_property_ids(db, "ocean", 10)) == {3}
+        assert search_property_ids(db, "Bay St", 10) == []
+
+        # the import upsert needs ux_properties_mls_id
+        db.execute(
+            sqlite_insert(models.Property.__table__)
+            .values(mls_id="UNIQUE1", address="3 Ocean Blvd", city="Charleston", state="SC", zip_code="29401")
+            .on_conflict_do_update(index_elements=["mls_id"], set_={"price": 500000})
+        )
+        db.commit()
+        assert db.scalar(select(models.Property.price).where(models.Property.mls_id == "UNIQUE1")) == 500000
+
+
+def test_downgrade_to_baseline_and_back(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/roundtrip.db")
+    schema.migrate(engine)
+    upgraded = {table: _indexes(engine, table) for table in inspect(engine).get_table_names()}
+
+    config = schema.alembic_config()
+    with engine.begin() as conn:
+        config.attributes["connection"] = conn
+        command.downgrade(config, "0001")
+    assert set(inspect(engine).get_table_names()) - {"alembic_version"} == set(BASELINE_INDEXES)
+    for table, indexes in BASELINE_INDEXES.items():
+        assert _indexes(engine, table) == indexes
+
+    schema.migrate(engine)
+    assert {table: _indexes(engine, table) for table in inspect(engine).get_table_names()} == upgraded
@@ -0,0 +1,97 @@
+# api/tests/test_query_budgets.py
+#
+# Every route in main.QUERY_BUDGETS, at the seeded data size and with cold
+# caches (the worst case), must stay within its SQL statement budget.
+
+import pytest
+
+from sqlalchemy import select
+
+import main
+import models
+from auth import user_cache
+from cache import public_cache
+from database import SessionLocal
+from permissions import broker_agents
+
+
+def _requests(data):
+    """
+    Route -> URLs that exercise it (filters, largest page, later pages).
+    """
+    return {
+        ("GET", "/public/properties"): [
+            "/public/properties",
+            f"/public/properties?limit={main.PROPERTY_PAGE_MAX}",
+            "/public/properties?city=Charleston&min_beds=3&max_price=900000",
+            "/public/properties?zip_code=29577&min_price=300000",
+        ],
+        ("GET", "/public/properties/{property_id}"): [f"/public/properties/{data['public'][0]}"],
+        ("GET", "/public/properties/search"): [
+            "/public/properties/search?q=charlston",
+            "/public/properties/search?q=ocean&limit=100",
+        ],
+        ("GET", "/properties"): ["/properties", f"/properties?limit={main.PROPERTY_PAGE_MAX}"],
+        ("GET", "/properties/{property_id}"): [f"/properties/{data['owned'][0]}"],
+        ("GET", "/brokers/me/stats"): ["/brokers/me/stats"],
+    }
+
+
+def _cold_get(client, url, headers):
+    user_cache.clear()
+    broker_agents.clear()
+    public_cache.clear()
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, f"{url}: {response.status_code} {response.text[:200]}"
+    return response
+
+
+def test_every_budget_is_exercised(dataset):
+    assert set(_requests(dataset)) == set(main.QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("route", sorted(main.QUERY_BUDGETS), ids=lambda route: " ".join(route))
+def test_route_within_budget(client, broker, data, route):
+    budget = main.QUERY_BUDGETS[route]
+    for url in _requests(data)[route]:
+        response = _cold_get(client, url, broker)
+        assert int(response.headers["X-SQL-Queries"]) <= budget, (
+            f"{url} ran {response.headers['X-SQL-Queries']} SQL statements (budget {budget})"
+        )
+
+
+def test_broker_listing_pages_within_budget(client, broker):
+    me = client.get("/auth/me", headers=broker).json()
+    with SessionLocal() as db:
+        team = select(models.User.id).where(models.User.broker_id == me["id"])
+        live = db.scalars(
+            select(models.Property.id).where(
+                models.Property.is_archived == False,
+                models.Property.owner_id.in_(team) | (models.Property.owner_id == me["id"]),
+            )
+        ).all()
+    # more listings than one selectin IN batch, so an unpaginated list would overrun
+    assert len(live) > 500
+
+    budget = main.QUERY_BUDGETS[("GET", "/properties")]
+    seen = []
+    url = f"/properties?limit={main.PROPERTY_PAGE_MAX}"
+    while url:
+        response = _cold_get(client, url, broker)
+        assert int(response.headers["X-SQL-Queries"]) <= budget
+        page = response.json()
+        assert 0 < len(page) <= main.PROPERTY_PAGE_MAX
+        assert all(prop["images"] for prop in page)
+        seen += [prop["id"] for prop in page]
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/properties?limit={main.PROPERTY_PAGE_MAX}&cursor={cursor}" if cursor else None
+
+    assert sorted(seen) == sorted(live)
+
+
+def test_strict_mode_fails_the_request(client, broker, data, monkeypatch):
+    monkeypatch.setitem(main.QUERY_BUDGETS, ("GET", "/properties/{property_id}"), 0)
+    monkeypatch.setattr(main, "QUERY_BUDGET_STRICT", True)
+    response = client.get(f"/properties/{data['owned'][0]}", headers=broker)
+    assert response.status_code == 500
+    assert "budget 0" in response.json()["detail"]
@@ -0,0 +1,19 @@
+# api/tests/test_query_plans.py
+#
+# explain_check.py on the test dataset: one request per bench_routes
+# scenario, every statement EXPLAINed. Fails on a full scan of a table
+# with 1000+ rows (other than the expected ones) or a route over budget.
+
+import asyncio
+
+import explain_check
+import main
+
+
+def test_no_full_scans_or_overruns(data):
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            return await explain_check.explain_routes(data, min_rows=1000)
+
+    problems = asyncio.run(run())
+    assert not problems, "\n".join(problems)
@@ -0,0 +1,153 @@
+# api/tests/test_uploads.py
+#
+# The upload routes read the multipart stream themselves: oversized bodies
+# are refused before (Content-Length) or while (chunked) they arrive.
+
+import asyncio
+import os
+
+import bench_routes
+import derivatives
+import main
+import media
+
+MB = 1024 * 1024
+PNG = bench_routes.tiny_png(7)
+FORM = {"content-type": "multipart/form-data; boundary=XyZ"}
+
+
+def _body(field, megabytes):
+    """
+    One file part: a PNG header followed by `megabytes` of padding.
+    """
+    yield (
+        f'--XyZ\r\nContent-Disposition: form-data; name="{field}"; filename="big.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + PNG[:16]
+    for _ in range(megabytes):
+        yield b"\0" * MB
+    yield b"\r\n--XyZ--\r\n"
+
+
+def _post(path, chunks, headers):
+    """
+    POST straight through the ASGI app; returns (status, chunks it read).
+    """
+    chunks = iter(chunks)
+    read = 0
+    sent = []
+
+    async def receive():
+        nonlocal read
+        chunk = next(chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        read += 1
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("test", 80),
+        "client": ("test", 1),
+        "root_path": "",
+    }
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            await main.app(scope, receive, send)
+
+    asyncio.run(run())
+    return sent[0]["status"], read
+
+
+def _leftover_parts():
+    return [name for name in os.listdir(media.MEDIA_DIR) if name.endswith(".part")]
+
+
+def test_chunked_upload_aborts_at_the_size_limit(monkeypatch):
+    monkeypatch.setattr(media, "MAX_UPLOAD_BYTES", 4 * MB)
+    status, read = _post("/uploads/image", _body("file", 50), FORM)
+    assert status == 413
+    # refused around the 4 MB mark, not after the whole 50 MB
+    assert read <= 6
+    assert _leftover_parts() == []
+
+
+def test_content_length_checked_per_route(monkeypatch):
+    monkeypatch.setattr(media, "MAX_UPLOAD_BYTES", 4 * MB)
+    too_big_for_one = str(6 * MB)
+    status, read = _post("/uploads/image", _body("file", 1), {**FORM, "content-length": too_big_for_one})
+    assert (status, read) == (413, 0)
+
+    # a gallery of several files may be that large
+    status, _ = _post("/uploads/images", _body("files", 0), {**FORM, "content-length": too_big_for_one})
+    assert status != 413
+
+
+def test_upload_routes(client):
+    one = client.post("/uploads/image", files={"file": ("a.png", PNG, "image/png")})
+    assert one.status_code == 200
+    assert one.json()["url"].endswith(".png")
+
+    gallery = [("files", (f"{n}.png", bench_routes.tiny_png(100 + n), "image/png")) for n in range(3)]
+    many = client.post("/uploads/images", files=gallery)
+    assert many.status_code == 200
+    assert len({image["url"] for image in many.json()}) == 3
+
+    two = [("file", ("a.png", PNG, "image/png")), ("file", ("b.png", PNG, "image/png"))]
+    assert client.post("/uploads/image", files=two).status_code == 413
+    assert client.post("/uploads/image", files={"file": ("a.txt", b"not an image at all", "text/plain")}).status_code == 415
+    assert client.post("/uploads/image", files={"other": ("a.png", PNG, "image/png")}).status_code == 400
+    assert _leftover_parts() == []
+
+
+def test_variants_only_listed_once_rendered(client, monkeypatch):
+    rendered = client.post("/uploads/image", files={"file": ("r.png", bench_routes.tiny_png(200), "image/png")})
+    variants = rendered.json()["variants"]
+    assert set(variants) == {f"{v}{webp}" for v in derivatives.VARIANT_WIDTHS for webp in ("", "_webp")}
+    for url in variants.values():
+        assert os.path.exists(os.path.join(media.MEDIA_DIR, url.rpartition("/")[2]))
+
+    # rendering skipped (e.g. the process pool was shut down): nothing to list
+    async def not_rendered(path):
+        return []
+
+    monkeypatch.setattr(media, "generate_variants", not_rendered)
+    plain = client.post("/uploads/image", files={"file": ("p.png", bench_routes.tiny_png(201), "image/png")})
+    assert plain.status_code == 200
+    assert plain.json()["variants"] == {}
+    assert derivatives.variant_urls("https://images.example.com/1/0.jpg") == {}
+
+
+def test_missing_manifests_are_remembered(monkeypatch):
+    opened = []
+
+    def counting_open(path, *args, **kwargs):
+        opened.append(path)
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(derivatives, "open", counting_open, raising=False)
+
+    assert derivatives.variant_urls(f"/media/{'a' * 64}.jpg") == {}
+    assert derivatives.variant_urls(f"/media/{'a' * 64}.jpg") == {}
+    assert derivatives.variant_urls(f"/media/{'b' * 64}.heic") == {}
+    assert len(opened) == 1
+
+    # rendering here forgets the miss straight away
+    name = f"{'c' * 64}.png"
+    path = os.path.join(media.MEDIA_DIR, name)
+    with open(path, "wb") as f:
+        f.write(bench_routes.tiny_png(300))
+    assert derivatives.variant_urls(f"/media/{name}") == {}
+    asyncio.run(derivatives.generate_variants(path))
+    assert "thumb" in derivatives.variant_urls(f"/media/{name}")
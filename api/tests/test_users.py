@@ -0,0 +1,98 @@
+# api/tests/test_users.py
+#
+# Moving an agent between brokers changes both brokers' ownership sets; the
+# cached sets must be dropped once the move is committed (or has failed), not
+# before, or a read in between caches the old set again; and a read that
+# started before the invalidation doesn't store what it read.
+
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import models
+from database import SessionLocal
+from permissions import BrokerAgentCache, broker_agents
+
+
+@pytest.fixture
+def moves(client, broker, dataset, monkeypatch):
+    """
+    (new agent id, its broker, another broker), and a list that records
+    each broker_agents.invalidate() call with the agent's committed broker.
+    """
+    response = client.post(
+        "/users",
+        json={
+            "email": f"agent-{uuid.uuid4().hex[:8]}@example.com",
+            "password": "moving-agent-pw",
+            "role": "agent",
+        },
+        headers=broker,
+    )
+    assert response.status_code == 200, response.text
+    agent = response.json()
+
+    with SessionLocal() as db:
+        other = db.scalar(
+            select(models.User.id)
+            .where(models.User.role == "broker", models.User.id != agent["broker_id"])
+            .order_by(models.User.id)
+        )
+
+    calls = []
+    invalidate = broker_agents.invalidate
+
+    def record(*broker_ids):
+        with SessionLocal() as db:
+            committed = db.scalar(select(models.User.broker_id).where(models.User.id == agent["id"]))
+        calls.append((set(broker_ids), committed))
+        invalidate(*broker_ids)
+
+    monkeypatch.setattr(broker_agents, "invalidate", record)
+    return agent["id"], agent["broker_id"], other, calls
+
+
+def test_broker_sets_invalidated_after_the_move_commits(client, broker, moves):
+    agent_id, own_broker, other_broker, calls = moves
+
+    response = client.put(f"/users/{agent_id}", json={"broker_id": other_broker}, headers=broker)
+    assert response.status_code == 200, response.text
+    assert calls == [({own_broker, other_broker}, other_broker)]
+
+
+def test_broker_sets_invalidated_when_the_commit_fails(client, broker, dataset, moves):
+    agent_id, own_broker, other_broker, calls = moves
+
+    # a taken email makes the commit fail after the move was staged
+    with pytest.raises(IntegrityError):
+        client.put(
+            f"/users/{agent_id}",
+            json={"broker_id": other_broker, "email": dataset["broker_email"]},
+            headers=broker,
+        )
+    assert calls == [({own_broker, other_broker}, own_broker)]
+
+
+def test_set_read_before_an_invalidation_is_not_stored(moves):
+    _, broker_id, _, _ = moves
+    cache = BrokerAgentCache(ttl_seconds=300)
+    queries = []
+
+    with SessionLocal() as db:
+        query = db.query
+
+        def racing_query(*entities):
+            queries.append(entities)
+            if len(queries) == 1:
+                # the move commits while the first get() reads the old set
+                cache.invalidate(broker_id)
+            return query(*entities)
+
+        db.query = racing_query
+        cache.get(db, broker_id)
+        cache.get(db, broker_id)
+        assert len(queries) == 2
+        cache.get(db, broker_id)
+        assert len(queries) == 2
@@ -3,7 +3,7 @@
 
 import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
-import { apiFetch, clearToken } from "../../../lib/api";
+import { apiFetchPage, clearToken } from "../../../lib/api";
 
 interface Property {
   id: number;
@@ -24,23 +24,28 @@ export default function PropertiesPage() {
   const [properties, setProperties] = useState<Property[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-  useEffect(() => {
-    async function load() {
-      try {
-        const data = await apiFetch<Property[]>("/properties");
-        setProperties(data);
-      } catch (err: any) {
-        setError("Failed to load properties. Are you logged in?");
-        if (err.message.includes("401")) {
-          clearToken();
-          router.push("/login");
-        }
-      } finally {
-        setLoading(false);
+  async function load(cursor: string | null) {
+    setLoading(true);
+    try {
+      const page = await apiFetchPage<Property>("/properties", cursor);
+      setProperties((current) => (cursor ? [...current, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
+    } catch (err: any) {
+      setError("Failed to load properties. Are you logged in?");
+      if (err.message.includes("401")) {
+        clearToken();
+        router.push("/login");
       }
+    } finally {
+      setLoading(false);
     }
-    load();
+  }
+
+  useEffect(() => {
+    load(null);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [router]);
 
   function createNew() {
@@ -97,6 +102,15 @@ export default function PropertiesPage() {
           <p className="text-sm text-gray-500">No properties yet.</p>
         )}
       </div>
+
+      {nextCursor && !loading && (
+        <button
+          onClick={() => load(nextCursor)}
+          className="px-4 py-2 text-sm border rounded-md"
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 }
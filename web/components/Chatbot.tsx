@@ -1,7 +1,7 @@
 'use client';
 
 import { useEffect, useRef, useState } from 'react';
-import { sendChat } from '../lib/api';
+import { streamChat } from '../lib/api';
 
 export default function Chatbot() {
   const [open, setOpen] = useState(true);
@@ -9,6 +9,7 @@ export default function Chatbot() {
     { role: 'assistant', content: "Hi! I'm Rachel, your friendly real estate assistant. How can I help today?" }
   ]);
   const [input, setInput] = useState('');
+  const [sessionId, setSessionId] = useState<string | undefined>();
   const listRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
@@ -20,27 +21,29 @@ export default function Chatbot() {
     const text = input.trim();
     if (!text) return;
 
-    // Add user message to the UI
-    setMessages((m) => [...m, { role: 'user', content: text }]);
+    // Add user message and an empty reply that fills in as tokens arrive
+    setMessages((m) => [
+      ...m,
+      { role: 'user', content: text },
+      { role: 'assistant', content: '' },
+    ]);
     setInput('');
 
-    try {
-      // ✅ send an object, not a raw string
-      const response = await sendChat({ message: text });
-
-      // Assuming backend returns: { reply: "..." }
+    const setReply = (update: (content: string) => string) =>
       setMessages((m) => [
-        ...m,
-        { role: 'assistant', content: response.reply },
+        ...m.slice(0, -1),
+        { role: 'assistant', content: update(m[m.length - 1].content) },
       ]);
+
+    try {
+      const response = await streamChat(
+        { message: text, session_id: sessionId },
+        (token) => setReply((content) => content + token)
+      );
+      setSessionId(response.session_id);
+      setReply(() => response.reply);
     } catch (err) {
-      setMessages((m) => [
-        ...m,
-        {
-          role: 'assistant',
-          content: 'Sorry, I had trouble replying. Try again in a moment.',
-        },
-      ]);
+      setReply(() => 'Sorry, I had trouble replying. Try again in a moment.');
       console.error(err);
     }
   }
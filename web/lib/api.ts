@@ -56,11 +56,40 @@ export async function apiFetch<T = unknown>(
   return res.json();
 }
 
+// A keyset-paginated list (GET /properties, /public/properties): the rows
+// plus the cursor for the next page from X-Next-Cursor, null on the last.
+export async function apiFetchPage<T = unknown>(
+  path: string,
+  cursor: string | null = null,
+  auth: boolean = true
+): Promise<{ items: T[]; nextCursor: string | null }> {
+  const headers: Record<string, string> = { "Content-Type": "application/json" };
+  if (auth) {
+    const token = getToken();
+    if (token) {
+      headers["Authorization"] = `Bearer ${token}`;
+    }
+  }
+
+  const url = cursor
+    ? `${API_BASE}${path}${path.includes("?") ? "&" : "?"}cursor=${encodeURIComponent(cursor)}`
+    : `${API_BASE}${path}`;
+  const res = await fetch(url, { headers });
+
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(text || `Request failed: ${res.status}`);
+  }
+
+  return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
 
 export async function sendChat(payload: {
   message: string;
+  session_id?: string;
   history?: ChatMessage[];
-}): Promise<{ reply: string }> {
+}): Promise<{ reply: string; session_id: string }> {
   const res = await fetch(`${API_BASE}/chat`, {
     method: 'POST',
     headers: {
@@ -76,5 +105,64 @@ export async function sendChat(payload: {
     );
   }
 
-  return res.json(); // should be { reply: string }
-}
\ No newline at end of file
+  return res.json(); // should be { reply: string, session_id: string }
+}
+
+// POST /chat/stream (Server-Sent Events): onToken fires for each chunk of
+// the reply as the server produces it. Resolves with the full reply.
+export async function streamChat(
+  payload: { message: string; session_id?: string },
+  onToken: (token: string) => void
+): Promise<{ reply: string; session_id: string }> {
+  const res = await fetch(`${API_BASE}/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(payload),
+  });
+
+  if (!res.ok || !res.body) {
+    const errorText = await res.text();
+    throw new Error(
+      `streamChat failed: ${res.status} ${res.statusText} – ${errorText}`
+    );
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let sessionId = payload.session_id ?? '';
+  let reply = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // events are separated by a blank line
+    let end: number;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (!data) continue;
+
+      const parsed = JSON.parse(data);
+      if (event === 'session') sessionId = parsed.session_id;
+      else if (event === 'done') reply = parsed.reply;
+      else {
+        reply += parsed.token;
+        onToken(parsed.token);
+      }
+    }
+  }
+
+  return { reply, session_id: sessionId };
+}